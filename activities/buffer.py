@@ -0,0 +1,85 @@
+"""
+Per-transaction buffer for activity rows.
+
+ActivityService.log_* add rows here instead of inserting them one by one.
+The rows are written with a single bulk_create once the surrounding
+transaction commits, so logging a batch costs one INSERT and a rolled-back
+change never leaves activity behind. Outside a transaction the rows are
+written at once. With ACTIVITY_FLUSH_IN_BACKGROUND set, the write is
+handed to the background worker pool (config/background.py).
+
+Savepoints are tracked with transaction.on_commit itself. Every row
+registers a no-op callback from the atomic block it was logged in, and
+Django drops the callbacks of a block that rolls back. The buffer only
+keeps weak references to them, so a row whose callback is gone is
+dropped too. The same goes for the batch's own flush callback, so a batch
+started inside a rolled-back block is replaced by a fresh one.
+"""
+
+import threading
+import weakref
+
+from django.conf import settings
+from django.db import transaction
+
+from config.background import submit
+from config.events import hub
+from .models import Activity
+
+_local = threading.local()
+
+
+class _Batch:
+    """on_commit callback writing the rows logged during one transaction"""
+
+    def __init__(self):
+        self.rows = []  # (activity, weak reference to the row's on_commit marker)
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        # Markers of committed rows are still queued behind this callback
+        flush([activity for activity, marker in self.rows if marker() is not None])
+
+
+class _Marker:
+    """No-op on_commit callback that lives as long as its row's atomic block"""
+
+    def __call__(self):
+        pass
+
+
+def add(activity):
+    """Queue an unsaved Activity for the current transaction"""
+    if not transaction.get_connection().in_atomic_block:
+        flush([activity])
+        return
+
+    ref = getattr(_local, 'batch', None)
+    batch = ref() if ref is not None else None
+    if batch is None or batch.done:
+        batch = _Batch()
+        _local.batch = weakref.ref(batch)
+        transaction.on_commit(batch)
+
+    marker = _Marker()
+    batch.rows.append((activity, weakref.ref(marker)))
+    transaction.on_commit(marker)
+
+
+def flush(rows):
+    """Write rows now, or on the worker pool when configured to"""
+    if not rows:
+        return
+    if getattr(settings, 'ACTIVITY_FLUSH_IN_BACKGROUND', False):
+        submit(_write, rows)
+    else:
+        _write(rows)
+
+
+def _write(rows):
+    Activity.objects.bulk_create(rows)
+
+    # Wake live streams of the groups (see streams.py)
+    for group_id in {row.group_id for row in rows}:
+        hub.publish(group_id, 'activity')
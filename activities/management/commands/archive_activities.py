@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from activities.services import ActivityRetentionService
+
+class Command(BaseCommand):
+    help = 'Archive activity past its retention window to gzipped JSONL and delete it (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows archived and deleted per batch')
+        parser.add_argument('--archive-dir', help='Where archive files go (defaults to ACTIVITY_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the expired rows')
+
+    def handle(self, *args, **options):
+        service = ActivityRetentionService()
+
+        if options['dry_run']:
+            self.stdout.write(f'{service.expired().count()} activities past retention')
+            return
+
+        count, path = service.archive(options['archive_dir'], batch_size=options['batch_size'])
+        if path:
+            self.stdout.write(self.style.SUCCESS(f'Archived {count} activities to {path}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No activities past retention'))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0001_initial'),
+        ('groups', '0005_group_debt_simplification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['group', '-created_at', '-id'], name='activity_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['group', 'activity_type', '-created_at', '-id'], name='activity_type_feed_idx'),
+        ),
+    ]
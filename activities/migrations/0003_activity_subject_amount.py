@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0002_activity_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='amount_cents',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='subject_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
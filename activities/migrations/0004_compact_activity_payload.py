@@ -0,0 +1,86 @@
+import uuid
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+SUBJECT_KEYS = ('expense_id', 'settlement_id')
+# Keys of the old stringified payload; converted rows only ever hold 'title'
+LEGACY_KEYS = SUBJECT_KEYS + ('amount', 'expense_title', 'payer_email', 'receiver_email', 'user_email')
+
+
+def _cents(value):
+    try:
+        return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def compact_payload(apps, schema_editor):
+    """Move ids and amounts out of the stringified metadata, one committed batch at a time"""
+    Activity = apps.get_model('activities', 'Activity')
+    Expense = apps.get_model('expense', 'Expense')
+
+    last_id = None
+    while True:
+        rows = Activity.objects.order_by('id')
+        if last_id is not None:
+            rows = rows.filter(id__gt=last_id)
+        activities = list(rows[:BATCH_SIZE])
+        if not activities:
+            break
+        last_id = activities[-1].id
+
+        # A retried run must not convert a row twice: that would read the
+        # old keys off the new payload and drop a deleted expense's title
+        activities = [
+            a for a in activities
+            if isinstance(a.metadata, dict) and any(key in a.metadata for key in LEGACY_KEYS)
+        ]
+        if not activities:
+            continue
+
+        for activity in activities:
+            metadata = activity.metadata
+            for key in SUBJECT_KEYS:
+                subject_id = _uuid(metadata[key]) if metadata.get(key) else None
+                if subject_id is not None:
+                    activity.subject_id = subject_id
+                    break
+            if metadata.get('amount') is not None:
+                activity.amount_cents = _cents(metadata['amount'])
+
+        # Only the title of an expense that no longer exists cannot be
+        # looked up at read time; keep it on the row
+        existing = set(
+            Expense.objects.filter(
+                id__in={a.subject_id for a in activities if a.subject_id}
+            ).values_list('id', flat=True)
+        )
+        for activity in activities:
+            title = activity.metadata.get('expense_title')
+            gone = activity.subject_id is None or activity.subject_id not in existing
+            activity.metadata = {'title': title} if title and gone else {}
+        Activity.objects.bulk_update(activities, ['subject_id', 'amount_cents', 'metadata'])
+
+
+class Migration(migrations.Migration):
+    # Batches commit separately so a large table is never locked in one transaction
+    atomic = False
+
+    dependencies = [
+        ('activities', '0003_activity_subject_amount'),
+        ('expense', '0011_backfill_expense_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_payload, migrations.RunPython.noop),
+    ]
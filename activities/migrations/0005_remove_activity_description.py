@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0004_compact_activity_payload'),
+    ]
+
+    operations = [
+        # A default first, so the removal can be reversed on a populated table
+        migrations.AlterField(
+            model_name='activity',
+            name='description',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RemoveField(
+            model_name='activity',
+            name='description',
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0005_remove_activity_description'),
+        ('groups', '0005_group_debt_simplification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['-created_at', '-id'], name='activity_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0006_activity_recent_idx'),
+        ('groups', '0006_group_activity_retention_days'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(condition=models.Q(('subject_id__isnull', False)), fields=['subject_id', '-created_at', '-id'], name='activity_subject_idx'),
+        ),
+    ]
@@ -33,11 +33,13 @@ class Activity(models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='activities')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
     
-    # Activity details
+    # Activity details, stored as a compact payload; the description is
+    # rendered from it at read time (see rendering.py)
     activity_type = models.CharField(max_length=30, choices=ACTIVITY_TYPES)
-    description = models.TextField()
+    subject_id = models.UUIDField(null=True, blank=True)  # the expense/settlement acted on
+    amount_cents = models.BigIntegerField(null=True, blank=True)
     
-    # Optional metadata (JSON field for flexibility)
+    # Facts that cannot be looked up later, e.g. a deleted expense's title
     metadata = models.JSONField(default=dict, blank=True)
     
     # Timestamps
@@ -46,6 +48,19 @@ class Activity(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Activities'
+        # The feed is read newest first in keyset pages of (created_at, id)
+        indexes = [
+            models.Index(fields=['group', '-created_at', '-id'], name='activity_feed_idx'),
+            models.Index(fields=['group', 'activity_type', '-created_at', '-id'], name='activity_type_feed_idx'),
+            # The per-user feed spans many groups and filters them off this one
+            models.Index(fields=['-created_at', '-id'], name='activity_recent_idx'),
+            # History of one expense or settlement; member events have no subject
+            models.Index(
+                fields=['subject_id', '-created_at', '-id'],
+                name='activity_subject_idx',
+                condition=models.Q(subject_id__isnull=False),
+            ),
+        ]
         
     def __str__(self):
         return f"{self.user.email} - {self.get_activity_type_display()} in {self.group.name}"
@@ -0,0 +1,84 @@
+"""
+Render activity descriptions at read time.
+
+Activities store a compact payload (type, actor, subject id, amount in
+cents). The sentence shown to users is built here from per-type
+templates, for a whole page of activities at once: one query per subject
+kind, so the wording can change without touching stored rows.
+"""
+
+from decimal import Decimal
+
+TEMPLATES = {
+    'expense_created': "Created expense '{title}' for ${amount}",
+    'expense_updated': "Updated expense '{title}'",
+    'expense_deleted': "Deleted expense '{title}' (${amount})",
+    'settlement_created': "Created settlement: {payer} pays {receiver} ${amount}",
+    'settlement_confirmed': "Confirmed settlement of ${amount} from {payer}",
+    'settlement_rejected': "Rejected settlement of ${amount} from {payer}",
+    'member_joined': "{actor} joined the group",
+    'member_left': "{actor} left the group",
+    'member_added': "{actor} added a member",
+    'member_removed': "{actor} removed a member",
+    'group_created': "{actor} created the group",
+    'group_updated': "{actor} updated the group",
+}
+
+EXPENSE_TYPES = {'expense_created', 'expense_updated', 'expense_deleted'}
+SETTLEMENT_TYPES = {'settlement_created', 'settlement_confirmed', 'settlement_rejected'}
+
+
+class _Facts(dict):
+    """Template values; anything unknown renders as a placeholder"""
+
+    def __missing__(self, key):
+        return '?'
+
+
+def render_descriptions(activities):
+    """Map activity id -> description for a batch of activities"""
+    from expense.models import Expense
+    from settlements.models import Settlement
+    from .models import Activity
+
+    activities = list(activities)
+    expense_ids = {a.subject_id for a in activities if a.activity_type in EXPENSE_TYPES and a.subject_id}
+    settlement_ids = {a.subject_id for a in activities if a.activity_type in SETTLEMENT_TYPES and a.subject_id}
+
+    titles = dict(Expense.objects.filter(id__in=expense_ids).values_list('id', 'title')) if expense_ids else {}
+
+    # Deleted expenses keep their title on the deletion entry only
+    gone = expense_ids - set(titles)
+    if gone:
+        for subject_id, metadata in Activity.objects.filter(
+            activity_type='expense_deleted',
+            subject_id__in=gone
+        ).values_list('subject_id', 'metadata'):
+            if metadata.get('title'):
+                titles[subject_id] = metadata['title']
+
+    parties = {}
+    if settlement_ids:
+        parties = {
+            settlement_id: (payer, receiver)
+            for settlement_id, payer, receiver in Settlement.objects.filter(
+                id__in=settlement_ids
+            ).values_list('id', 'payer__email', 'receiver__email')
+        }
+
+    descriptions = {}
+    for activity in activities:
+        facts = _Facts(actor=activity.user.email)
+        if activity.amount_cents is not None:
+            facts['amount'] = (Decimal(activity.amount_cents) / 100).quantize(Decimal('0.01'))
+        if activity.activity_type in EXPENSE_TYPES:
+            facts['title'] = titles.get(activity.subject_id) or activity.metadata.get('title', '(deleted)')
+        elif activity.subject_id in parties:
+            facts['payer'], facts['receiver'] = parties[activity.subject_id]
+
+        template = TEMPLATES.get(activity.activity_type)
+        if template is None:
+            descriptions[activity.id] = activity.get_activity_type_display()
+        else:
+            descriptions[activity.id] = template.format_map(facts)
+    return descriptions
@@ -1,5 +1,8 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from .models import Activity
+from .rendering import render_descriptions
 
 class ActivitySerializer(serializers.ModelSerializer):
     """Serializes activity data for reading"""
@@ -12,15 +15,35 @@ class ActivitySerializer(serializers.ModelSerializer):
     group_name = serializers.CharField(source='group.name', read_only=True)
     
     activity_type_display = serializers.CharField(source='get_activity_type_display', read_only=True)
+    description = serializers.SerializerMethodField()
+    amount = serializers.SerializerMethodField()
     
     class Meta:
         model = Activity
         fields = [
             'id', 'group_id', 'group_name', 'user_id', 'user_email', 'user_name',
-            'activity_type', 'activity_type_display', 'description', 'metadata',
-            'created_at'
+            'activity_type', 'activity_type_display', 'description', 'subject_id',
+            'amount', 'metadata', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
         
     def get_user_name(self, obj):
         return f"{obj.user.first_name} {obj.user.last_name}".strip()
+
+    def get_amount(self, obj):
+        if obj.amount_cents is None:
+            return None
+        return str((Decimal(obj.amount_cents) / 100).quantize(Decimal('0.01')))
+
+    def get_description(self, obj):
+        return self._descriptions(obj).get(obj.id)
+
+    def _descriptions(self, obj):
+        """Descriptions rendered once for a whole list response"""
+        descriptions = self.root.__dict__.setdefault('_descriptions', {})
+        if obj.id not in descriptions:
+            if isinstance(self.parent, serializers.ListSerializer) and self.parent.instance is not None:
+                descriptions.update(render_descriptions(self.parent.instance))
+            else:
+                descriptions.update(render_descriptions([obj]))
+        return descriptions
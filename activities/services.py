@@ -1,18 +1,41 @@
+import gzip
+import json
+import operator
+import os
+from datetime import timedelta
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from expense.services import to_cents
+from groups.models import Group
+from . import buffer
 from .models import Activity
 
 class ActivityService:
-    """Simple service for creating activity logs"""
+    """
+    Simple service for creating activity logs.
+    Entries are buffered and written in one INSERT when the current
+    transaction commits (see buffer.py). Only ids and amounts are stored;
+    descriptions are rendered at read time (see rendering.py).
+    """
     
     @staticmethod
-    def log_activity(group, user, activity_type, description, metadata=None):
-        """Create an activity log entry"""
-        return Activity.objects.create(
+    def log_activity(group, user, activity_type, subject_id=None, amount=None, metadata=None):
+        """Queue an activity log entry; returns the (not yet saved) Activity"""
+        activity = Activity(
             group=group,
             user=user,
             activity_type=activity_type,
-            description=description,
+            subject_id=subject_id,
+            amount_cents=to_cents(amount) if amount is not None else None,
             metadata=metadata or {}
         )
+        buffer.add(activity)
+        return activity
         
     @staticmethod
     def log_expense_created(group, user, expense):
@@ -21,12 +44,8 @@ class ActivityService:
             group=group,
             user=user,
             activity_type='expense_created',
-            description=f"Created expense '{expense.title}' for ${expense.amount}",
-            metadata={
-                'expense_id': str(expense.id),
-                'amount': str(expense.amount),
-                'expense_title': expense.title
-            }
+            subject_id=expense.id,
+            amount=expense.amount
         )
         
     @staticmethod
@@ -36,24 +55,20 @@ class ActivityService:
             group=group,
             user=user,
             activity_type='expense_updated',
-            description=f"Updated expense '{expense.title}'",
-            metadata={
-                'expense_id': str(expense.id),
-                'expense_title': expense.title
-            }
+            subject_id=expense.id
         )
         
     @staticmethod
-    def log_expense_deleted(group, user, expense_title, amount):
-        """Log expense deletion"""
+    def log_expense_deleted(group, user, expense_id, expense_title, amount):
+        """Log expense deletion; the title is kept since the expense is gone"""
         return ActivityService.log_activity(
             group=group,
             user=user,
             activity_type='expense_deleted',
-            description=f"Deleted expense '{expense_title}' (${amount})",
+            subject_id=expense_id,
+            amount=amount,
             metadata={
-                'expense_title': expense_title,
-                'amount': str(amount)
+                'title': expense_title
             }
         )
         
@@ -64,13 +79,8 @@ class ActivityService:
             group=group,
             user=user,
             activity_type='settlement_created',
-            description=f"Created settlement: {settlement.payer.email} pays {settlement.receiver.email} ${settlement.amount}",
-            metadata={
-                'settlement_id': str(settlement.id),
-                'amount': str(settlement.amount),
-                'payer_email': settlement.payer.email,
-                'receiver_email': settlement.receiver.email
-            }
+            subject_id=settlement.id,
+            amount=settlement.amount
         )
         
     @staticmethod
@@ -80,12 +90,8 @@ class ActivityService:
             group=group,
             user=user,
             activity_type='settlement_confirmed',
-            description=f"Confirmed settlement of ${settlement.amount} from {settlement.payer.email}",
-            metadata={
-                'settlement_id': str(settlement.id),
-                'amount': str(settlement.amount),
-                'payer_email': settlement.payer.email
-            }
+            subject_id=settlement.id,
+            amount=settlement.amount
         )
         
     @staticmethod
@@ -94,11 +100,7 @@ class ActivityService:
         return ActivityService.log_activity(
             group=group,
             user=user,
-            activity_type='member_joined',
-            description=f"{user.email} joined the group",
-            metadata={
-                'user_email': user.email
-            }
+            activity_type='member_joined'
         )
         
     @staticmethod
@@ -107,9 +109,83 @@ class ActivityService:
         return ActivityService.log_activity(
             group=group,
             user=user,
-            activity_type='member_left',
-            description=f"{user.email} left the group",
-            metadata={
-                'user_email': user.email
-            }
+            activity_type='member_left'
         )
+
+
+class ActivityRetentionService:
+    """
+    Moves activity past its group's retention window out of the table.
+
+    Rows are appended to a gzipped JSONL archive and then deleted in
+    bounded batches, each in its own short transaction, so the table and
+    its indexes stay the size of the retention window and the feed only
+    ever reads hot rows.
+    """
+
+    ARCHIVE_FIELDS = (
+        'id', 'group_id', 'user_id', 'activity_type', 'subject_id',
+        'amount_cents', 'metadata', 'created_at',
+    )
+
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+
+    def expired(self):
+        """Activities older than their group's retention, or the global one"""
+        conditions = []
+        default_days = getattr(settings, 'ACTIVITY_RETENTION_DAYS', None)
+        if default_days:
+            conditions.append(Q(
+                group__activity_retention_days__isnull=True,
+                created_at__lt=self.now - timedelta(days=default_days)
+            ))
+
+        # One condition per distinct override, not per group
+        overrides = Group.objects.filter(
+            activity_retention_days__isnull=False
+        ).values_list('activity_retention_days', flat=True).distinct()
+        for days in overrides:
+            conditions.append(Q(
+                group__activity_retention_days=days,
+                created_at__lt=self.now - timedelta(days=days)
+            ))
+
+        # Nothing configured: keep everything
+        if not conditions:
+            return Activity.objects.none()
+        return Activity.objects.filter(reduce(operator.or_, conditions))
+
+    def archive(self, directory=None, batch_size=1000):
+        """
+        Archive and delete expired activity. Returns (count, archive path);
+        the path is None when nothing had expired.
+
+        Each batch is written and flushed to the archive before it is
+        deleted, so a crash can at worst archive a batch twice.
+        """
+        directory = directory or settings.ACTIVITY_ARCHIVE_DIR
+        expired = self.expired().order_by('created_at', 'id')
+
+        path, archive, count = None, None, 0
+        try:
+            while True:
+                rows = list(expired.values(*self.ARCHIVE_FIELDS)[:batch_size])
+                if not rows:
+                    break
+                if archive is None:
+                    os.makedirs(directory, exist_ok=True)
+                    path = os.path.join(directory, f"activities-{self.now:%Y%m%dT%H%M%S}.jsonl.gz")
+                    archive = gzip.open(path, 'ab')
+
+                for row in rows:
+                    archive.write((json.dumps(row, default=str) + '\n').encode())
+                archive.flush()
+                os.fsync(archive.fileobj.fileno())
+
+                with transaction.atomic():
+                    count += Activity.objects.filter(id__in=[row['id'] for row in rows]).delete()[0]
+        finally:
+            if archive is not None:
+                archive.close()
+        return count, path
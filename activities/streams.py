@@ -0,0 +1,169 @@
+"""
+Server-Sent Events streams of live group activity, served over ASGI.
+
+A stream pushes `activity` events (serialized like the activity list)
+and `balances` events when a group's change version moves, so clients
+can stop polling /activities/ and /balances/. Streams are woken at once
+by the in-process hub (config/events.py) and also poll on a timer, which
+picks up writes made by other worker processes: activity rows from the
+database, balance versions from the shared cache (settings.CACHES). Each
+wake-up costs one indexed query after the stream's cursor and one cache
+read.
+
+Each activity event's id is a cursor; a reconnecting EventSource sends it
+back as Last-Event-ID and resumes exactly where it left off. Streams end
+after ACTIVITY_STREAM_MAX_SECONDS and the browser reconnects, which
+re-checks access.
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from config.events import hub
+from config.pagination import encode_cursor, decode_cursor
+from groups.versioning import get_group_versions
+from members.models import Membership
+from .models import Activity
+from .serializers import ActivitySerializer
+
+# Rows are timestamped before their transaction commits, so one can show
+# up slightly behind the cursor; re-read this far back and skip ids sent
+LATE_COMMIT_WINDOW = timedelta(seconds=5)
+BATCH_SIZE = 100
+
+
+class ActivityStream:
+    """Live activity of one group, or of every group a user belongs to"""
+
+    def __init__(self, user, group_id=None, last_event_id=None):
+        self.user = user
+        self.group_id = group_id
+        # Nothing at or before the starting point is ever sent: a fresh
+        # stream starts now, a resumed one right after its last event
+        self.cursor = timezone.now()
+        self.floor = Q(created_at__gte=self.cursor)
+        if last_event_id:
+            try:
+                self.cursor, last_id = decode_cursor(last_event_id)
+                self.floor = Q(created_at__gt=self.cursor) | Q(created_at=self.cursor, id__gt=last_id)
+            except ValueError:
+                pass
+        self.sent = {}  # activity id -> created_at, within the late-commit window
+        self.versions = None
+
+    def group_ids(self):
+        if self.group_id is not None:
+            return [str(self.group_id)]
+        return [str(group_id) for group_id in Membership.objects.filter(user=self.user).values_list('group_id', flat=True)]
+
+    def read(self):
+        """SSE chunks for whatever changed since the last read"""
+        if self.group_id is not None:
+            scope = Activity.objects.filter(group_id=self.group_id)
+        else:
+            scope = Activity.objects.filter(
+                group_id__in=Membership.objects.filter(user=self.user).values('group_id')
+            )
+        since = self.cursor - LATE_COMMIT_WINDOW
+        activities = list(
+            scope.filter(self.floor, created_at__gte=since)
+            .exclude(id__in=list(self.sent))
+            .select_related('user', 'group')
+            .order_by('created_at', 'id')[:BATCH_SIZE]
+        )
+
+        chunks = []
+        for activity, data in zip(activities, ActivitySerializer(activities, many=True).data):
+            chunks.append(_event('activity', data, encode_cursor(activity.created_at, activity.id)))
+            self.sent[activity.id] = activity.created_at
+            self.cursor = max(self.cursor, activity.created_at)
+        self.sent = {pk: at for pk, at in self.sent.items() if at >= self.cursor - LATE_COMMIT_WINDOW}
+
+        versions = get_group_versions(self.group_ids())
+        if self.versions is not None:
+            for group_id, version in versions.items():
+                if self.versions.get(group_id) != version:
+                    chunks.append(_event('balances', {'group_id': group_id, 'version': version}))
+        self.versions = versions
+        return chunks
+
+    async def events(self):
+        yield f"retry: {getattr(settings, 'ACTIVITY_STREAM_RETRY_MS', 3000)}\n\n"
+
+        group_ids = await sync_to_async(self.group_ids)()
+        queue = hub.subscribe(group_ids)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + getattr(settings, 'ACTIVITY_STREAM_MAX_SECONDS', 300)
+        interval = getattr(settings, 'ACTIVITY_STREAM_POLL_SECONDS', 5)
+        try:
+            # Catch up first (Last-Event-ID), then wait for wake-ups
+            for chunk in await sync_to_async(self.read)():
+                yield chunk
+            while loop.time() < deadline:
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                while not queue.empty():
+                    queue.get_nowait()
+
+                chunks = await sync_to_async(self.read)()
+                for chunk in chunks:
+                    yield chunk
+                if not chunks:
+                    # Comment line: keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+        finally:
+            hub.unsubscribe(group_ids, queue)
+
+
+def _event(name, data, event_id=None):
+    lines = [f"event: {name}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _authorize(request, group_id):
+    """Authenticate like the API does; returns (user, error response)"""
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    try:
+        user = drf_request.user
+    except APIException as e:
+        return None, JsonResponse({'status': 'error', 'message': str(e.detail)}, status=e.status_code)
+    if not user.is_authenticated:
+        return None, JsonResponse(
+            {'status': 'error', 'message': 'Authentication credentials were not provided.'}, status=401
+        )
+    if group_id is not None and not Membership.objects.filter(group_id=group_id, user=user).exists():
+        return None, JsonResponse({'status': 'error', 'message': 'You are not a member of this group.'}, status=403)
+    return user, None
+
+
+@require_GET
+async def activity_stream(request, group_id=None):
+    """GET an SSE stream of a group's activity, or of all the user's groups"""
+    user, error = await sync_to_async(_authorize)(request, group_id)
+    if error is not None:
+        return error
+
+    stream = ActivityStream(user, group_id, request.headers.get('Last-Event-ID'))
+    response = StreamingHttpResponse(stream.events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
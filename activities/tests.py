@@ -1,3 +1,388 @@
-from django.test import TestCase
+import gzip
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from groups.models import Group
+from members.models import Membership
+from groups.versioning import _version_key
+from .models import Activity
+from .services import ActivityService, ActivityRetentionService
+from .streams import ActivityStream
+
+
+class ActivityFeedPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        Activity.objects.bulk_create([
+            Activity(group=self.group, user=self.user, activity_type=activity_type)
+            for activity_type in ['member_joined', 'group_updated'] * 6
+        ])
+        # Every row shares one timestamp, so only the id breaks ties
+        Activity.objects.update(created_at=timezone.now())
+
+    def walk(self, url, **params):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(url, {'limit': 5, **params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['data']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_group_feed_pages_are_stable_across_equal_timestamps(self):
+        ids = self.walk(f'/api/v1/groups/{self.group.id}/activities/')
+
+        expected = Activity.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, [str(pk) for pk in expected])
+
+    def test_type_filter_pages_through_matching_rows_only(self):
+        ids = self.walk(f'/api/v1/groups/{self.group.id}/activities/', type='group_updated')
+
+        expected = (
+            Activity.objects.filter(activity_type='group_updated')
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, [str(pk) for pk in expected])
+
+
+
+class UserActivityFeedTests(TestCase):
+    def setUp(self):
+        self.user, self.stranger = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(2)
+        ]
+        self.home, self.trip, self.other = [
+            Group.objects.create(name=name, created_by=self.user) for name in ('Home', 'Trip', 'Other')
+        ]
+        Membership.objects.create(user=self.user, group=self.home)
+        Membership.objects.create(user=self.user, group=self.trip)
+        Membership.objects.create(user=self.stranger, group=self.other)
+        Activity.objects.bulk_create([
+            Activity(group=group, user=self.user, activity_type='group_updated')
+            for group in (self.home, self.trip, self.other) * 3
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def feed(self):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get('/api/v1/activities/', {'limit': 4, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['data']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_feed_covers_only_the_users_groups(self):
+        expected = (
+            Activity.objects.filter(group__in=[self.home, self.trip])
+            .order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.feed(), [str(pk) for pk in expected])
+
+        outside = Activity.objects.filter(group=self.other).first()
+        self.assertEqual(self.client.get(f'/api/v1/activities/{outside.id}/').status_code, 404)
+
+    def test_leaving_a_group_removes_it_from_the_feed(self):
+        Membership.objects.filter(user=self.user, group=self.trip).delete()
+
+        self.assertEqual(
+            set(self.feed()),
+            {str(pk) for pk in Activity.objects.filter(group=self.home).values_list('id', flat=True)},
+        )
+
+
+
+class SubjectHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.expense_id, self.other_id = uuid.uuid4(), uuid.uuid4()
+        self.history = [
+            self.log('expense_created', self.expense_id),
+            self.log('expense_created', self.other_id),
+            self.log('expense_updated', self.expense_id),
+            # Only the type tells an expense id from a settlement id
+            self.log('settlement_created', self.expense_id),
+            self.log('expense_deleted', self.expense_id),
+        ]
+
+    def log(self, activity_type, subject_id):
+        return Activity.objects.create(
+            group=self.group, user=self.user, activity_type=activity_type, subject_id=subject_id
+        )
+
+    def types(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['activity_type'] for row in response.data['data']]
+
+    def test_history_of_one_expense_or_settlement(self):
+        expected = [
+            a.activity_type for a in sorted(self.history, key=lambda a: (a.created_at, a.id), reverse=True)
+            if a.subject_id == self.expense_id and a.activity_type.startswith('expense')
+        ]
+        for url in (f'/api/v1/groups/{self.group.id}/activities/', '/api/v1/activities/'):
+            self.assertEqual(self.types(url, expense=str(self.expense_id)), expected)
+            self.assertEqual(self.types(url, settlement=str(self.expense_id)), ['settlement_created'])
+            self.assertEqual(self.types(url, expense=str(self.other_id)), ['expense_created'])
+            self.assertEqual(self.types(url, settlement=str(self.other_id)), [])
+
+    def test_invalid_ids_are_rejected(self):
+        for param in ('expense', 'settlement'):
+            response = self.client.get(f'/api/v1/groups/{self.group.id}/activities/', {param: 'not-a-uuid'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(param, response.data)
+
+
+class ActivityStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+
+    def test_version_bumped_by_another_worker_reaches_the_stream(self):
+        stream = ActivityStream(self.user, self.group.id)
+        self.assertEqual(stream.read(), [])
+
+        # A separate cache connection stands in for another worker process
+        other_worker = caches.create_connection('default')
+        other_worker.set(_version_key(self.group.id), 42, timeout=None)
+
+        chunks = stream.read()
+        self.assertEqual(len(chunks), 1)
+        self.assertIn('event: balances', chunks[0])
+        self.assertIn('"version": 42', chunks[0])
+
+    def test_activity_written_elsewhere_is_picked_up_by_polling(self):
+        stream = ActivityStream(self.user, self.group.id)
+        stream.read()
+
+        activity = Activity.objects.create(group=self.group, user=self.user, activity_type='member_joined')
+
+        chunks = stream.read()
+        self.assertEqual(len(chunks), 1)
+        self.assertIn('event: activity', chunks[0])
+        self.assertIn(str(activity.id), chunks[0])
+
+
+class CompactPayloadMigrationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+        self.migration = importlib.import_module('activities.migrations.0004_compact_activity_payload')
+
+    def legacy(self, metadata):
+        return Activity.objects.create(
+            group=self.group, user=self.user, activity_type='expense_deleted', metadata=metadata
+        )
+
+    def test_rerun_keeps_converted_rows(self):
+        expense_id = uuid.uuid4()
+        deleted = self.legacy({'expense_id': str(expense_id), 'expense_title': 'Taxi', 'amount': '12.50'})
+        malformed = self.legacy({'expense_id': 'not-a-uuid', 'expense_title': 'Bus', 'amount': '3'})
+
+        # A retry after a partial failure runs over rows already converted
+        self.migration.compact_payload(apps, None)
+        self.migration.compact_payload(apps, None)
+
+        deleted.refresh_from_db()
+        self.assertEqual(deleted.subject_id, expense_id)
+        self.assertEqual(deleted.amount_cents, 1250)
+        self.assertEqual(deleted.metadata, {'title': 'Taxi'})
+
+        malformed.refresh_from_db()
+        self.assertIsNone(malformed.subject_id)
+        self.assertEqual(malformed.amount_cents, 300)
+        self.assertEqual(malformed.metadata, {'title': 'Bus'})
+
+
+
+class ActivityRetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.default, self.week, self.month = [
+            Group.objects.create(name=name, created_by=self.user, activity_retention_days=days)
+            for name, days in (('Default', None), ('Week', 7), ('Month', 30))
+        ]
+        self.now = timezone.now()
+        for group in (self.default, self.week, self.month):
+            for age in (3, 10, 40, 100):
+                activity = Activity.objects.create(
+                    group=group, user=self.user, activity_type='group_updated', metadata={'age': age}
+                )
+                Activity.objects.filter(id=activity.id).update(created_at=self.now - timedelta(days=age))
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        self.archive_dir = archive_dir
+
+    def expired(self):
+        return sorted(
+            (group_name, age) for group_name, age in
+            ActivityRetentionService(self.now).expired().values_list('group__name', 'metadata__age')
+        )
+
+    @override_settings(ACTIVITY_RETENTION_DAYS=None)
+    def test_overrides_apply_per_group(self):
+        self.assertEqual(self.expired(), [
+            ('Month', 40), ('Month', 100), ('Week', 10), ('Week', 40), ('Week', 100),
+        ])
+
+    @override_settings(ACTIVITY_RETENTION_DAYS=60)
+    def test_groups_without_an_override_use_the_global_window(self):
+        self.assertIn(('Default', 100), self.expired())
+        self.assertNotIn(('Default', 40), self.expired())
+
+    @override_settings(ACTIVITY_RETENTION_DAYS=None)
+    def test_nothing_expires_without_any_retention(self):
+        Group.objects.update(activity_retention_days=None)
+
+        # Only the override lookup runs; the empty result needs no query
+        with self.assertNumQueries(1):
+            self.assertEqual(list(ActivityRetentionService(self.now).expired()), [])
+
+    @override_settings(ACTIVITY_RETENTION_DAYS=None)
+    def test_archive_writes_gzipped_jsonl_and_deletes_in_batches(self):
+        expected = {
+            str(pk): age for pk, age in
+            ActivityRetentionService(self.now).expired().values_list('id', 'metadata__age')
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            count, path = ActivityRetentionService(self.now).archive(self.archive_dir, batch_size=2)
+
+        self.assertEqual(count, 5)
+        deletes = [q for q in queries.captured_queries
+                   if q['sql'].startswith(f'DELETE FROM "{Activity._meta.db_table}"')]
+        self.assertEqual(len(deletes), 3)
+        with gzip.open(path, 'rt') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual({row['id']: row['metadata']['age'] for row in rows}, expected)
+        self.assertEqual(set(rows[0]), set(ActivityRetentionService.ARCHIVE_FIELDS))
+        self.assertFalse(Activity.objects.filter(id__in=expected).exists())
+        self.assertEqual(Activity.objects.count(), 7)
+
+    @override_settings(ACTIVITY_RETENTION_DAYS=None)
+    def test_archive_command(self):
+        out = StringIO()
+        call_command('archive_activities', '--dry-run', stdout=out)
+        self.assertIn('5 activities past retention', out.getvalue())
+        self.assertEqual(Activity.objects.count(), 12)
+
+        out = StringIO()
+        call_command('archive_activities', '--archive-dir', self.archive_dir, '--batch-size', '4', stdout=out)
+        self.assertIn('Archived 5 activities to ', out.getvalue())
+        self.assertEqual(len(os.listdir(self.archive_dir)), 1)
+
+        out = StringIO()
+        call_command('archive_activities', '--archive-dir', self.archive_dir, stdout=out)
+        self.assertIn('No activities past retention', out.getvalue())
+
+    def test_retention_cannot_go_below_seven_days(self):
+        self.week.activity_retention_days = 6
+        with self.assertRaises(ValidationError):
+            self.week.full_clean()
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Group.objects.filter(id=self.week.id).update(activity_retention_days=6)
+
+
+class ActivityBufferTests(TransactionTestCase):
+    """Real commits and rollbacks, so Django's on_commit handling is what gets tested"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+
+    def log(self, name):
+        ActivityService.log_activity(self.group, self.user, 'group_updated', metadata={'name': name})
+
+    def logged(self):
+        return sorted(
+            Activity.objects.filter(activity_type='group_updated').values_list('metadata__name', flat=True)
+        )
+
+    def test_rows_are_written_in_one_insert_on_commit(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                for name in 'abc':
+                    self.log(name)
+                self.assertEqual(self.logged(), [])
+
+        self.assertEqual(self.logged(), ['a', 'b', 'c'])
+        inserts = [q for q in queries.captured_queries
+                   if q['sql'].startswith(f'INSERT INTO "{Activity._meta.db_table}"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_rows_outside_a_transaction_are_written_at_once(self):
+        self.log('a')
+
+        self.assertEqual(self.logged(), ['a'])
+
+    def test_rolled_back_savepoints_drop_only_their_rows(self):
+        with transaction.atomic():
+            self.log('kept')
+            try:
+                with transaction.atomic():
+                    self.log('dropped')
+                    with transaction.atomic():
+                        self.log('dropped too')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            with transaction.atomic():
+                self.log('released')
+
+        self.assertEqual(self.logged(), ['kept', 'released'])
+
+    def test_a_batch_started_in_a_rolled_back_savepoint_is_replaced(self):
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    self.log('dropped')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.log('kept')
+
+        self.assertEqual(self.logged(), ['kept'])
+
+    def test_rolled_back_transactions_leave_nothing_behind(self):
+        try:
+            with transaction.atomic():
+                self.log('dropped')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with transaction.atomic():
+            self.log('next')
+
+        self.assertEqual(self.logged(), ['next'])
@@ -1,10 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import ActivityViewSet
+from .streams import activity_stream
 
 router = DefaultRouter()
 router.register(r'', ActivityViewSet, basename='activity')
 
 urlpatterns = [
+    # Before the router, or the detail route swallows it
+    path('stream/', activity_stream, name='activity-stream'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
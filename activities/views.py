@@ -1,31 +1,48 @@
 from django.shortcuts import render
 
 # Create your views here.
+import uuid
+
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 
+from config.pagination import KeysetPagination
 from groups.models import Group
 from members.models import Membership
 from .models import Activity
+from .rendering import EXPENSE_TYPES, SETTLEMENT_TYPES
 from .serializers import ActivitySerializer
 from drf_spectacular.utils import extend_schema
 
+class ActivityPagination(KeysetPagination):
+    """Default 50, max 100 per page, as the old `limit` parameter allowed"""
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
 @extend_schema(tags=["Activities"])
 class ActivityViewSet(ReadOnlyModelViewSet):
     """
     Read-only ViewSet for group activities.
     Only provides list and retrieve operations.
+    Scoped to one group when mounted under a group, otherwise a single
+    feed across every group the user belongs to.
     """
     
     serializer_class = ActivitySerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        """Filter activities by group"""
-        group = self.get_group()
-        return Activity.objects.filter(group=group).select_related('user', 'group')
+        """Filter activities by group, or by the user's memberships"""
+        if 'group_id' not in self.kwargs:
+            # Membership set as a subquery: one query per page, no group list round trip
+            group_ids = Membership.objects.filter(user=self.request.user).values('group_id')
+            activities = Activity.objects.filter(group_id__in=group_ids)
+        else:
+            activities = Activity.objects.filter(group=self.get_group())
+        return activities.select_related('user', 'group')
         
     def get_group(self):
         """Get group and verify user access"""
@@ -47,14 +64,24 @@ class ActivityViewSet(ReadOnlyModelViewSet):
         activity_type = request.query_params.get('type')
         if activity_type:
             queryset = queryset.filter(activity_type=activity_type)
+
+        # History of one expense or settlement, off the subject index
+        for param, types in (('expense', EXPENSE_TYPES), ('settlement', SETTLEMENT_TYPES)):
+            subject = request.query_params.get(param)
+            if subject:
+                try:
+                    subject_id = uuid.UUID(subject)
+                except ValueError:
+                    raise ValidationError({param: 'Must be a valid UUID.'})
+                queryset = queryset.filter(subject_id=subject_id, activity_type__in=types)
             
-        # Limit results (default 50, max 100)
-        limit = min(int(request.query_params.get('limit', 50)), 100)
-        queryset = queryset[:limit]
+        # Keyset pages on (created_at, id); `limit` is the page size
+        activities, next_cursor = ActivityPagination('created_at').paginate(request, queryset)
         
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(activities, many=True)
         return Response({
             'status': 'success',
             'message': 'Activities retrieved successfully',
-            'data': serializer.data
+            'data': serializer.data,
+            'next_cursor': next_cursor
         })
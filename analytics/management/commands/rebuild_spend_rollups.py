@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from analytics.services import SpendingRollupService
+from groups.models import Group
+
+class Command(BaseCommand):
+    help = 'Rebuild daily spend rollups from expenses (backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', action='append', help='Only rebuild this group id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Groups rebuilt per batch')
+
+    def handle(self, *args, **options):
+        groups = Group.objects.order_by('id')
+        if options['group']:
+            groups = groups.filter(id__in=options['group'])
+
+        group_ids = list(groups.values_list('id', flat=True))
+        batch_size = options['batch_size']
+        count = 0
+        for i in range(0, len(group_ids), batch_size):
+            count += SpendingRollupService.rebuild(group_ids[i:i + batch_size])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} rollup rows for {len(group_ids)} groups')
+        )
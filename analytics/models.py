@@ -0,0 +1,40 @@
+import uuid
+from django.db import models
+from django.conf import settings
+
+User = settings.AUTH_USER_MODEL
+
+class DailySpendRollup(models.Model):
+    """
+    Per-day spend totals for a group member, maintained incrementally on
+    expense writes so long histories can be charted without scanning
+    every Expense row.
+
+    kind='paid'  -> amount the user paid for expenses that day
+    kind='owed'  -> the user's participant shares of expenses that day
+    """
+    KIND_PAID = 'paid'
+    KIND_OWED = 'owed'
+    KIND_CHOICES = [
+        (KIND_PAID, 'Paid'),
+        (KIND_OWED, 'Owed'),
+    ]
+
+    id            = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    group         = models.ForeignKey('groups.Group', on_delete=models.CASCADE, related_name='spend_rollups')
+    user          = models.ForeignKey(User, on_delete=models.CASCADE, related_name='spend_rollups')
+    day           = models.DateField()
+    kind          = models.CharField(max_length=4, choices=KIND_CHOICES)
+    amount        = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'kind', 'day', 'user'],
+                name='unique_daily_spend_rollup'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.kind} {self.amount} on {self.day} in {self.group_id}"
@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+from currencies.serializers import validate_currency_code
+
+class SpendingQuerySerializer(serializers.Serializer):
+    """Validates spending analytics query parameters"""
+
+    period = serializers.ChoiceField(choices=['month', 'week'], default='month')
+    by = serializers.ChoiceField(choices=['payer', 'participant', 'category'], default='payer')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    currency = serializers.CharField(required=False, min_length=3, max_length=3)
+
+    def validate_currency(self, value):
+        return validate_currency_code(value)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['end'] < attrs['start']:
+            raise serializers.ValidationError("End date cannot be before start date.")
+        return attrs
+
+class SpendingBucketSerializer(serializers.Serializer):
+    """Serializes one aggregated spending bucket"""
+
+    period = serializers.DateField()
+    key = serializers.CharField(allow_null=True)
+    label = serializers.CharField(allow_null=True)
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    count = serializers.IntegerField()
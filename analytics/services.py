@@ -0,0 +1,284 @@
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum, Count, F
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from currencies.services import ExchangeRateService, converted, require_rates, CENT
+from expense.models import Expense, ExpenseParticipant
+from expense.services import equal_split_totals
+from groups.models import Group
+from groups.versioning import get_group_versions
+from .models import DailySpendRollup
+
+User = get_user_model()
+
+class SpendingRollupService:
+    """Keeps DailySpendRollup in step with expense writes"""
+
+    @staticmethod
+    def record(expense, shares, sign=1):
+        """Record one expense. `shares` is an iterable of (user_id, share) pairs."""
+        SpendingRollupService.record_many([(expense, shares, sign)])
+
+    @staticmethod
+    def record_many(items):
+        """
+        Apply a batch of expense changes to the rollup table.
+
+        `items` is an iterable of (expense, shares, sign) where sign is 1 for
+        an added expense and -1 for a removed one. All deltas for the batch
+        are merged first, so the cost is a handful of queries regardless of size.
+        Amounts are stored in each group's base currency.
+        """
+        items = list(items)
+        currencies = dict(
+            Group.objects.filter(id__in={expense.group_id for expense, _, _ in items})
+            .values_list('id', 'currency')
+        )
+        rates = ExchangeRateService()
+
+        deltas = defaultdict(lambda: [Decimal('0.00'), 0])  # key -> [amount, count]
+        for expense, shares, sign in items:
+            base = currencies[expense.group_id]
+
+            def to_base(amount):
+                return rates.convert(amount, expense.currency, base, expense.date)
+
+            paid = deltas[(expense.group_id, DailySpendRollup.KIND_PAID, expense.date, str(expense.paid_by_id))]
+            paid[0] += sign * to_base(expense.amount)
+            paid[1] += sign
+            for user_id, share in shares:
+                owed = deltas[(expense.group_id, DailySpendRollup.KIND_OWED, expense.date, str(user_id))]
+                owed[0] += sign * to_base(share)
+                owed[1] += sign
+
+        if not deltas:
+            return
+
+        # Make sure every row exists, then increment them all atomically
+        DailySpendRollup.objects.bulk_create(
+            [
+                DailySpendRollup(group_id=group_id, kind=kind, day=day, user_id=user_id)
+                for group_id, kind, day, user_id in deltas
+            ],
+            ignore_conflicts=True,
+        )
+
+        group_ids = {key[0] for key in deltas}
+        days = {key[2] for key in deltas}
+        rows = DailySpendRollup.objects.filter(group_id__in=group_ids, day__in=days)
+        to_update = []
+        for row in rows:
+            key = (row.group_id, row.kind, row.day, str(row.user_id))
+            if key not in deltas:
+                continue
+            amount, count = deltas[key]
+            row.amount = F('amount') + amount
+            row.expense_count = F('expense_count') + count
+            to_update.append(row)
+        DailySpendRollup.objects.bulk_update(to_update, ['amount', 'expense_count'])
+
+        # Days emptied by deletions should not linger in the table
+        rows.filter(expense_count__lte=0).delete()
+
+    @staticmethod
+    def rebuild(groups):
+        """Recompute the rollups of some groups from their expenses (backfill/repair)"""
+        require_rates(Expense.objects.filter(group__in=groups), 'currency', 'date', F('group__currency'))
+        DailySpendRollup.objects.filter(group__in=groups).delete()
+
+        rows = []
+        paid = (
+            Expense.objects.filter(group__in=groups)
+            .values('group_id', 'date', 'paid_by_id')
+            .annotate(
+                total=Sum(converted('amount', 'currency', 'date', F('group__currency'))),
+                count=Count('id'),
+            )
+        )
+        for row in paid:
+            rows.append(DailySpendRollup(
+                group_id=row['group_id'], kind=DailySpendRollup.KIND_PAID, day=row['date'],
+                user_id=row['paid_by_id'], amount=Decimal(row['total'] or 0).quantize(CENT),
+                expense_count=row['count'],
+            ))
+
+        owed = defaultdict(lambda: [Decimal('0'), 0])  # (group, day, user) -> [amount, count]
+        participant_rows = (
+            ExpenseParticipant.objects.filter(group__in=groups)
+            .values('group_id', 'expense__date', 'user_id')
+            .annotate(
+                total=Sum(converted('share', 'expense__currency', 'expense__date', F('group__currency'))),
+                count=Count('id'),
+            )
+        )
+        for row in participant_rows:
+            bucket = owed[(row['group_id'], row['expense__date'], row['user_id'])]
+            bucket[0] += row['total'] or 0
+            bucket[1] += row['count']
+
+        # Compact equal splits have no participant rows
+        expenses = Expense.objects.filter(group__in=groups)
+        for (group_id, day, user_id), (total, count) in equal_split_totals(expenses, by=('group', 'day')).items():
+            bucket = owed[(group_id, day, user_id)]
+            bucket[0] += total
+            bucket[1] += count
+
+        for (group_id, day, user_id), (total, count) in owed.items():
+            rows.append(DailySpendRollup(
+                group_id=group_id, kind=DailySpendRollup.KIND_OWED, day=day,
+                user_id=user_id, amount=Decimal(total).quantize(CENT), expense_count=count,
+            ))
+
+        DailySpendRollup.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+class SpendingAnalyticsService:
+    """
+    Aggregates spend per period in the database.
+
+    Short ranges are aggregated straight from Expense/ExpenseParticipant;
+    open-ended or long ranges read the DailySpendRollup table instead.
+    Totals are converted into `currency` inside the aggregate; a row with
+    no rate into it raises MissingRateError instead of being left out.
+    Results are cached under the change versions of the groups involved.
+    """
+
+    PERIODS = {
+        'month': TruncMonth,
+        'week': TruncWeek,
+    }
+    DIMENSIONS = ('payer', 'participant', 'category')
+
+    def __init__(self, groups, currency):
+        self.groups = list(groups)
+        self.currency = currency
+
+    def spending(self, period='month', by='payer', start=None, end=None):
+        if period not in self.PERIODS:
+            raise ValueError(f"Unknown period '{period}'.")
+        if by not in self.DIMENSIONS:
+            raise ValueError(f"Unknown grouping '{by}'.")
+
+        cache_key = self._cache_key(period, by, start, end)
+        result = cache.get(cache_key)
+        if result is None:
+            if self._use_rollups(start, end):
+                result = self._from_rollups(period, by, start, end)
+            else:
+                result = self._from_expenses(period, by, start, end)
+            cache.set(cache_key, result, getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 3600))
+        return result
+
+    def _use_rollups(self, start, end):
+        min_days = getattr(settings, 'ANALYTICS_ROLLUP_MIN_DAYS', 180)
+        if start is None or end is None:
+            return True
+        return end - start > timedelta(days=min_days)
+
+    def _cache_key(self, period, by, start, end):
+        group_ids = sorted(str(group.id) for group in self.groups)
+        versions = get_group_versions(group_ids)
+        raw = '|'.join(f"{group_id}:{versions[group_id]}" for group_id in group_ids)
+        digest = hashlib.sha1(raw.encode()).hexdigest()
+        return f"analytics:spending:{digest}:{self.currency}:{period}:{by}:{start}:{end}"
+
+    def _from_expenses(self, period, by, start, end):
+        trunc = self.PERIODS[period]
+
+        if by == 'participant':
+            queryset = ExpenseParticipant.objects.filter(group__in=self.groups)
+            currency_field, date_field = 'expense__currency', 'expense__date'
+        else:
+            queryset = Expense.objects.filter(group__in=self.groups)
+            currency_field, date_field = 'currency', 'date'
+
+        if start:
+            queryset = queryset.filter(**{f'{date_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{date_field}__lte': end})
+        require_rates(queryset, currency_field, date_field, self.currency)
+
+        queryset = queryset.annotate(period=trunc(date_field))
+        if by == 'payer':
+            rows = queryset.values('period', key=F('paid_by_id'), label=F('paid_by__email')).annotate(
+                total=Sum(converted('amount', 'currency', 'date', self.currency)), count=Count('id'))
+        elif by == 'participant':
+            rows = queryset.values('period', key=F('user_id'), label=F('user__email')).annotate(
+                total=Sum(converted('share', 'expense__currency', 'expense__date', self.currency)), count=Count('id'))
+            return self._serialize(self._add_equal_splits(rows.order_by(), period, start, end))
+        else:
+            rows = queryset.values('period', key=F('group__category_id'), label=F('group__category__name')).annotate(
+                total=Sum(converted('amount', 'currency', 'date', self.currency)), count=Count('id'))
+
+        return self._serialize(rows.order_by('period', 'key'))
+
+    def _add_equal_splits(self, rows, period, start, end):
+        """Merge compact equal splits, which have no participant rows, into participant buckets"""
+        buckets = {(row['period'], str(row['key'])): dict(row) for row in rows}
+
+        expenses = Expense.objects.filter(group__in=self.groups)
+        if start:
+            expenses = expenses.filter(date__gte=start)
+        if end:
+            expenses = expenses.filter(date__lte=end)
+        require_rates(expenses.filter(participant_ids__isnull=False), 'currency', 'date', self.currency)
+
+        for (bucket_period, user_id), (total, count) in equal_split_totals(expenses, self.currency, by=(period,)).items():
+            bucket = buckets.setdefault((bucket_period, str(user_id)), {
+                'period': bucket_period, 'key': user_id, 'label': None, 'total': Decimal('0'), 'count': 0,
+            })
+            bucket['total'] = (bucket['total'] or 0) + total
+            bucket['count'] += count
+
+        unlabelled = {bucket['key'] for bucket in buckets.values() if bucket['label'] is None}
+        if unlabelled:
+            emails = dict(User.objects.filter(id__in=unlabelled).values_list('id', 'email'))
+            for bucket in buckets.values():
+                if bucket['label'] is None:
+                    bucket['label'] = emails.get(bucket['key'])
+
+        return sorted(buckets.values(), key=lambda bucket: (bucket['period'], str(bucket['key'])))
+
+    def _from_rollups(self, period, by, start, end):
+        trunc = self.PERIODS[period]
+        kind = DailySpendRollup.KIND_OWED if by == 'participant' else DailySpendRollup.KIND_PAID
+
+        queryset = DailySpendRollup.objects.filter(group__in=self.groups, kind=kind)
+        if start:
+            queryset = queryset.filter(day__gte=start)
+        if end:
+            queryset = queryset.filter(day__lte=end)
+        require_rates(queryset, 'group__currency', 'day', self.currency)
+
+        queryset = queryset.annotate(period=trunc('day'))
+        if by == 'category':
+            rows = queryset.values('period', key=F('group__category_id'), label=F('group__category__name'))
+        else:
+            rows = queryset.values('period', key=F('user_id'), label=F('user__email'))
+        # Rollups are stored in each group's base currency
+        rows = rows.annotate(
+            total=Sum(converted('amount', 'group__currency', 'day', self.currency)),
+            count=Sum('expense_count'),
+        ).filter(count__gt=0)
+
+        return self._serialize(rows.order_by('period', 'key'))
+
+    def _serialize(self, rows):
+        return [
+            {
+                'period': row['period'],
+                'key': str(row['key']) if row['key'] is not None else None,
+                'label': row['label'],
+                'total': Decimal(row['total'] or 0).quantize(CENT),
+                'count': row['count'],
+            }
+            for row in rows
+        ]
@@ -0,0 +1,101 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from expense.models import Expense
+from expense.services import expense_shares
+from groups.models import Group
+from groups.versioning import bump_group_version
+from members.models import Membership
+from .models import DailySpendRollup
+from .services import SpendingAnalyticsService, SpendingRollupService
+
+
+class SpendingAnalyticsTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(2)
+        ]
+        self.group = Group.objects.create(name='Flat', created_by=self.alice)
+        for user in (self.alice, self.bob):
+            Membership.objects.create(user=user, group=self.group)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+        self.add_expense('30.00', '2026-01-01')
+        self.add_expense('10.00', '2026-01-05', paid_by=self.bob, shares=('2.50', '7.50'))
+        self.add_expense('12.00', '2026-03-10')
+
+    def add_expense(self, amount, day, paid_by=None, shares=None):
+        payload = {
+            'group': str(self.group.id), 'title': 'Shopping', 'amount': amount, 'date': day,
+            'paid_by': str((paid_by or self.alice).id), 'split_type': 'unequal' if shares else 'equal',
+            'participants': [
+                {'user_id': str(user.id), **({'share': share} if shares else {})}
+                for user, share in zip((self.alice, self.bob), shares or (None, None))
+            ],
+        }
+        response = self.client.post(f'/api/v1/groups/{self.group.id}/expenses/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def rollups(self):
+        return sorted(
+            DailySpendRollup.objects.filter(group=self.group)
+            .values_list('kind', 'day', 'user_id', 'amount', 'expense_count')
+        )
+
+    def spending(self, **params):
+        return SpendingAnalyticsService([self.group], 'USD').spending(**params)
+
+    def test_expense_writes_keep_rollups_equal_to_a_rebuild(self):
+        recorded = self.rollups()
+
+        SpendingRollupService.rebuild([self.group])
+
+        self.assertEqual(self.rollups(), recorded)
+        self.assertIn(('paid', date(2026, 1, 1), self.alice.id, Decimal('30.00'), 1), recorded)
+        self.assertIn(('owed', date(2026, 1, 5), self.bob.id, Decimal('7.50'), 1), recorded)
+
+    def test_removing_an_expense_drops_its_emptied_days(self):
+        expense = Expense.objects.get(date=date(2026, 3, 10))
+
+        SpendingRollupService.record_many([(expense, expense_shares(expense), -1)])
+
+        self.assertFalse(DailySpendRollup.objects.filter(day=date(2026, 3, 10)).exists())
+        self.assertEqual(DailySpendRollup.objects.filter(day=date(2026, 1, 1)).count(), 3)
+
+    @override_settings(ANALYTICS_ROLLUP_MIN_DAYS=30)
+    def test_short_ranges_read_expenses_and_long_ranges_read_rollups(self):
+        DailySpendRollup.objects.all().delete()
+        bump_group_version(self.group.id)
+
+        short = self.spending(start=date(2026, 1, 1), end=date(2026, 1, 31))
+        self.assertEqual(
+            {bucket['key']: bucket['total'] for bucket in short},
+            {str(self.alice.id): Decimal('30.00'), str(self.bob.id): Decimal('10.00')},
+        )
+        # Longer or open-ended ranges only see the (emptied) rollup table
+        self.assertEqual(self.spending(start=date(2026, 1, 1), end=date(2026, 3, 31)), [])
+        self.assertEqual(self.spending(), [])
+
+        SpendingRollupService.rebuild([self.group])
+        bump_group_version(self.group.id)
+
+        self.assertEqual(self.spending(end=date(2026, 1, 31)), short)
+        self.assertEqual(
+            self.spending(by='participant', end=date(2026, 1, 31)),
+            self.spending(by='participant', start=date(2026, 1, 1), end=date(2026, 1, 31)),
+        )
+
+    def test_cached_results_last_until_the_group_version_moves(self):
+        before = self.spending()
+
+        # Written without the on-commit version bump an expense write would add
+        DailySpendRollup.objects.filter(kind=DailySpendRollup.KIND_PAID).update(amount=0)
+        self.assertEqual(self.spending(), before)
+
+        bump_group_version(self.group.id)
+        self.assertEqual({bucket['total'] for bucket in self.spending()}, {Decimal('0.00')})
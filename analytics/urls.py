@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import SpendingAnalyticsView
+
+urlpatterns = [
+    path('spending/', SpendingAnalyticsView.as_view(), name='analytics-spending'),
+]
@@ -0,0 +1,63 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from drf_spectacular.utils import extend_schema
+
+from currencies.services import MissingRateError
+from groups.models import Group
+from members.models import Membership
+from .serializers import SpendingQuerySerializer, SpendingBucketSerializer
+from .services import SpendingAnalyticsService
+
+@extend_schema(tags=["Analytics"])
+class SpendingAnalyticsView(APIView):
+    """
+    Spend per week/month grouped by payer, participant or group category.
+    Scoped to one group when mounted under a group, otherwise to every
+    group the user belongs to.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_groups(self):
+        """Get the groups in scope and verify user access"""
+        group_id = self.kwargs.get('group_id')
+        if group_id is None:
+            return Group.objects.filter(memberships__user=self.request.user).select_related('category')
+
+        group = get_object_or_404(Group, id=group_id)
+        if not Membership.objects.filter(group=group, user=self.request.user).exists():
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("You are not a member of this group.")
+        return [group]
+
+    def get(self, request, *args, **kwargs):
+        query = SpendingQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        params = dict(query.validated_data)
+        groups = self.get_groups()
+
+        # Single groups report in their base currency by default
+        currency = params.pop('currency', None)
+        if currency is None:
+            currency = groups[0].currency if 'group_id' in self.kwargs else settings.DEFAULT_CURRENCY
+
+        service = SpendingAnalyticsService(groups, currency)
+        try:
+            buckets = service.spending(**params)
+        except MissingRateError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'success',
+            'message': 'Spending analytics retrieved successfully',
+            'currency': currency,
+            'data': SpendingBucketSerializer(buckets, many=True).data
+        })
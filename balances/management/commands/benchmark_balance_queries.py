@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from balances.services import BalanceCalculationService
+from groups.models import Group
+
+class Command(BaseCommand):
+    help = 'Show query plans and timings of the balance aggregates for a group'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='Group id (defaults to the group with the most expenses)')
+        parser.add_argument('--runs', type=int, default=5, help='Timed runs of calculate_all_balances')
+
+    def handle(self, *args, **options):
+        if options['group']:
+            group = Group.objects.filter(id=options['group']).first()
+        else:
+            group = Group.objects.annotate(n=Count('expenses')).order_by('-n').first()
+        if group is None:
+            raise CommandError('No group to benchmark.')
+
+        service = BalanceCalculationService(group)
+
+        # ANALYZE runs the query, so the plan shows index-only scans and heap fetches
+        explain = {}
+        if connection.vendor == 'postgresql':
+            explain = {'analyze': True, 'buffers': True}
+
+        self.stdout.write(f'Group {group.id} ({group.name}) on {connection.vendor}')
+        for label, queryset in (
+            ('Paid totals', service._paid_rows()),
+            ('Owed totals', service._owed_rows()),
+        ):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.explain(**explain))
+
+        timings = []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            BalanceCalculationService(group).calculate_all_balances()
+            timings.append(time.perf_counter() - started)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'calculate_all_balances: best {min(timings) * 1000:.1f} ms, '
+                f'mean {sum(timings) / len(timings) * 1000:.1f} ms over {len(timings)} runs'
+            )
+        )
@@ -0,0 +1,58 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from balances.services import BalanceCalculationService
+from balances.simplification import constrained_transfers
+
+class Command(BaseCommand):
+    help = 'Time the greedy and the constrained debt simplifiers on a synthetic group'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=400, help='Group size')
+        parser.add_argument('--expenses', type=int, default=2000, help='Expenses to generate')
+        parser.add_argument('--max-participants', type=int, default=6, help='Largest split per expense')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        members = list(range(options['members']))
+
+        # Random expenses; each links its payer to every participant
+        balances = dict.fromkeys(members, 0)
+        pairs = set()
+        for _ in range(options['expenses']):
+            payer = rng.choice(members)
+            participants = rng.sample(members, rng.randint(1, options['max_participants']))
+            amount = rng.randint(100, 50000)
+            base, extra = divmod(amount, len(participants))
+            balances[payer] += amount
+            for position, user in enumerate(participants):
+                balances[user] -= base + 1 if position < extra else base
+                pairs.add((payer, user))
+
+        self.stdout.write(
+            f"{options['members']} members, {options['expenses']} expenses, "
+            f"{len(pairs)} allowed pairs, {sum(1 for cents in balances.values() if cents)} unsettled"
+        )
+
+        started = time.perf_counter()
+        debtors = [(user, -cents) for user, cents in balances.items() if cents < 0]
+        creditors = [(user, cents) for user, cents in balances.items() if cents > 0]
+        greedy = BalanceCalculationService(None)._minimize_debts(debtors, creditors)
+        self._report('Greedy (any pair)', greedy, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        constrained, leftover = constrained_transfers(balances, pairs)
+        self._report('Min-cost flow (shared expenses)', constrained, time.perf_counter() - started)
+        if leftover:
+            self.stdout.write(self.style.WARNING(f'{len(leftover)} members had no allowed route'))
+
+    def _report(self, label, transfers, elapsed):
+        moved = sum(cents for _, _, cents in transfers)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{label}: {len(transfers)} transfers, {moved / 100:.2f} moved, {elapsed * 1000:.1f} ms'
+            )
+        )
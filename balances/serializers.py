@@ -56,6 +56,7 @@ class GroupBalanceSummarySerializer(serializers.Serializer):
     
     group_id = serializers.UUIDField()
     group_name = serializers.CharField()
+    currency = serializers.CharField()
     total_expenses = serializers.DecimalField(max_digits=12, decimal_places=2)
     total_members = serializers.IntegerField()
     settled_members = serializers.IntegerField()
@@ -1,9 +1,17 @@
-from django.db.models import Sum, Q
+from django.db.models import Sum, Q, F, Case, When, Value, DecimalField, BooleanField, ExpressionWrapper
+import uuid
 from decimal import Decimal
 from collections import defaultdict
+from django.contrib.auth import get_user_model
 from .models import Balance, DebtSummary
+from .simplification import constrained_transfers
 from expense.models import Expense, ExpenseParticipant
+from expense.services import equal_split_totals, to_cents, from_cents
+from groups.models import Group
 from members.models import Membership
+from currencies.services import converted, require_rates, CENT
+
+User = get_user_model()
 
 class BalanceCalculationService:
     """Service class for calculating and managing group balances"""
@@ -15,31 +23,29 @@ class BalanceCalculationService:
         """Calculate balances for all group members"""
         # Get all group members
         members = Membership.objects.filter(group=self.group).select_related('user')
+
+        # Two grouped aggregates for the whole group instead of two per member
+        paid_totals = self._paid_totals()
+        owed_totals = self._owed_totals()
         
         for membership in members:
-            self.calculate_user_balance(membership.user)
+            self.calculate_user_balance(membership.user, paid_totals, owed_totals)
             
         # After calculating individual balances, generate debt summary
         self.generate_debt_summary()
         
-    def calculate_user_balance(self, user):
+    def calculate_user_balance(self, user, paid_totals=None, owed_totals=None):
         """Calculate balance for a specific user in the group"""
         
         # Calculate total amount paid by user
-        total_paid = Expense.objects.filter(
-            group=self.group, 
-            paid_by=user
-        ).aggregate(
-            total=Sum('amount')
-        )['total'] or Decimal('0.00')
+        if paid_totals is None:
+            paid_totals = self._paid_totals(user)
+        total_paid = paid_totals.get(user.id, Decimal('0.00'))
         
         # Calculate total amount owed by user
-        total_owed = ExpenseParticipant.objects.filter(
-            expense__group=self.group,
-            user=user
-        ).aggregate(
-            total=Sum('share')
-        )['total'] or Decimal('0.00')
+        if owed_totals is None:
+            owed_totals = self._owed_totals(user)
+        total_owed = owed_totals.get(user.id, Decimal('0.00'))
         
         # Calculate net balance (positive = owed money, negative = owes money)
         net_balance = total_paid - total_owed
@@ -61,6 +67,148 @@ class BalanceCalculationService:
         
         return balance
         
+    def _has_foreign_currency(self):
+        """
+        Whether any expense in the group needs converting to the base currency.
+        Raises MissingRateError if one cannot be, rather than let Sum() skip it.
+        """
+        if not hasattr(self, '_foreign_currency'):
+            expenses = Expense.objects.filter(group=self.group)
+            self._foreign_currency = expenses.exclude(currency=self.group.currency).exists()
+            if self._foreign_currency:
+                require_rates(expenses, 'currency', 'date', self.group.currency)
+        return self._foreign_currency
+
+    def _paid_totals(self, user=None):
+        """Total paid per user id, in the group's base currency"""
+        totals = defaultdict(Decimal)
+        for row in self._paid_rows(user):
+            totals[row['paid_by_id']] += row['total']
+
+        # Paying a debt back counts as paying
+        for row in self._settlement_rows('payer', user):
+            totals[row['payer_id']] += row['total']
+
+        return {user_id: Decimal(total).quantize(CENT) for user_id, total in totals.items()}
+
+    def _owed_totals(self, user=None):
+        """Total owed per user id, in the group's base currency"""
+        totals = defaultdict(Decimal)
+        for row in self._owed_rows(user):
+            totals[row['user_id']] += row['total']
+
+        # Compact equal splits have no participant rows; they are summed per
+        # participant straight from the expenses
+        splits = equal_split_totals(Expense.objects.filter(group=self.group), self.group.currency)
+        for (user_id,), (total, _) in splits.items():
+            if user is None or user_id == user.id:
+                totals[user_id] += total
+
+        # Being paid back counts as owing the amount received
+        for row in self._settlement_rows('receiver', user):
+            totals[row['receiver_id']] += row['total']
+
+        return {user_id: Decimal(total).quantize(CENT) for user_id, total in totals.items()}
+
+    def _paid_rows(self, user=None):
+        expenses = Expense.objects.filter(group=self.group)
+        if user is not None:
+            expenses = expenses.filter(paid_by=user)
+
+        # Single-currency groups aggregate straight off the
+        # (group, paid_by) INCLUDE (amount) index
+        if self._has_foreign_currency():
+            amount = converted('amount', 'currency', 'date', self.group.currency)
+        else:
+            amount = F('amount')
+
+        return expenses.values('paid_by_id').annotate(total=Sum(amount)).order_by()
+
+    def _owed_rows(self, user=None):
+        """Grouped owed totals of the splits stored as ExpenseParticipant rows"""
+        # Filter on the denormalised group key, no join to Expense needed
+        participants = ExpenseParticipant.objects.filter(group=self.group)
+        if user is not None:
+            participants = participants.filter(user=user)
+
+        # Only foreign-currency groups need the expense's currency and date
+        if self._has_foreign_currency():
+            share = converted('share', 'expense__currency', 'expense__date', self.group.currency)
+        else:
+            share = F('share')
+
+        return participants.values('user_id').annotate(total=Sum(share)).order_by()
+
+    def _settlement_rows(self, side, user=None):
+        """Confirmed settlement totals per payer or receiver; settlements are in the base currency"""
+        from settlements.models import Settlement
+
+        settlements = Settlement.objects.filter(group=self.group, status='confirmed')
+        if user is not None:
+            settlements = settlements.filter(**{side: user})
+
+        return settlements.values(f'{side}_id').annotate(total=Sum('amount')).order_by()
+
+    def apply_deltas(self, paid, owed):
+        """
+        Apply paid/owed increments to the stored balances in one pass
+        instead of recomputing every member from scratch.
+
+        `paid` and `owed` map user ids to Decimal amounts. Used by batch
+        writers (recurring generation, imports) so a whole batch costs one
+        balance update per group.
+        """
+        # Callers may key by UUID or by string id
+        paid = {str(k): v for k, v in paid.items()}
+        owed = {str(k): v for k, v in owed.items()}
+        user_ids = set(paid) | set(owed)
+        if not user_ids:
+            return
+
+        existing = {
+            str(user_id) for user_id in
+            Balance.objects.filter(group=self.group, user_id__in=user_ids)
+            .values_list('user_id', flat=True)
+        }
+
+        # Members without a balance row yet start from the delta itself
+        new_balances = []
+        for user_id in user_ids:
+            if user_id in existing:
+                continue
+            total_paid = paid.get(user_id, Decimal('0.00'))
+            total_owed = owed.get(user_id, Decimal('0.00'))
+            new_balances.append(Balance(
+                user_id=user_id,
+                group=self.group,
+                total_paid=total_paid,
+                total_owed=total_owed,
+                net_balance=total_paid - total_owed,
+                is_settled=total_paid == total_owed,
+            ))
+        Balance.objects.bulk_create(new_balances)
+
+        if existing:
+            money = DecimalField(max_digits=12, decimal_places=2)
+
+            def delta(amounts):
+                return Case(
+                    *[When(user_id=u, then=Value(amounts.get(u, Decimal('0.00')))) for u in existing],
+                    default=Value(Decimal('0.00')),
+                    output_field=money,
+                )
+
+            net = {u: paid.get(u, Decimal('0.00')) - owed.get(u, Decimal('0.00')) for u in existing}
+            rows = Balance.objects.filter(group=self.group, user_id__in=existing)
+            rows.update(
+                total_paid=F('total_paid') + delta(paid),
+                total_owed=F('total_owed') + delta(owed),
+                net_balance=F('net_balance') + delta(net),
+            )
+            rows.update(is_settled=ExpressionWrapper(Q(net_balance=0), output_field=BooleanField()))
+
+        self.generate_debt_summary()
+
     def generate_debt_summary(self):
         """Generate simplified debt relationships using debt minimization algorithm"""
         
@@ -81,7 +229,10 @@ class BalanceCalculationService:
                 creditors.append((balance.user, balance.net_balance))
                 
         # Apply debt minimization algorithm
-        simplified_debts = self._minimize_debts(debtors, creditors)
+        if self.group.debt_simplification == Group.SIMPLIFY_SHARED_EXPENSES:
+            simplified_debts = self._constrained_debts(debtors, creditors)
+        else:
+            simplified_debts = self._minimize_debts(debtors, creditors)
         
         # Create DebtSummary records
         for debtor, creditor, amount in simplified_debts:
@@ -129,14 +280,69 @@ class BalanceCalculationService:
                 
         return simplified_debts
         
+    def _constrained_debts(self, debtors, creditors):
+        """
+        Simplify debts so members only pay those they shared an expense
+        or settled up with, as a minimum-cost flow over those pairs.
+        Returns list of (debtor, creditor, amount) tuples.
+        """
+        users = {user.id: user for user, _ in debtors + creditors}
+        balances = {user.id: -to_cents(amount) for user, amount in debtors}
+        balances.update({user.id: to_cents(amount) for user, amount in creditors})
+
+        pairs = self._allowed_pairs()
+        transfers, leftover = constrained_transfers(balances, pairs)
+
+        # Intermediaries with a zero balance have no Balance row loaded
+        missing = {key for payer, receiver, _ in transfers for key in (payer, receiver)} - set(users)
+        if missing:
+            users.update(User.objects.in_bulk(missing))
+
+        simplified_debts = [
+            (users[payer], users[receiver], from_cents(cents))
+            for payer, receiver, cents in transfers
+        ]
+
+        # Only conversion rounding can leave cents without an allowed route
+        simplified_debts += self._minimize_debts(
+            [(users[key], from_cents(-cents)) for key, cents in leftover.items() if cents < 0],
+            [(users[key], from_cents(cents)) for key, cents in leftover.items() if cents > 0],
+        )
+        return simplified_debts
+
+    def _allowed_pairs(self):
+        """(payer_id, user_id) pairs linked by an expense share or a confirmed settlement"""
+        from settlements.models import Settlement
+
+        pairs = set(
+            ExpenseParticipant.objects.filter(group=self.group)
+            .values_list('expense__paid_by_id', 'user_id').distinct()
+        )
+        compact = Expense.objects.filter(
+            group=self.group,
+            participant_ids__isnull=False
+        ).values_list('paid_by_id', 'participant_ids')
+        for paid_by_id, participant_ids in compact.iterator():
+            pairs.update((paid_by_id, uuid.UUID(user_id)) for user_id in participant_ids)
+        pairs.update(
+            Settlement.objects.filter(group=self.group, status='confirmed')
+            .values_list('payer_id', 'receiver_id').distinct()
+        )
+        return pairs
+
     def get_group_balance_summary(self):
         """Get complete balance summary for the group"""
         from expense.models import Expense
         
         # Calculate group statistics
+        if self._has_foreign_currency():
+            amount = converted('amount', 'currency', 'date', self.group.currency)
+        else:
+            amount = F('amount')
         total_expenses = Expense.objects.filter(group=self.group).aggregate(
-            total=Sum('amount')
+            total=Sum(amount)
         )['total'] or Decimal('0.00')
+        total_expenses = Decimal(total_expenses).quantize(CENT)
         
         balances = Balance.objects.filter(group=self.group).select_related('user')
         debt_summaries = DebtSummary.objects.filter(group=self.group).select_related('debtor', 'creditor')
@@ -153,6 +359,7 @@ class BalanceCalculationService:
         return {
             'group_id': self.group.id,
             'group_name': self.group.name,
+            'currency': self.group.currency,
             'total_expenses': total_expenses,
             'total_members': total_members,
             'settled_members': settled_members,
@@ -0,0 +1,187 @@
+"""
+Constrained debt simplification as a minimum-cost flow.
+
+Members are nodes and every pair allowed to pay each other is an
+uncapacitated arc in both directions costing 1 per cent moved. A source
+feeds each debtor what they owe and each creditor drains what they are
+owed into a sink. The cheapest maximum flow moves the least money in
+total: debts go straight to a creditor where the allowed pairs permit it
+and are routed through other members only where they don't.
+
+Finding the fewest transfers is NP-hard, so this minimises total flow;
+augmenting whole blocking flows keeps the number of transfers low too.
+"""
+import heapq
+
+
+class MinCostFlow:
+    """Primal-dual min-cost max-flow: Dijkstra with potentials, then a blocking flow per phase"""
+
+    def __init__(self, size):
+        self.size = size
+        self.graph = [[] for _ in range(size)]
+        self.to = []
+        self.cap = []
+        self.cost = []
+
+    def add_arc(self, u, v, cap, cost):
+        """Add an arc and its residual twin; returns the arc index"""
+        index = len(self.to)
+        self.to += [v, u]
+        self.cap += [cap, 0]
+        self.cost += [cost, -cost]
+        self.graph[u].append(index)
+        self.graph[v].append(index + 1)
+        return index
+
+    def flow(self, source, sink):
+        """Push the maximum flow at minimum cost; returns (flow, cost)"""
+        potential = [0] * self.size
+        total_flow = total_cost = 0
+        while True:
+            dist = self._distances(source, potential)
+            if dist[sink] is None:
+                return total_flow, total_cost
+            for node in range(self.size):
+                if dist[node] is not None:
+                    potential[node] += dist[node]
+
+            pushed = self._blocking_flow(source, sink, potential)
+            total_flow += pushed
+            total_cost += pushed * (potential[sink] - potential[source])
+
+    def _distances(self, source, potential):
+        """Shortest reduced-cost distances over the residual graph"""
+        dist = [None] * self.size
+        dist[source] = 0
+        heap = [(0, source)]
+        to, cap, cost, graph = self.to, self.cap, self.cost, self.graph
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            base = potential[u]
+            for arc in graph[u]:
+                if cap[arc] <= 0:
+                    continue
+                v = to[arc]
+                nd = d + cost[arc] + base - potential[v]
+                if dist[v] is None or nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return dist
+
+    def _blocking_flow(self, source, sink, potential):
+        """Dinic on the admissible arcs (zero reduced cost) of the current phase"""
+        to, cap, cost, graph = self.to, self.cap, self.cost, self.graph
+
+        def admissible(arc, u):
+            return cap[arc] > 0 and cost[arc] + potential[u] - potential[to[arc]] == 0
+
+        total = 0
+        while True:
+            # Level the admissible subgraph so a blocking flow cannot cycle
+            level = [-1] * self.size
+            level[source] = 0
+            queue = [source]
+            for u in queue:
+                for arc in graph[u]:
+                    v = to[arc]
+                    if level[v] < 0 and admissible(arc, u):
+                        level[v] = level[u] + 1
+                        queue.append(v)
+            if level[sink] < 0:
+                return total
+
+            # Iterative DFS with current-arc pointers; group paths can be long
+            pointer = [0] * self.size
+            while True:
+                path = []
+                u = source
+                while u != sink:
+                    arcs = graph[u]
+                    while pointer[u] < len(arcs):
+                        arc = arcs[pointer[u]]
+                        v = to[arc]
+                        if level[v] == level[u] + 1 and admissible(arc, u):
+                            break
+                        pointer[u] += 1
+                    else:
+                        if u == source:
+                            break
+                        # Dead end: drop it and retreat one arc
+                        level[u] = -1
+                        arc = path.pop()
+                        u = to[arc ^ 1]
+                        pointer[u] += 1
+                        continue
+                    path.append(arc)
+                    u = to[arc]
+                if u != sink:
+                    break
+
+                pushed = min(cap[arc] for arc in path)
+                for arc in path:
+                    cap[arc] -= pushed
+                    cap[arc ^ 1] += pushed
+                total += pushed
+
+
+def constrained_transfers(balances, allowed_pairs):
+    """
+    Simplify debts using only the allowed pairs.
+
+    `balances` maps a member key to their net balance in integer cents
+    (positive = is owed). `allowed_pairs` is an iterable of (a, b) keys
+    that may pay each other, in either direction. Returns (transfers,
+    leftover): transfers are (payer, receiver, cents) and leftover maps
+    members to the balance no allowed route could clear.
+    """
+    # Members whose balance is already zero can still pass money along
+    pairs = set()
+    for a, b in allowed_pairs:
+        if a != b:
+            pairs.add((a, b) if str(a) < str(b) else (b, a))
+    members = [key for key, cents in balances.items() if cents]
+    members += list({key for pair in pairs for key in pair} - set(members))
+    index = {key: position for position, key in enumerate(members)}
+    source, sink = len(members), len(members) + 1
+
+    network = MinCostFlow(len(members) + 2)
+    unbounded = sum(cents for cents in balances.values() if cents > 0)
+    for key, cents in balances.items():
+        if cents < 0:
+            network.add_arc(source, index[key], -cents, 0)
+        elif cents > 0:
+            network.add_arc(index[key], sink, cents, 0)
+
+    arcs = []
+    for a, b in pairs:
+        arcs.append((a, b, network.add_arc(index[a], index[b], unbounded, 1)))
+        arcs.append((b, a, network.add_arc(index[b], index[a], unbounded, 1)))
+
+    network.flow(source, sink)
+
+    # Opposite flows on a pair never both survive a min-cost solution,
+    # but net them anyway so each pair yields at most one transfer
+    net = {}
+    for a, b, arc in arcs:
+        moved = network.cap[arc ^ 1]
+        if moved:
+            key = (a, b) if str(a) < str(b) else (b, a)
+            net[key] = net.get(key, 0) + (moved if key == (a, b) else -moved)
+
+    transfers = []
+    cleared = dict.fromkeys(balances, 0)
+    for (a, b), moved in net.items():
+        payer, receiver = (a, b) if moved > 0 else (b, a)
+        transfers.append((payer, receiver, abs(moved)))
+        cleared[payer] = cleared.get(payer, 0) + abs(moved)
+        cleared[receiver] = cleared.get(receiver, 0) - abs(moved)
+
+    leftover = {
+        key: cents + cleared[key]
+        for key, cents in balances.items()
+        if cents + cleared[key]
+    }
+    return transfers, leftover
@@ -1,3 +1,176 @@
-from django.test import TestCase
+import random
+from collections import deque
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from groups.models import Group
+from members.models import Membership
+from settlements.models import Settlement
+from .models import Balance, DebtSummary
+from .services import BalanceCalculationService
+from .simplification import constrained_transfers
+
+
+def hops(pairs, start):
+    """Fewest allowed transfers from `start` to every reachable member"""
+    neighbours = {}
+    for a, b in pairs:
+        neighbours.setdefault(a, set()).add(b)
+        neighbours.setdefault(b, set()).add(a)
+    distance = {start: 0}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for other in neighbours.get(node, ()):
+            if other not in distance:
+                distance[other] = distance[node] + 1
+                queue.append(other)
+    return distance
+
+
+class ConstrainedTransfersTests(SimpleTestCase):
+    def assertClears(self, balances, pairs, transfers, leftover):
+        """Every transfer uses an allowed pair and the transfers sum back to the balances"""
+        allowed = {frozenset(pair) for pair in pairs}
+        remaining = dict(balances)
+        for payer, receiver, cents in transfers:
+            self.assertIn(frozenset((payer, receiver)), allowed)
+            self.assertGreater(cents, 0)
+            remaining[payer] = remaining.get(payer, 0) + cents
+            remaining[receiver] = remaining.get(receiver, 0) - cents
+        self.assertEqual({key: cents for key, cents in remaining.items() if cents}, leftover)
+
+    def test_direct_pairs_move_exactly_the_debts(self):
+        balances = {'a': -500, 'b': -300, 'c': 600, 'd': 200}
+        pairs = [(x, y) for x in balances for y in balances if x < y]
+
+        transfers, leftover = constrained_transfers(balances, pairs)
+
+        self.assertClears(balances, pairs, transfers, leftover)
+        self.assertEqual(leftover, {})
+        self.assertEqual(sum(cents for _, _, cents in transfers), 800)
+
+    def test_debt_is_routed_through_a_settled_member(self):
+        balances = {'a': -1000, 'b': 0, 'c': 1000}
+        pairs = [('a', 'b'), ('b', 'c')]
+
+        transfers, leftover = constrained_transfers(balances, pairs)
+
+        self.assertEqual(sorted(transfers), [('a', 'b', 1000), ('b', 'c', 1000)])
+        self.assertEqual(leftover, {})
+
+    def test_shortest_route_is_preferred(self):
+        balances = {'a': -700, 'b': 0, 'c': 0, 'd': 0, 'e': 700}
+        pairs = [('a', 'b'), ('b', 'e'), ('a', 'c'), ('c', 'd'), ('d', 'e')]
+
+        transfers, leftover = constrained_transfers(balances, pairs)
+
+        self.assertClears(balances, pairs, transfers, leftover)
+        self.assertEqual(sorted(transfers), [('a', 'b', 700), ('b', 'e', 700)])
+
+    def test_unreachable_balances_are_left_over(self):
+        balances = {'a': -400, 'b': 400, 'c': -250, 'd': 250}
+        pairs = [('a', 'b')]
+
+        transfers, leftover = constrained_transfers(balances, pairs)
+
+        self.assertEqual(transfers, [('a', 'b', 400)])
+        self.assertEqual(leftover, {'c': -250, 'd': 250})
+
+    def test_random_networks_are_zero_sum_and_optimal(self):
+        rng = random.Random(42)
+        for _ in range(200):
+            members = list(range(rng.randint(4, 7)))
+            rng.shuffle(members)
+            # A spanning path keeps everyone reachable, plus a few shortcuts
+            pairs = set(zip(members, members[1:]))
+            for _ in range(rng.randint(0, 4)):
+                a, b = rng.sample(members, 2)
+                pairs.add((a, b))
+
+            first, second = rng.randint(1, 50), rng.randint(1, 50)
+            third = rng.randint(1, first + second - 1)
+            debtors, creditors = members[:2], members[2:4]
+            balances = dict.fromkeys(members, 0)
+            balances.update({
+                debtors[0]: -first, debtors[1]: -second,
+                creditors[0]: third, creditors[1]: first + second - third,
+            })
+
+            transfers, leftover = constrained_transfers(balances, pairs)
+            self.assertClears(balances, pairs, transfers, leftover)
+            self.assertEqual(leftover, {})
+
+            # Two debtors and two creditors: every way of pairing them up is
+            # one number, so the cheapest plan can be found by trying them all
+            distance = {debtor: hops(pairs, debtor) for debtor in debtors}
+            best = min(
+                x * distance[debtors[0]][creditors[0]]
+                + (first - x) * distance[debtors[0]][creditors[1]]
+                + (third - x) * distance[debtors[1]][creditors[0]]
+                + (second - third + x) * distance[debtors[1]][creditors[1]]
+                for x in range(max(0, third - second), min(first, third) + 1)
+            )
+            self.assertEqual(sum(cents for _, _, cents in transfers), best)
+
+
+class SettledBalanceTests(TestCase):
+    def setUp(self):
+        self.payer, self.debtor, self.other = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(3)
+        ]
+        self.group = Group.objects.create(name='Flat', created_by=self.payer)
+        for user in (self.payer, self.debtor, self.other):
+            Membership.objects.create(user=user, group=self.group)
+
+        client = APIClient()
+        client.force_authenticate(self.payer)
+        response = client.post(f'/api/v1/groups/{self.group.id}/expenses/', {
+            'group': str(self.group.id), 'title': 'Rent', 'amount': '30.00', 'date': '2026-01-01',
+            'paid_by': str(self.payer.id), 'split_type': 'equal',
+            'participants': [{'user_id': str(u.id)} for u in (self.payer, self.debtor, self.other)],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def settle(self, amount, status):
+        Settlement.objects.create(
+            group=self.group, payer=self.debtor, receiver=self.payer, amount=Decimal(amount),
+            status=status, initiated_by=self.debtor,
+        )
+
+    def balance(self, user):
+        return Balance.objects.values_list('total_paid', 'total_owed', 'net_balance').get(group=self.group, user=user)
+
+    def test_confirmed_settlement_counts_as_paid_by_payer_and_owed_by_receiver(self):
+        self.settle('10.00', 'confirmed')
+
+        BalanceCalculationService(self.group).calculate_all_balances()
+
+        self.assertEqual(self.balance(self.debtor), (Decimal('10.00'), Decimal('10.00'), Decimal('0.00')))
+        self.assertEqual(self.balance(self.payer), (Decimal('30.00'), Decimal('20.00'), Decimal('10.00')))
+        self.assertEqual(
+            list(DebtSummary.objects.filter(group=self.group).values_list('debtor', 'creditor', 'amount')),
+            [(self.other.id, self.payer.id, Decimal('10.00'))],
+        )
+
+    def test_pending_and_rejected_settlements_leave_balances_alone(self):
+        self.settle('10.00', 'pending')
+        self.settle('10.00', 'rejected')
+
+        BalanceCalculationService(self.group).calculate_all_balances()
+
+        self.assertEqual(self.balance(self.debtor), (Decimal('0.00'), Decimal('10.00'), Decimal('-10.00')))
+        self.assertEqual(DebtSummary.objects.filter(group=self.group).count(), 2)
+
+    def test_single_user_totals_match_the_group_recompute(self):
+        self.settle('4.00', 'confirmed')
+        service = BalanceCalculationService(self.group)
+        service.calculate_all_balances()
+        expected = self.balance(self.debtor)
+
+        service.calculate_user_balance(self.debtor)
+
+        self.assertEqual(self.balance(self.debtor), expected)
@@ -0,0 +1,46 @@
+"""
+Small in-process background worker pool.
+
+Used for work that should not hold up a request (image processing,
+deferred flushes). Jobs run on a shared thread pool and manage their own
+database connections. With BACKGROUND_TASKS_EAGER set, jobs run inline,
+which keeps management commands and tests deterministic.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+            thread_name_prefix='background',
+        )
+    return _executor
+
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background job %s failed", getattr(fn, '__name__', fn))
+        raise
+    finally:
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the background pool"""
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        return fn(*args, **kwargs)
+    return _get_executor().submit(_run, fn, args, kwargs)
@@ -0,0 +1,50 @@
+"""
+In-process broadcast hub for live group updates.
+
+Writers call publish(group_id) from any thread once a change is
+committed; every stream subscribed to that group on this process is
+woken up straight away. The hub only carries wake-ups, not data:
+streams read what changed from the database themselves, and also poll
+on a timer, so changes made by other worker processes still arrive.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class EventHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # group id -> {(loop, queue)}
+
+    def subscribe(self, group_ids):
+        """Register the running event loop's queue for some groups; returns the queue"""
+        queue = asyncio.Queue()
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            for group_id in group_ids:
+                self._subscribers[str(group_id)].add(entry)
+        return queue
+
+    def unsubscribe(self, group_ids, queue):
+        with self._lock:
+            for group_id in group_ids:
+                subscribers = self._subscribers.get(str(group_id), set())
+                subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+                if not subscribers:
+                    self._subscribers.pop(str(group_id), None)
+
+    def publish(self, group_id, event):
+        """Wake every subscriber of a group; safe to call from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(group_id), ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it unsubscribes on its way out
+                pass
+
+
+hub = EventHub()
@@ -57,6 +57,9 @@ INSTALLED_APPS = [
     'balances',
     'settlements',
     'activities',
+    'analytics',
+    'currencies',
+    'idempotency',
     'drf_spectacular',
     'corsheaders',
 ]
@@ -164,6 +167,18 @@ DATABASES = {
     }
 }
 
+# Caches
+# Group change versions (groups/versioning.py) and cached analytics must be
+# shared by every worker process, so the default cache lives in the database.
+# Create its table once with: python manage.py createcachetable
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_entries',
+        'OPTIONS': {'MAX_ENTRIES': int(getenv('CACHE_MAX_ENTRIES', 100000))},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -218,3 +233,45 @@ EMAIL_HOST_USER     = getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = getenv('EMAIL_HOST_PASSWORD')     
 EMAIL_USE_TLS       = True                               
 DEFAULT_FROM_EMAIL  = 'no-reply@localhost'               
+
+
+# Background worker pool (config/background.py)
+BACKGROUND_WORKERS      = int(getenv('BACKGROUND_WORKERS', 2))
+BACKGROUND_TASKS_EAGER  = getenv('BACKGROUND_TASKS_EAGER', '') == 'True'
+
+
+# Activities
+# Write buffered activity rows on the background pool after commit
+ACTIVITY_FLUSH_IN_BACKGROUND = getenv('ACTIVITY_FLUSH_IN_BACKGROUND', '') == 'True'
+# Days of activity kept online (unset keeps it forever); groups can override.
+# Older rows are moved to gzipped JSONL files by the archive_activities command.
+ACTIVITY_RETENTION_DAYS = int(getenv('ACTIVITY_RETENTION_DAYS')) if getenv('ACTIVITY_RETENTION_DAYS') else None
+ACTIVITY_ARCHIVE_DIR    = getenv('ACTIVITY_ARCHIVE_DIR', str(BASE_DIR / 'archive' / 'activities'))
+# Live activity streams (activities/streams.py, ASGI only)
+ACTIVITY_STREAM_POLL_SECONDS = 5     # fallback poll for writes made by other workers (needs the shared CACHES)
+ACTIVITY_STREAM_MAX_SECONDS  = 300   # streams end and the client reconnects
+ACTIVITY_STREAM_RETRY_MS     = 3000
+
+
+# Receipts
+RECEIPT_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+RECEIPT_IMAGE_MAX_SIZE  = 2048   # px, longest side of the stored (EXIF-stripped) image
+RECEIPT_THUMBNAIL_SIZE  = 320    # px, longest side of the list thumbnail
+
+
+# Currencies
+# Reporting currency for cross-group views; each group has its own base currency
+DEFAULT_CURRENCY = getenv('DEFAULT_CURRENCY', 'USD')
+
+
+# Analytics
+# Ranges longer than this (and open-ended ranges) are served from the daily rollup table
+ANALYTICS_ROLLUP_MIN_DAYS = int(getenv('ANALYTICS_ROLLUP_MIN_DAYS', 180))
+ANALYTICS_CACHE_TIMEOUT   = int(getenv('ANALYTICS_CACHE_TIMEOUT', 3600))
+
+
+# Idempotency keys
+# Stored responses are replayed for this long (seconds); purge_idempotency_keys deletes the rest
+IDEMPOTENCY_KEY_TTL = int(getenv('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+# An unfinished claim older than this (seconds) is taken over by the next retry
+IDEMPOTENCY_LOCK_TIMEOUT = int(getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
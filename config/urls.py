@@ -9,6 +9,9 @@ urlpatterns = [
 
     path('api/v1/accounts/', include('accounts.urls')),
     path('api/v1/categories/', include('categories.urls')),
+    path('api/v1/analytics/', include('analytics.urls')),
+    path('api/v1/settlements/', include('settlements.user_urls')),
+    path('api/v1/activities/', include('activities.urls')),
 
     # FIXED: Put specific nested routes BEFORE general groups route
     path('api/v1/groups/<uuid:group_id>/members/', include('members.urls')),
@@ -17,6 +20,7 @@ urlpatterns = [
     path('api/v1/groups/<uuid:group_id>/balances/', include('balances.urls')),
     path('api/v1/groups/<uuid:group_id>/settlements/', include('settlements.urls')),
     path('api/v1/groups/<uuid:group_id>/activities/', include('activities.urls')),
+    path('api/v1/groups/<uuid:group_id>/analytics/', include('analytics.urls')),
     
     # General groups route comes LAST
     path('api/v1/groups/', include('groups.urls')),
@@ -0,0 +1,57 @@
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from currencies.models import ExchangeRate
+
+class Command(BaseCommand):
+    help = 'Load exchange rates from a CSV (date,base,quote,rate) or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a date,base,quote,rate header, or a JSON list of objects with those keys')
+        parser.add_argument('--no-inverse', action='store_true', help='Do not also store the inverse quote->base rates')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rates = {}
+        for row in self._read(options['path']):
+            try:
+                day = date.fromisoformat(row['date'])
+                base = row['base'].strip().upper()
+                quote = row['quote'].strip().upper()
+                rate = Decimal(str(row['rate']))
+            except (KeyError, ValueError, InvalidOperation) as e:
+                raise CommandError(f"Invalid rate row {row}: {e}")
+            if rate <= 0:
+                raise CommandError(f"Invalid rate row {row}: rate must be positive")
+
+            rates[(base, quote, day)] = rate
+            if not options['no_inverse']:
+                rates.setdefault((quote, base, day), (Decimal('1') / rate).quantize(Decimal('0.00000001')))
+
+        # Reloading a file updates rates in place
+        ExchangeRate.objects.bulk_create(
+            [
+                ExchangeRate(base_currency=base, quote_currency=quote, date=day, rate=rate)
+                for (base, quote, day), rate in rates.items()
+            ],
+            batch_size=options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['base_currency', 'quote_currency', 'date'],
+            update_fields=['rate'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Loaded {len(rates)} exchange rates')
+        )
+
+    def _read(self, path):
+        try:
+            with open(path, newline='') as f:
+                if path.endswith('.json'):
+                    return json.load(f)
+                return list(csv.DictReader(f))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
@@ -0,0 +1,27 @@
+import uuid
+from django.db import models
+
+class ExchangeRate(models.Model):
+    """
+    Daily exchange rate: 1 unit of base_currency = rate units of quote_currency.
+    The rate in force on a date is the latest one published on or before it.
+    """
+    id             = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    base_currency  = models.CharField(max_length=3)
+    quote_currency = models.CharField(max_length=3)
+    date           = models.DateField()
+    rate           = models.DecimalField(max_digits=18, decimal_places=8)
+    created_at     = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Also serves the (base, quote, date <= d) lookups used for conversion
+            models.UniqueConstraint(
+                fields=['base_currency', 'quote_currency', 'date'],
+                name='unique_exchange_rate_per_day'
+            )
+        ]
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"1 {self.base_currency} = {self.rate} {self.quote_currency} on {self.date}"
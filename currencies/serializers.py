@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+
+def validate_currency_code(value):
+    """Normalise a currency code to upper case; it must be three letters (ISO 4217)"""
+    value = value.upper()
+    if len(value) != 3 or not value.isalpha():
+        raise serializers.ValidationError("Currency must be a 3-letter ISO code.")
+    return value
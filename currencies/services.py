@@ -0,0 +1,108 @@
+from decimal import Decimal
+
+from django.db.models import Case, When, Value, Q, F, OuterRef, Subquery, DecimalField
+
+from .models import ExchangeRate
+
+CENT = Decimal('0.01')
+RATE_FIELD = DecimalField(max_digits=18, decimal_places=8)
+
+
+class MissingRateError(ValueError):
+    """Raised when an amount cannot be converted because no rate has been loaded"""
+
+
+def conversion_rate(currency_field, date_field, target):
+    """
+    SQL expression for the rate that converts a row's amount into `target`.
+
+    `currency_field` and `date_field` name the row's currency and date
+    (related lookups such as 'expense__currency' are fine). `target` is a
+    currency code or an F() expression naming a field that holds one.
+    Rows already in the target currency get 1 without touching the rate table;
+    the others join the latest rate published on or before the row's date.
+    """
+    same_currency = Q(**{currency_field: target})
+    quote = target if isinstance(target, str) else OuterRef(target.name)
+
+    latest = ExchangeRate.objects.filter(
+        base_currency=OuterRef(currency_field),
+        quote_currency=quote,
+        date__lte=OuterRef(date_field),
+    ).order_by('-date').values('rate')[:1]
+
+    return Case(
+        When(same_currency, then=Value(Decimal('1'))),
+        default=Subquery(latest),
+        output_field=RATE_FIELD,
+    )
+
+
+def converted(amount_field, currency_field, date_field, target):
+    """
+    `amount_field` converted into `target`, for use inside Sum().
+    Rows without a rate convert to NULL, which Sum() skips; call
+    require_rates() on the same rows first.
+    """
+    return F(amount_field) * conversion_rate(currency_field, date_field, target)
+
+
+def require_rates(queryset, currency_field, date_field, target):
+    """
+    Raise MissingRateError if any row of `queryset` has no rate into `target`.
+
+    Takes the same arguments as conversion_rate(). One query, which only
+    looks at rows in another currency.
+    """
+    missing = (
+        queryset.exclude(**{currency_field: target})
+        .annotate(missing_rate=conversion_rate(currency_field, date_field, target))
+        .filter(missing_rate__isnull=True)
+        .values_list(currency_field, date_field, Value(target) if isinstance(target, str) else target)
+        .first()
+    )
+    if missing is not None:
+        base, day, quote = missing
+        raise MissingRateError(f"No exchange rate from {base} to {quote} on {day}.")
+
+
+class ExchangeRateService:
+    """
+    Python-side rate lookups with an in-memory cache.
+
+    Create one per request (see for_request) or per batch job so repeated
+    lookups for the same currency pair and date hit the database once.
+    """
+
+    def __init__(self):
+        self._rates = {}
+
+    @classmethod
+    def for_request(cls, request):
+        """The rate cache bound to a request, created on first use"""
+        service = getattr(request, '_exchange_rates', None)
+        if service is None:
+            service = cls()
+            request._exchange_rates = service
+        return service
+
+    def rate(self, base, quote, on_date):
+        """Rate in force on a date, or None if no rate has been loaded"""
+        if base == quote:
+            return Decimal('1')
+
+        key = (base, quote, on_date)
+        if key not in self._rates:
+            self._rates[key] = ExchangeRate.objects.filter(
+                base_currency=base,
+                quote_currency=quote,
+                date__lte=on_date,
+            ).order_by('-date').values_list('rate', flat=True).first()
+        return self._rates[key]
+
+    def convert(self, amount, base, quote, on_date):
+        """Convert an amount, rounded to cents"""
+        rate = self.rate(base, quote, on_date)
+        if rate is None:
+            raise MissingRateError(f"No exchange rate from {base} to {quote} on {on_date}.")
+        return (Decimal(amount) * rate).quantize(CENT)
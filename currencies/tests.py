@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F, Sum
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from analytics.services import SpendingRollupService
+from balances.services import BalanceCalculationService
+from expense.models import Expense
+from groups.models import Group
+from members.models import Membership
+from .models import ExchangeRate
+from .services import ExchangeRateService, MissingRateError, converted, require_rates
+
+
+class ConversionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user, currency='USD')
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        ExchangeRate.objects.create(base_currency='EUR', quote_currency='USD', date=date(2026, 1, 1), rate=Decimal('1.10'))
+        ExchangeRate.objects.create(base_currency='EUR', quote_currency='USD', date=date(2026, 2, 1), rate=Decimal('1.20'))
+
+    def expense(self, amount, currency, day):
+        return Expense.objects.create(
+            group=self.group, title='Taxi', amount=Decimal(amount), currency=currency, date=day,
+            paid_by=self.user, split_type=Expense.SPLIT_EQUAL, participant_ids=[str(self.user.id)],
+        )
+
+    def total(self, target='USD'):
+        return Expense.objects.filter(group=self.group).aggregate(
+            total=Sum(converted('amount', 'currency', 'date', target))
+        )['total']
+
+    def test_amounts_use_the_latest_rate_on_or_before_their_date(self):
+        self.expense('10.00', 'USD', date(2026, 1, 15))
+        self.expense('10.00', 'EUR', date(2026, 1, 15))
+        self.expense('10.00', 'EUR', date(2026, 3, 1))
+
+        self.assertEqual(self.total(), Decimal('33.00'))
+
+        rates = ExchangeRateService()
+        self.assertEqual(rates.convert(Decimal('10.005'), 'EUR', 'USD', date(2026, 1, 31)), Decimal('11.01'))
+        self.assertEqual(rates.convert(Decimal('10.00'), 'USD', 'USD', date(1999, 1, 1)), Decimal('10.00'))
+
+    def test_missing_rates_fail_loudly(self):
+        self.expense('10.00', 'EUR', date(2025, 12, 31))
+        expenses = Expense.objects.filter(group=self.group)
+
+        # SUM would just skip the row
+        self.assertIsNone(self.total())
+        with self.assertRaisesMessage(MissingRateError, 'No exchange rate from EUR to USD on 2025-12-31.'):
+            require_rates(expenses, 'currency', 'date', 'USD')
+        with self.assertRaisesMessage(MissingRateError, 'No exchange rate from EUR to USD on 2025-12-31.'):
+            require_rates(expenses, 'currency', 'date', F('group__currency'))
+        with self.assertRaises(MissingRateError):
+            ExchangeRateService().convert(Decimal('10.00'), 'EUR', 'USD', date(2025, 12, 31))
+        with self.assertRaises(MissingRateError):
+            BalanceCalculationService(self.group).calculate_all_balances()
+
+    def test_rows_with_rates_pass_the_check(self):
+        self.expense('10.00', 'EUR', date(2026, 1, 1))
+        self.expense('10.00', 'USD', date(2020, 1, 1))
+
+        require_rates(Expense.objects.filter(group=self.group), 'currency', 'date', 'USD')
+
+    def test_analytics_in_a_currency_without_rates_is_rejected(self):
+        self.expense('10.00', 'USD', date(2026, 1, 15))
+        SpendingRollupService.rebuild([self.group])
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get(f'/api/v1/groups/{self.group.id}/analytics/spending/', {'currency': 'JPY'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JPY', response.data['message'])
+
+
+class LoadExchangeRatesTests(TestCase):
+    def write(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def rates(self):
+        return dict(
+            ((base, quote, day), rate) for base, quote, day, rate in
+            ExchangeRate.objects.values_list('base_currency', 'quote_currency', 'date', 'rate')
+        )
+
+    def test_csv_rows_load_with_inverse_rates(self):
+        path = self.write('.csv', 'date,base,quote,rate\n2026-01-01,eur,usd,1.25\n')
+
+        call_command('load_exchange_rates', path, stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(self.rates(), {
+            ('EUR', 'USD', date(2026, 1, 1)): Decimal('1.25'),
+            ('USD', 'EUR', date(2026, 1, 1)): Decimal('0.8'),
+        })
+
+    def test_json_reload_updates_rates_in_place(self):
+        ExchangeRate.objects.create(base_currency='GBP', quote_currency='USD', date=date(2026, 1, 1), rate=Decimal('1'))
+        path = self.write('.json', json.dumps([{'date': '2026-01-01', 'base': 'GBP', 'quote': 'USD', 'rate': '1.30'}]))
+
+        call_command('load_exchange_rates', path, '--no-inverse', stdout=open(os.devnull, 'w'))
+
+        self.assertEqual(self.rates(), {('GBP', 'USD', date(2026, 1, 1)): Decimal('1.3')})
+
+    def test_invalid_rows_abort_the_load(self):
+        path = self.write('.csv', 'date,base,quote,rate\n2026-01-01,EUR,USD,0\n')
+
+        with self.assertRaisesMessage(CommandError, 'rate must be positive'):
+            call_command('load_exchange_rates', path)
+        self.assertFalse(ExchangeRate.objects.exists())
@@ -1,6 +1,9 @@
 from django.contrib import admin
-from .models import Expense, ExpenseParticipant
+from .models import Expense, ExpenseParticipant, ExpenseItem, RecurringExpense, ExpenseReceipt
 
 # Register your models here.
 admin.site.register(Expense),
-admin.site.register(ExpenseParticipant)
\ No newline at end of file
+admin.site.register(ExpenseParticipant)
+admin.site.register(ExpenseItem)
+admin.site.register(RecurringExpense)
+admin.site.register(ExpenseReceipt)
@@ -0,0 +1,27 @@
+import hashlib
+from decimal import Decimal
+
+
+def normalise_title(title):
+    """Case-folded title with runs of whitespace collapsed"""
+    return ' '.join((title or '').casefold().split())
+
+
+def expense_fingerprint(group_id, paid_by_id, amount, currency, date, title, user_ids):
+    """
+    Content hash used to spot duplicate expenses.
+
+    Two expenses share a fingerprint when they are in the same group, paid
+    by the same user, for the same amount, currency and date, with the same
+    normalised title and the same set of participants.
+    """
+    parts = [
+        str(group_id),
+        str(paid_by_id),
+        str(Decimal(str(amount)).quantize(Decimal('0.01'))),
+        (currency or '').upper(),
+        str(date),
+        normalise_title(title),
+        ','.join(sorted({str(user_id) for user_id in user_ids})),
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
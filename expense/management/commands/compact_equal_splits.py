@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from expense.models import Expense, ExpenseParticipant
+from expense.services import to_cents
+
+class Command(BaseCommand):
+    help = 'Move equal-split expenses stored as participant rows to the compact representation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Expenses converted per transaction')
+
+    def handle(self, *args, **options):
+        pending = Expense.objects.filter(
+            split_type=Expense.SPLIT_EQUAL,
+            participant_ids__isnull=True,
+        ).order_by('id')
+
+        compacted = skipped = 0
+        last_id = None
+        while True:
+            batch = pending if last_id is None else pending.filter(id__gt=last_id)
+            expenses = list(batch.only('id', 'amount')[:options['batch_size']])
+            if not expenses:
+                break
+            last_id = expenses[-1].id
+
+            shares = defaultdict(list)
+            for expense_id, user_id, share in ExpenseParticipant.objects.filter(
+                expense__in=expenses
+            ).values_list('expense_id', 'user_id', 'share'):
+                shares[expense_id].append((user_id, share))
+
+            with transaction.atomic():
+                converted = []
+                for expense in expenses:
+                    participant_ids = self._participant_ids(expense.amount, shares[expense.id])
+                    if participant_ids is None:
+                        skipped += 1
+                        continue
+                    expense.participant_ids = participant_ids
+                    converted.append(expense)
+
+                Expense.objects.bulk_update(converted, ['participant_ids'])
+                ExpenseParticipant.objects.filter(expense__in=converted).delete()
+                compacted += len(converted)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Compacted {compacted} equal splits, skipped {skipped}')
+        )
+
+    def _participant_ids(self, amount, shares):
+        """
+        Order participants so the compact form reproduces the stored shares,
+        or None if the stored shares are not what an equal split gives.
+        """
+        if not shares:
+            return None
+        base, extra = divmod(to_cents(amount), len(shares))
+        ordered = sorted(shares, key=lambda pair: (-pair[1], str(pair[0])))
+        expected = [base + 1] * extra + [base] * (len(shares) - extra)
+        if [to_cents(share) for _, share in ordered] != expected:
+            return None
+        return [str(user_id) for user_id, _ in ordered]
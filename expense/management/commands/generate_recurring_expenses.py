@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from expense.services import RecurringExpenseService
+
+class Command(BaseCommand):
+    help = 'Materialise due recurring expense occurrences, catching up missed periods'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Generate as of this date (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--batch-size', type=int, default=500, help='Schedules locked and processed per transaction')
+        parser.add_argument('--max-catch-up', type=int, default=None, help='Occurrences one schedule may catch up per transaction')
+
+    def handle(self, *args, **options):
+        service = RecurringExpenseService(today=options['date'], batch_size=options['batch_size'], max_catch_up=options['max_catch_up'])
+        count = service.run()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Generated {count} recurring expenses')
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from expense.models import ExpenseReceipt
+from expense.services import ReceiptService
+
+class Command(BaseCommand):
+    help = 'Process receipts left pending (e.g. after a worker restart)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500)
+
+    def handle(self, *args, **options):
+        receipt_ids = list(
+            ExpenseReceipt.objects.filter(status=ExpenseReceipt.STATUS_PENDING)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:options['limit']]
+        )
+        for receipt_id in receipt_ids:
+            ReceiptService.process(receipt_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {len(receipt_ids)} pending receipts')
+        )
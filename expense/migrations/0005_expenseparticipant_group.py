@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expense', '0004_expensereceipt'),
+        ('groups', '0004_group_currency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expenseparticipant',
+            name='group',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='expense_participants', to='groups.group'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 5000
+
+
+def backfill_group(apps, schema_editor):
+    """Copy expense.group onto participant rows, one committed batch at a time"""
+    Expense = apps.get_model('expense', 'Expense')
+    ExpenseParticipant = apps.get_model('expense', 'ExpenseParticipant')
+
+    group_of_expense = Expense.objects.filter(id=OuterRef('expense_id')).values('group_id')[:1]
+    pending = ExpenseParticipant.objects.filter(group__isnull=True)
+    while True:
+        ids = list(pending.values_list('id', flat=True)[:BATCH_SIZE])
+        if not ids:
+            break
+        ExpenseParticipant.objects.filter(id__in=ids).update(group_id=Subquery(group_of_expense))
+
+
+class Migration(migrations.Migration):
+    # Batches commit separately so a large table is never locked in one transaction
+    atomic = False
+
+    dependencies = [
+        ('expense', '0005_expenseparticipant_group'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_group, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expense', '0006_backfill_expenseparticipant_group'),
+        ('groups', '0004_group_currency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expenseparticipant',
+            name='group',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expense_participants', to='groups.group'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['group', 'paid_by'], include=('amount', 'currency'), name='expense_paid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenseparticipant',
+            index=models.Index(fields=['group', 'user'], include=('share',), name='expense_participant_owed_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expense', '0007_expenseparticipant_group_not_null_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='participant_ids',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:30
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expense', '0008_expense_participant_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='split_type',
+            field=models.CharField(choices=[('equal', 'Equally'), ('unequal', 'Unequally'), ('percentage', 'Percentage'), ('itemized', 'Itemised')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ExpenseItem',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('position', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('split_type', models.CharField(choices=[('equal', 'Equally'), ('unequal', 'Unequally'), ('percentage', 'Percentage')], max_length=10)),
+                ('shares', models.JSONField(default=list)),
+                ('expense', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='expense.expense')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+from expense.fingerprints import expense_fingerprint
+
+BATCH_SIZE = 2000
+
+
+def backfill_fingerprint(apps, schema_editor):
+    """Fingerprint existing expenses, one committed batch at a time"""
+    Expense = apps.get_model('expense', 'Expense')
+    ExpenseParticipant = apps.get_model('expense', 'ExpenseParticipant')
+
+    pending = Expense.objects.filter(fingerprint='').order_by('id')
+    while True:
+        expenses = list(pending[:BATCH_SIZE])
+        if not expenses:
+            break
+
+        user_ids = defaultdict(list)
+        for expense_id, user_id in ExpenseParticipant.objects.filter(
+            expense__in=expenses
+        ).values_list('expense_id', 'user_id'):
+            user_ids[expense_id].append(user_id)
+
+        for expense in expenses:
+            expense.fingerprint = expense_fingerprint(
+                expense.group_id, expense.paid_by_id, expense.amount, expense.currency,
+                expense.date, expense.title, expense.participant_ids or user_ids[expense.id],
+            )
+        Expense.objects.bulk_update(expenses, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+    # Batches commit separately so a large table is never locked in one transaction
+    atomic = False
+
+    dependencies = [
+        ('expense', '0010_expense_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_fingerprint, migrations.RunPython.noop),
+    ]
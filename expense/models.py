@@ -1,6 +1,9 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.conf import settings
+import calendar
 import uuid
+from datetime import date, timedelta
 
 # Create your models here.
 User = settings.AUTH_USER_MODEL
@@ -9,6 +12,7 @@ class Expense(models.Model):
     SPLIT_EQUAL     = 'equal'
     SPLIT_UNEQUAL   = 'unequal'
     SPLIT_PERCENT   = 'percentage'
+    SPLIT_ITEMIZED  = 'itemized'
     SPLIT_CHOICES = [
         (SPLIT_EQUAL,     'Equally'),
         (SPLIT_UNEQUAL,   'Unequally'),
@@ -19,13 +23,38 @@ class Expense(models.Model):
     group       = models.ForeignKey('groups.Group', on_delete=models.CASCADE, related_name='expenses')
     title       = models.CharField(max_length=255)
     amount      = models.DecimalField(max_digits=10, decimal_places=2)
+    currency    = models.CharField(max_length=3, default='USD')
     date        = models.DateField()
     paid_by     = models.ForeignKey(User, on_delete=models.CASCADE, related_name='paid_expenses')
-    split_type  = models.CharField(max_length=10, choices=SPLIT_CHOICES)
+    # Itemised expenses split each ExpenseItem separately
+    split_type  = models.CharField(max_length=10, choices=SPLIT_CHOICES + [(SPLIT_ITEMIZED, 'Itemised')])
+    # Equal splits store their ordered participant ids here instead of
+    # ExpenseParticipant rows; shares are derived from the amount
+    participant_ids = models.JSONField(null=True, blank=True)
+    # Content hash of group, payer, amount, date, title and participants (see fingerprints.py)
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
     notes       = models.TextField(blank=True)
+    recurring   = models.ForeignKey('RecurringExpense', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences')
     created_at  = models.DateTimeField(auto_now_add=True)
     updated_at  = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # One materialised occurrence per schedule and date keeps generation idempotent
+            models.UniqueConstraint(
+                fields=['recurring', 'date'],
+                name='unique_recurring_occurrence'
+            )
+        ]
+        indexes = [
+            # Covers the per-payer totals of the balance calculation
+            models.Index(
+                fields=['group', 'paid_by'],
+                include=['amount', 'currency'],
+                name='expense_paid_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.amount}) in {self.group.name}"
 
@@ -33,12 +62,155 @@ class Expense(models.Model):
 class ExpenseParticipant(models.Model):
     id         = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     expense    = models.ForeignKey(Expense, on_delete=models.CASCADE, related_name='participants')
+    # Copy of expense.group so owed totals can be aggregated without joining Expense
+    group      = models.ForeignKey('groups.Group', on_delete=models.CASCADE, related_name='expense_participants')
     user       = models.ForeignKey(User, on_delete=models.CASCADE)
     share      = models.DecimalField(max_digits=10, decimal_places=2)
     percentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # for split_type = percentage
 
     class Meta:
         unique_together = ('expense', 'user')
+        indexes = [
+            # Covers the per-user owed totals of the balance calculation
+            models.Index(fields=['group', 'user'], include=['share'], name='expense_participant_owed_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.group_id is None:
+            self.group_id = self.expense.group_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.email} owes {self.share} for {self.expense.title}"
+
+
+class RecurringExpense(models.Model):
+    """
+    Schedule for an expense that repeats (rent, utilities, subscriptions).
+    Occurrences are materialised as ordinary Expense rows by the
+    generate_recurring_expenses command.
+    """
+    FREQ_DAILY   = 'daily'
+    FREQ_WEEKLY  = 'weekly'
+    FREQ_MONTHLY = 'monthly'
+    FREQ_YEARLY  = 'yearly'
+    FREQUENCY_CHOICES = [
+        (FREQ_DAILY,   'Daily'),
+        (FREQ_WEEKLY,  'Weekly'),
+        (FREQ_MONTHLY, 'Monthly'),
+        (FREQ_YEARLY,  'Yearly'),
+    ]
+
+    id          = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    group       = models.ForeignKey('groups.Group', on_delete=models.CASCADE, related_name='recurring_expenses')
+    title       = models.CharField(max_length=255)
+    amount      = models.DecimalField(max_digits=10, decimal_places=2)
+    currency    = models.CharField(max_length=3, default='USD')
+    paid_by     = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_expenses')
+    split_type  = models.CharField(max_length=10, choices=Expense.SPLIT_CHOICES)
+    notes       = models.TextField(blank=True)
+
+    # Participant template: [{"user_id": ..., "share": ..., "percentage": ...}]
+    participants = models.JSONField(default=list)
+
+    # Recurrence rule
+    frequency   = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval    = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+    start_date  = models.DateField()
+    end_date    = models.DateField(null=True, blank=True)
+
+    # Generation state: the next occurrence that has not been materialised yet
+    next_run_date        = models.DateField()
+    occurrences_created  = models.PositiveIntegerField(default=0)
+    is_active            = models.BooleanField(default=True)
+
+    created_by  = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_expenses_created')
+    created_at  = models.DateTimeField(auto_now_add=True)
+    updated_at  = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # An interval of 0 would repeat start_date forever
+            models.CheckConstraint(condition=models.Q(interval__gte=1), name='recurring_interval_positive'),
+        ]
+        indexes = [
+            # The scheduler only ever reads due, active schedules
+            models.Index(fields=['is_active', 'next_run_date'], name='recurring_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.amount}, {self.frequency}) in {self.group.name}"
+
+    def occurrence_date(self, n):
+        """Date of the n-th occurrence (0-based), always computed from start_date"""
+        step = n * self.interval
+        if self.frequency == self.FREQ_DAILY:
+            return self.start_date + timedelta(days=step)
+        if self.frequency == self.FREQ_WEEKLY:
+            return self.start_date + timedelta(weeks=step)
+
+        months = step * 12 if self.frequency == self.FREQ_YEARLY else step
+        month_index = self.start_date.month - 1 + months
+        year = self.start_date.year + month_index // 12
+        month = month_index % 12 + 1
+        # Clamp e.g. the 31st to the last day of shorter months
+        day = min(self.start_date.day, calendar.monthrange(year, month)[1])
+        return date(year, month, day)
+
+
+class ExpenseItem(models.Model):
+    """
+    Line item of an itemised expense with its own split.
+
+    The computed shares of every item are summed into the expense's
+    ExpenseParticipant rows, which remain what balances read.
+    """
+    id         = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    expense    = models.ForeignKey(Expense, on_delete=models.CASCADE, related_name='items')
+    position   = models.PositiveIntegerField()
+    title      = models.CharField(max_length=255)
+    amount     = models.DecimalField(max_digits=10, decimal_places=2)
+    split_type = models.CharField(max_length=10, choices=Expense.SPLIT_CHOICES)
+    shares     = models.JSONField(default=list)  # computed [{user_id, share, percentage}]
+
+    class Meta:
+        ordering = ['position']
+
+    def __str__(self):
+        return f"{self.title} ({self.amount}) on {self.expense.title}"
+
+
+class ExpenseReceipt(models.Model):
+    """
+    Receipt photo attached to an expense.
+
+    The upload is stored as-is and the request returns immediately; a
+    background job then strips EXIF, downsizes the image and renders a
+    thumbnail. Processed files get content-hashed names so they can be
+    served with long-lived cache headers.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_READY   = 'ready'
+    STATUS_FAILED  = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_READY,   'Ready'),
+        (STATUS_FAILED,  'Failed'),
+    ]
+
+    id           = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    expense      = models.ForeignKey(Expense, on_delete=models.CASCADE, related_name='receipts')
+    uploaded_by  = models.ForeignKey(User, on_delete=models.CASCADE, related_name='receipts')
+    image        = models.ImageField(upload_to='receipts/')
+    thumbnail    = models.ImageField(upload_to='receipts/thumbnails/', null=True, blank=True)
+    width        = models.PositiveIntegerField(null=True, blank=True)
+    height       = models.PositiveIntegerField(null=True, blank=True)
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Receipt {self.id} for {self.expense_id} ({self.status})"
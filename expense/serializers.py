@@ -1,7 +1,18 @@
 # Update your expense/serializers.py
 
 from rest_framework import serializers
-from .models import Expense, ExpenseParticipant
+from drf_spectacular.utils import extend_schema_field
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from .models import Expense, ExpenseParticipant, ExpenseItem, RecurringExpense, ExpenseReceipt
+from .services import ExpenseSplitService, SplitError, record_expense_changes, share_pairs, expense_shares, equal_shares
+from .fingerprints import expense_fingerprint
+from currencies.serializers import validate_currency_code
+from currencies.services import ExchangeRateService
+from django.db import transaction
 from django.utils import timezone
 
 class ExpenseParticipantSerializer(serializers.ModelSerializer):
@@ -17,93 +28,319 @@ class CreateExpenseParticipantSerializer(serializers.Serializer):
     share = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     percentage = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
 
+class ExpenseItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExpenseItem
+        fields = ['id', 'title', 'amount', 'split_type', 'shares']
+
+class CreateExpenseItemSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    split_type = serializers.ChoiceField(choices=Expense.SPLIT_CHOICES)
+    participants = CreateExpenseParticipantSerializer(many=True)
+
+class ExpenseReceiptSerializer(serializers.ModelSerializer):
+    image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExpenseReceipt
+        fields = ['id', 'status', 'width', 'height', 'image_url', 'thumbnail_url', 'created_at', 'processed_at']
+
+    def get_image_url(self, obj):
+        return self._file_url(obj, 'image')
+
+    def get_thumbnail_url(self, obj):
+        return self._file_url(obj, 'thumbnail')
+
+    def _file_url(self, obj, variant):
+        if obj.status != ExpenseReceipt.STATUS_READY:
+            return None
+        url = reverse('group-expenses-receipt-file', kwargs={
+            'group_id': obj.expense.group_id,
+            'id': obj.expense_id,
+            'receipt_id': obj.id,
+            'variant': variant,
+        })
+        # The content hash in the file name versions the URL for caching
+        version = os.path.splitext(os.path.basename(getattr(obj, variant).name))[0].rsplit('-', 1)[-1]
+        return f"{url}?v={version}"
+
+class UploadReceiptSerializer(serializers.Serializer):
+    image = serializers.FileField()
+
+    def validate_image(self, file):
+        if file.size > settings.RECEIPT_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError("Receipt must be no larger than 10 MB.")
+        ext = file.name.rsplit('.', 1)[-1].lower()
+        if ext not in ('jpg', 'jpeg', 'png', 'gif', 'webp'):
+            raise serializers.ValidationError("Receipt must be JPG, PNG, GIF or WEBP.")
+        return file
+
 class ExpenseSerializer(serializers.ModelSerializer):
     group_id = serializers.UUIDField(source='group.id', read_only=True)
     paid_by_id = serializers.UUIDField(source='paid_by.id', read_only=True)
-    participants = ExpenseParticipantSerializer(many=True, read_only=True)
+    participants = serializers.SerializerMethodField()
+    items = ExpenseItemSerializer(many=True, read_only=True)
+    receipts = ExpenseReceiptSerializer(many=True, read_only=True)
 
     class Meta:
         model = Expense
         fields = [
-            'id', 'group_id', 'title', 'amount', 'date', 'notes',
-            'paid_by_id', 'split_type', 'created_at', 'updated_at', 'participants'
+            'id', 'group_id', 'title', 'amount', 'currency', 'date', 'notes',
+            'paid_by_id', 'split_type', 'created_at', 'updated_at', 'participants',
+            'items', 'receipts'
         ]
 
+    @extend_schema_field(ExpenseParticipantSerializer(many=True))
+    def get_participants(self, obj):
+        if obj.participant_ids is None:
+            return ExpenseParticipantSerializer(obj.participants.all(), many=True).data
+
+        # Compact equal split: expand the shares from the amount
+        users = self._participant_users(obj.participant_ids)
+        return [
+            {
+                'id': None,
+                'user_id': user_id,
+                'email': users[user_id].email if user_id in users else None,
+                'share': str(share),
+                'percentage': None,
+            }
+            for user_id, share in equal_shares(obj.amount, obj.participant_ids)
+        ]
+
+    def _participant_users(self, user_ids):
+        """Users of compact splits, loaded once for a whole list response"""
+        users = self.root.__dict__.setdefault('_participant_users', {})
+        missing = set(user_ids) - users.keys()
+        if missing:
+            if isinstance(self.parent, serializers.ListSerializer) and self.parent.instance is not None:
+                for expense in self.parent.instance:
+                    missing.update(expense.participant_ids or [])
+                missing -= users.keys()
+            users.update(
+                (str(user.id), user) for user in get_user_model().objects.filter(id__in=missing)
+            )
+        return users
+
 class CreateExpenseSerializer(serializers.ModelSerializer):
-    participants = CreateExpenseParticipantSerializer(many=True, write_only=True)
+    participants = CreateExpenseParticipantSerializer(many=True, write_only=True, required=False)
+    items = CreateExpenseItemSerializer(many=True, write_only=True, required=False)
+    allow_duplicate = serializers.BooleanField(write_only=True, required=False, default=False)
 
     class Meta:
         model = Expense
         fields = [
-            'group', 'title', 'amount', 'date', 'notes',
-            'paid_by', 'split_type', 'participants'
+            'group', 'title', 'amount', 'currency', 'date', 'notes',
+            'paid_by', 'split_type', 'participants', 'items', 'allow_duplicate'
         ]
+        extra_kwargs = {
+            'amount': {'required': False},
+            'split_type': {'required': False},
+        }
+
+    def validate_currency(self, value):
+        return validate_currency_code(value)
 
     def validate(self, data):
-        split_type = data.get('split_type')
-        participants = self.initial_data.get('participants')
-        amount = data.get('amount')
+        items = data.get('items')
+        if items:
+            # Itemised: every line item is split on its own and the expense
+            # amount is the sum of the items
+            total = sum(item['amount'] for item in items)
+            if 'amount' in data and data['amount'] != total:
+                raise serializers.ValidationError({'amount': 'Amount must equal the sum of the items.'})
+            data['amount'] = total
+            data['split_type'] = Expense.SPLIT_ITEMIZED
 
-        if not participants:
+        split_type = data.get('split_type', getattr(self.instance, 'split_type', None))
+        amount = data.get('amount', getattr(self.instance, 'amount', None))
+        participants = data.get('participants')
+
+        if split_type is None:
+            raise serializers.ValidationError({'split_type': 'This field is required.'})
+        if amount is None:
+            raise serializers.ValidationError({'amount': 'This field is required.'})
+        if split_type == Expense.SPLIT_ITEMIZED and not items:
+            raise serializers.ValidationError({'items': 'Items required for an itemised expense.'})
+        if not items and not participants:
             raise serializers.ValidationError({'participants': 'Participants required.'})
 
-        if split_type == Expense.SPLIT_UNEQUAL:
-            total = sum([float(p['share']) for p in participants])
-            if round(total, 2) != float(amount):
-                raise serializers.ValidationError({'participants': 'Total shares must equal expense amount.'})
+        # Expenses default to the group's base currency and need a rate into it
+        group = data.get('group') or getattr(self.instance, 'group', None)
+        currency = data.get('currency') or getattr(self.instance, 'currency', None) or group.currency
+        data['currency'] = currency
+        expense_date = data.get('date', getattr(self.instance, 'date', None))
+        if currency != group.currency:
+            rates = ExchangeRateService.for_request(self.context['request'])
+            if rates.rate(currency, group.currency, expense_date) is None:
+                raise serializers.ValidationError(
+                    {'currency': f"No exchange rate from {currency} to {group.currency} on {expense_date}."}
+                )
+
+        # Shares are always computed server-side in integer cents
+        if items:
+            try:
+                data['item_shares'], data['participants'] = ExpenseSplitService.split_items(items)
+            except SplitError as e:
+                raise serializers.ValidationError({'items': str(e)})
+        else:
+            try:
+                data['participants'] = ExpenseSplitService.split(amount, split_type, participants)
+            except SplitError as e:
+                raise serializers.ValidationError({'participants': str(e)})
 
-        if split_type == Expense.SPLIT_PERCENT:
-            total = sum([float(p['percentage']) for p in participants])
-            if round(total, 2) != 100.0:
-                raise serializers.ValidationError({'participants': 'Percentages must sum to 100.'})
+        # Retried submissions are caught by an indexed fingerprint lookup;
+        # bulk imports check the whole batch at once instead
+        if not data.get('allow_duplicate') and not self.context.get('skip_duplicate_check'):
+            fingerprint = expense_fingerprint(
+                group.id,
+                data.get('paid_by', getattr(self.instance, 'paid_by', None)).id,
+                amount,
+                currency,
+                expense_date,
+                data.get('title', getattr(self.instance, 'title', None)),
+                [s['user_id'] for s in data['participants']],
+            )
+            duplicates = Expense.objects.filter(fingerprint=fingerprint)
+            if self.instance is not None:
+                # Edits that leave the content unchanged are not new duplicates
+                if self.instance.fingerprint == fingerprint:
+                    return data
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            duplicate_id = duplicates.values_list('id', flat=True).first()
+            if duplicate_id:
+                raise serializers.ValidationError({
+                    'duplicate': f"An identical expense already exists ({duplicate_id}). "
+                                 "Send allow_duplicate to save it anyway."
+                })
 
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
-        participants_data = self.initial_data.get('participants')
-        expense = Expense.objects.create(**validated_data)
-
-        for p in participants_data:
-            user_id = p['user_id']
-            share = p.get('share', 0)
-            percentage = p.get('percentage', None)
-            ExpenseParticipant.objects.create(
-                expense=expense,
-                user_id=user_id,
-                share=share,
-                percentage=percentage
-            )
+        shares = validated_data.pop('participants')
+        items = validated_data.pop('items', None) or []
+        item_shares = validated_data.pop('item_shares', [])
+        validated_data.pop('allow_duplicate', None)
+        expense = Expense(**validated_data)
+        participants = ExpenseSplitService.build_participants(expense, shares)
+        expense.save()
+        ExpenseItem.objects.bulk_create(ExpenseSplitService.build_items(expense, items, item_shares))
+        ExpenseParticipant.objects.bulk_create(participants)
+        record_expense_changes([(expense, share_pairs(shares), 1)])
         return expense
 
     # FIXED: Add explicit update method for nested fields
+    @transaction.atomic
     def update(self, instance, validated_data):
         # Remove participants from validated_data since we handle them separately
-        participants_data = self.initial_data.get('participants', [])
+        shares = validated_data.pop('participants')
+        items = validated_data.pop('items', None) or []
+        item_shares = validated_data.pop('item_shares', [])
+        validated_data.pop('allow_duplicate', None)
+
+        # Snapshot the old state so read models can be moved off it
+        previous = Expense(
+            group_id=instance.group_id,
+            date=instance.date,
+            paid_by_id=instance.paid_by_id,
+            amount=instance.amount,
+            currency=instance.currency,
+        )
+        previous_shares = expense_shares(instance)
         
         # Update basic expense fields
         instance.title = validated_data.get('title', instance.title)
         instance.amount = validated_data.get('amount', instance.amount)
+        instance.currency = validated_data.get('currency', instance.currency)
         instance.date = validated_data.get('date', instance.date)
         instance.notes = validated_data.get('notes', instance.notes)
         instance.paid_by = validated_data.get('paid_by', instance.paid_by)
         instance.split_type = validated_data.get('split_type', instance.split_type)
+
+        # Replace participants with the freshly computed shares
+        participants = ExpenseSplitService.build_participants(instance, shares)
         instance.save()
+        ExpenseParticipant.objects.filter(expense=instance).delete()
+        ExpenseParticipant.objects.bulk_create(participants)
+        ExpenseItem.objects.filter(expense=instance).delete()
+        ExpenseItem.objects.bulk_create(ExpenseSplitService.build_items(instance, items, item_shares))
+        record_expense_changes([
+            (previous, previous_shares, -1),
+            (instance, share_pairs(shares), 1),
+        ])
+
+        return instance
+
+
+class ImportExpensesSerializer(serializers.Serializer):
+    expenses = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=1000)
+
+
+class RecurringExpenseSerializer(serializers.ModelSerializer):
+    group_id = serializers.UUIDField(source='group.id', read_only=True)
+    participants = CreateExpenseParticipantSerializer(many=True)
+
+    class Meta:
+        model = RecurringExpense
+        fields = [
+            'id', 'group_id', 'title', 'amount', 'currency', 'paid_by', 'split_type', 'notes',
+            'participants', 'frequency', 'interval', 'start_date', 'end_date',
+            'next_run_date', 'is_active', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'next_run_date', 'created_at', 'updated_at']
+
+    def validate_currency(self, value):
+        return validate_currency_code(value)
 
-        # Handle participants update
-        if participants_data:
-            # Delete existing participants
-            ExpenseParticipant.objects.filter(expense=instance).delete()
-            
-            # Create new participants
-            for p in participants_data:
-                user_id = p['user_id']
-                share = p.get('share', 0)
-                percentage = p.get('percentage', None)
-                ExpenseParticipant.objects.create(
-                    expense=instance,
-                    user_id=user_id,
-                    share=share,
-                    percentage=percentage
+    def validate(self, data):
+        split_type = data.get('split_type', getattr(self.instance, 'split_type', None))
+        amount = data.get('amount', getattr(self.instance, 'amount', None))
+        participants = data.get('participants', getattr(self.instance, 'participants', None))
+
+        # Validate the template once here so generation never fails on it
+        try:
+            ExpenseSplitService.split(amount, split_type, participants)
+        except SplitError as e:
+            raise serializers.ValidationError({'participants': str(e)})
+
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if end_date and start_date and end_date < start_date:
+            raise serializers.ValidationError({'end_date': 'End date cannot be before start date.'})
+
+        # Generation needs a rate into the group's currency from the first occurrence on
+        group = self.instance.group if self.instance is not None else self.context['view'].get_group()
+        currency = data.get('currency', getattr(self.instance, 'currency', None)) or group.currency
+        data['currency'] = currency
+        if currency != group.currency:
+            rates = ExchangeRateService.for_request(self.context['request'])
+            if rates.rate(currency, group.currency, start_date) is None:
+                raise serializers.ValidationError(
+                    {'currency': f"No exchange rate from {currency} to {group.currency} on {start_date}."}
                 )
-        
-        return instance
\ No newline at end of file
+
+        if 'participants' in data:
+            # Store the template as plain JSON
+            data['participants'] = [
+                {
+                    'user_id': str(p['user_id']),
+                    'share': str(p['share']) if p.get('share') is not None else None,
+                    'percentage': str(p['percentage']) if p.get('percentage') is not None else None,
+                }
+                for p in data['participants']
+            ]
+        return data
+
+    def create(self, validated_data):
+        validated_data['next_run_date'] = validated_data['start_date']
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        # A new start date restarts the schedule from that date
+        if 'start_date' in validated_data and validated_data['start_date'] != instance.start_date:
+            instance.next_run_date = validated_data['start_date']
+            instance.occurrences_created = 0
+        return super().update(instance, validated_data)
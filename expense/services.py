@@ -0,0 +1,695 @@
+import hashlib
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+
+from config.background import submit
+from .fingerprints import expense_fingerprint
+from .models import Expense, ExpenseParticipant, ExpenseItem, RecurringExpense, ExpenseReceipt
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+
+class SplitError(ValueError):
+    """
+    Raised when participant shares cannot be computed for an expense.
+    Errors from a batch split carry the index of the failing row in `row`.
+    """
+
+    def __init__(self, message, row=None):
+        self.message = message
+        self.row = row
+        super().__init__(message if row is None else f"Row {row}: {message}")
+
+
+def to_cents(value):
+    """Convert a money value to an integer number of cents"""
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """Convert an integer number of cents back to a 2dp Decimal"""
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+def record_expense_changes(items):
+    """
+    Propagate expense writes to the read models built on top of them.
+
+    `items` is an iterable of (expense, shares, sign) where shares are
+    (user_id, share) pairs and sign is 1 for added and -1 for removed
+    expenses. Updates the daily spend rollups in the current transaction
+    and bumps the change version of each touched group once it commits.
+    """
+    from analytics.services import SpendingRollupService
+    from groups.versioning import bump_group_version
+
+    items = list(items)
+    if not items:
+        return
+    SpendingRollupService.record_many(items)
+    for group_id in {expense.group_id for expense, _, _ in items}:
+        transaction.on_commit(lambda group_id=group_id: bump_group_version(group_id))
+
+
+def apply_balance_deltas(items):
+    """
+    Move the stored balances by a batch of expense changes.
+
+    Takes the same (expense, shares, sign) items as record_expense_changes.
+    Deltas are converted into each group's base currency and applied with
+    one balance update per group.
+    """
+    from balances.services import BalanceCalculationService
+    from currencies.services import ExchangeRateService
+
+    rates = ExchangeRateService()
+    groups = {}
+    paid = defaultdict(lambda: defaultdict(Decimal))
+    owed = defaultdict(lambda: defaultdict(Decimal))
+    for expense, shares, sign in items:
+        group = expense.group
+        groups[group.id] = group
+        paid[group.id][str(expense.paid_by_id)] += sign * rates.convert(
+            expense.amount, expense.currency, group.currency, expense.date
+        )
+        for user_id, share in shares:
+            owed[group.id][str(user_id)] += sign * rates.convert(
+                share, expense.currency, group.currency, expense.date
+            )
+
+    for group_id, group in groups.items():
+        BalanceCalculationService(group).apply_deltas(paid[group_id], owed[group_id])
+
+
+def share_pairs(shares):
+    """(user_id, share) pairs from ExpenseSplitService output"""
+    return [(s['user_id'], s['share']) for s in shares]
+
+
+def equal_shares(amount, participant_ids):
+    """
+    (user_id, share) pairs of a compact equal split.
+
+    Matches ExpenseSplitService: every participant gets the floored share
+    and the leftover cents go to the earliest participants.
+    """
+    base, extra = divmod(to_cents(amount), len(participant_ids))
+    return [
+        (user_id, from_cents(base + 1 if position < extra else base))
+        for position, user_id in enumerate(participant_ids)
+    ]
+
+
+def expense_shares(expense):
+    """(user_id, share) pairs of a saved expense, whichever way its split is stored"""
+    if expense.participant_ids is not None:
+        return equal_shares(expense.amount, expense.participant_ids)
+    return [(p.user_id, p.share) for p in expense.participants.all()]
+
+
+def expand_equal_splits(expenses, *fields):
+    """
+    Yield (row, user_id, share) for the compact equal splits in a queryset.
+
+    Reads one row per expense rather than one per participant. `row` holds
+    amount, currency, date and any extra `fields` requested.
+    """
+    rows = expenses.filter(participant_ids__isnull=False).values(
+        'amount', 'currency', 'date', 'participant_ids', *fields
+    )
+    for row in rows.iterator():
+        for user_id, share in equal_shares(row['amount'], row['participant_ids']):
+            yield row, uuid.UUID(user_id), share
+
+
+# Grouping keys of equal_split_totals: SQL expression, and the same key
+# computed from an expanded row for backends without the SQL path
+EQUAL_SPLIT_KEYS = {
+    'group': ('e.group_id', lambda row: row['group_id']),
+    'day': ('e.date', lambda row: row['date']),
+    'week': ("date_trunc('week', e.date)::date", lambda row: row['date'] - timedelta(days=row['date'].weekday())),
+    'month': ("date_trunc('month', e.date)::date", lambda row: row['date'].replace(day=1)),
+}
+
+
+def equal_split_totals(expenses, target=None, by=()):
+    """
+    Owed totals of the compact equal splits in a queryset, per participant.
+
+    Shares are converted into `target`, a currency code, or into each
+    expense's group currency when it is None. `by` names extra grouping
+    keys out of EQUAL_SPLIT_KEYS. Returns {(*keys, user_id): [total, count]}
+    with UUID user ids. On PostgreSQL the participant arrays are unnested
+    and summed in SQL, so no per-participant rows reach Python; other
+    backends expand each expense here instead. Shares without a rate into
+    the target count as 0, like converted() in SQL.
+    """
+    from currencies.services import ExchangeRateService
+
+    expenses = expenses.filter(participant_ids__isnull=False)
+    if connections[expenses.db].vendor == 'postgresql':
+        return _equal_split_totals_sql(expenses, target, by)
+
+    rates = ExchangeRateService()
+    totals = defaultdict(lambda: [Decimal('0'), 0])
+    fields = ['group_id', 'group__currency'] if target is None else ['group_id']
+    for row, user_id, share in expand_equal_splits(expenses, *fields):
+        quote = target or row['group__currency']
+        key = tuple(EQUAL_SPLIT_KEYS[name][1](row) for name in by) + (user_id,)
+        totals[key][0] += share * (rates.rate(row['currency'], quote, row['date']) or 0)
+        totals[key][1] += 1
+    return dict(totals)
+
+
+def _equal_split_totals_sql(expenses, target, by):
+    from currencies.models import ExchangeRate
+    from groups.models import Group
+
+    connection = connections[expenses.db]
+    quote = connection.ops.quote_name
+    keys = [EQUAL_SPLIT_KEYS[name][0] for name in by]
+    selected, selected_params = expenses.values('id').query.sql_with_params()
+
+    if target is None:
+        target_sql, target_params = 'g.currency', []
+    else:
+        target_sql, target_params = '%s', [target]
+
+    # Same rounding as equal_shares: floored cents, and the leftover cents
+    # to the first participants (ordinality is 1-based)
+    sql = f"""
+        SELECT {''.join(key + ', ' for key in keys)}p.user_id,
+            SUM(
+                (
+                    (e.amount * 100)::bigint / jsonb_array_length(e.participant_ids)
+                    + CASE WHEN p.seq <= (e.amount * 100)::bigint %% jsonb_array_length(e.participant_ids)
+                           THEN 1 ELSE 0 END
+                )
+                * CASE WHEN e.currency = {target_sql} THEN 1 ELSE (
+                    SELECT r.rate FROM {quote(ExchangeRate._meta.db_table)} r
+                    WHERE r.base_currency = e.currency AND r.quote_currency = {target_sql} AND r.date <= e.date
+                    ORDER BY r.date DESC LIMIT 1
+                ) END
+            ) / 100,
+            COUNT(*)
+        FROM {quote(Expense._meta.db_table)} e
+        JOIN {quote(Group._meta.db_table)} g ON g.id = e.group_id
+        CROSS JOIN LATERAL jsonb_array_elements_text(e.participant_ids) WITH ORDINALITY AS p(user_id, seq)
+        WHERE e.id IN ({selected})
+        GROUP BY {''.join(key + ', ' for key in keys)}p.user_id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, target_params * 2 + list(selected_params))
+        return {
+            tuple(row[:-3]) + (uuid.UUID(row[-3]),): [row[-2] or Decimal('0'), row[-1]]
+            for row in cursor.fetchall()
+        }
+
+
+class ExpenseSplitService:
+    """
+    Computes participant shares server-side in integer cents.
+
+    Every split type is reduced to integer weights over a common denominator:
+    equal splits weigh each participant 1/n, percentage splits use basis points
+    over 10000 and unequal splits use the submitted cents over the amount.
+    Shares are floored and the leftover cents go to the largest remainders,
+    so the shares of an expense always add up exactly to its amount.
+    """
+
+    @staticmethod
+    def split(amount, split_type, participants):
+        """Split a single expense. Returns a list of participant share dicts."""
+        try:
+            return ExpenseSplitService.split_many([(amount, split_type, participants)])[0]
+        except SplitError as e:
+            # A single split has no batch position to report
+            raise SplitError(e.message) from e
+
+    @staticmethod
+    def split_many(rows):
+        """
+        Split a batch of expenses in one pass.
+
+        `rows` is an iterable of (amount, split_type, participants) where each
+        participant is a dict with `user_id` and, depending on the split type,
+        `share` or `percentage`. Returns one list of
+        {'user_id', 'share', 'percentage'} dicts per row, in input order.
+        """
+        # Flatten the whole batch into parallel arrays so the rounding step
+        # is a single sort over every participant instead of a loop per expense
+        totals = []        # amount in cents, per row
+        denominators = []  # weight denominator, per row
+        offsets = []       # start index into the flat arrays, per row
+        owners = []        # row index, per participant
+        user_ids = []
+        weights = []
+        percentages = []
+
+        for index, (amount, split_type, participants) in enumerate(rows):
+            participants = list(participants or [])
+            if not participants:
+                raise SplitError("Participants required.", row=index)
+
+            seen = set()
+            for p in participants:
+                user_id = str(p['user_id'])
+                if user_id in seen:
+                    raise SplitError("Each participant may only appear once.", row=index)
+                seen.add(user_id)
+
+            total = to_cents(amount)
+            if total <= 0:
+                raise SplitError("Expense amount must be positive.", row=index)
+
+            if split_type == Expense.SPLIT_EQUAL:
+                row_weights = [1] * len(participants)
+                row_percentages = [None] * len(participants)
+                denominator = len(participants)
+
+            elif split_type == Expense.SPLIT_UNEQUAL:
+                try:
+                    row_weights = [to_cents(p['share']) for p in participants]
+                except (KeyError, TypeError, ArithmeticError):
+                    raise SplitError("Every participant needs a share.", row=index)
+                if any(w < 0 for w in row_weights):
+                    raise SplitError("Shares cannot be negative.", row=index)
+                if sum(row_weights) != total:
+                    raise SplitError("Total shares must equal expense amount.", row=index)
+                row_percentages = [None] * len(participants)
+                denominator = total
+
+            elif split_type == Expense.SPLIT_PERCENT:
+                try:
+                    row_weights = [to_cents(p['percentage']) for p in participants]
+                except (KeyError, TypeError, ArithmeticError):
+                    raise SplitError("Every participant needs a percentage.", row=index)
+                if any(w < 0 for w in row_weights):
+                    raise SplitError("Percentages cannot be negative.", row=index)
+                if sum(row_weights) != 10000:
+                    raise SplitError("Percentages must sum to 100.", row=index)
+                row_percentages = [from_cents(w) for w in row_weights]
+                denominator = 10000
+
+            else:
+                raise SplitError(f"Unknown split type '{split_type}'.", row=index)
+
+            totals.append(total)
+            denominators.append(denominator)
+            offsets.append(len(weights))
+            owners.extend([index] * len(participants))
+            user_ids.extend(p['user_id'] for p in participants)
+            weights.extend(row_weights)
+            percentages.extend(row_percentages)
+
+        # Floor every share and keep the remainder for the rounding pass
+        shares = []
+        remainders = []
+        for owner, weight in zip(owners, weights):
+            quotient, remainder = divmod(totals[owner] * weight, denominators[owner])
+            shares.append(quotient)
+            remainders.append(remainder)
+
+        leftovers = list(totals)
+        for owner, share in zip(owners, shares):
+            leftovers[owner] -= share
+
+        # Largest remainder first, earlier participants win ties
+        order = sorted(range(len(shares)), key=lambda i: (owners[i], -remainders[i], i))
+        for i in order:
+            owner = owners[i]
+            if leftovers[owner]:
+                shares[i] += 1
+                leftovers[owner] -= 1
+
+        results = []
+        for index, start in enumerate(offsets):
+            end = offsets[index + 1] if index + 1 < len(offsets) else len(shares)
+            results.append([
+                {
+                    'user_id': user_ids[i],
+                    'share': from_cents(shares[i]),
+                    'percentage': percentages[i],
+                }
+                for i in range(start, end)
+            ])
+        return results
+
+    @staticmethod
+    def split_items(items):
+        """
+        Split every line item of an itemised expense in one engine pass.
+
+        `items` is a list of dicts with amount, split_type and participants.
+        Returns (item_shares, shares): the computed shares of each item and
+        the per-user totals across all items, which add up to the item total.
+        """
+        try:
+            item_shares = ExpenseSplitService.split_many(
+                (item['amount'], item['split_type'], item['participants']) for item in items
+            )
+        except SplitError as e:
+            raise SplitError(f"Item {e.row}: {e.message}") from e
+
+        totals = {}  # str(user_id) -> [user_id, cents]
+        for shares in item_shares:
+            for s in shares:
+                total = totals.setdefault(str(s['user_id']), [s['user_id'], 0])
+                total[1] += to_cents(s['share'])
+
+        shares = [
+            {'user_id': user_id, 'share': from_cents(cents), 'percentage': None}
+            for user_id, cents in totals.values()
+        ]
+        return item_shares, shares
+
+    @staticmethod
+    def build_items(expense, items, item_shares):
+        """Build unsaved ExpenseItem rows from the items and their computed shares"""
+        return [
+            ExpenseItem(
+                expense=expense,
+                position=position,
+                title=item['title'],
+                amount=item['amount'],
+                split_type=item['split_type'],
+                shares=[
+                    {
+                        'user_id': str(s['user_id']),
+                        'share': str(s['share']),
+                        'percentage': str(s['percentage']) if s['percentage'] is not None else None,
+                    }
+                    for s in shares
+                ],
+            )
+            for position, (item, shares) in enumerate(zip(items, item_shares))
+        ]
+
+    @staticmethod
+    def build_participants(expense, shares):
+        """
+        Attach computed shares to an expense before it is saved.
+
+        Equal splits are kept compactly in expense.participant_ids and need
+        no rows; other splits return unsaved ExpenseParticipant rows. Also
+        stamps the expense's duplicate fingerprint.
+        """
+        expense.fingerprint = expense_fingerprint(
+            expense.group_id, expense.paid_by_id, expense.amount, expense.currency,
+            expense.date, expense.title, [s['user_id'] for s in shares],
+        )
+
+        if expense.split_type == Expense.SPLIT_EQUAL:
+            expense.participant_ids = [str(s['user_id']) for s in shares]
+            return []
+
+        expense.participant_ids = None
+        return [
+            ExpenseParticipant(
+                expense=expense,
+                group_id=expense.group_id,
+                user_id=s['user_id'],
+                share=s['share'],
+                percentage=s['percentage'],
+            )
+            for s in shares
+        ]
+
+
+class RecurringExpenseService:
+    """Materialises due RecurringExpense occurrences as ordinary expenses"""
+
+    # Occurrences one schedule may catch up per transaction; a schedule
+    # further behind carries on in the next batch
+    max_catch_up = 100
+
+    def __init__(self, today=None, batch_size=500, max_catch_up=None):
+        self.today = today or timezone.localdate()
+        self.batch_size = batch_size
+        if max_catch_up is not None:
+            self.max_catch_up = max_catch_up
+
+    def due_schedules(self):
+        """Active schedules whose next occurrence is due (served by recurring_due_idx)"""
+        return RecurringExpense.objects.filter(
+            is_active=True,
+            next_run_date__lte=self.today
+        ).order_by('next_run_date')
+
+    def run(self):
+        """Generate every due occurrence, one locked batch of schedules at a time"""
+        created = 0
+        while True:
+            batch_created, schedules_seen, behind = self._run_batch()
+            created += batch_created
+            if schedules_seen < self.batch_size and not behind:
+                return created
+
+    def _run_batch(self):
+        with transaction.atomic():
+            schedules = list(
+                self.due_schedules()
+                .select_for_update(skip_locked=True)
+                .select_related('group', 'created_by')[:self.batch_size]
+            )
+            if not schedules:
+                return 0, 0, False
+
+            # A schedule with no rate into its group's currency would fail the
+            # whole batch on every run; park it for its owner instead. Rates
+            # apply from their date on, so the first pending date is enough.
+            from currencies.services import ExchangeRateService
+            rates = ExchangeRateService()
+            for schedule in schedules:
+                group_currency = schedule.group.currency
+                if rates.rate(schedule.currency, group_currency, schedule.next_run_date) is None:
+                    logger.warning(
+                        "Deactivating recurring expense %s: no exchange rate from %s to %s on %s",
+                        schedule.id, schedule.currency, group_currency, schedule.next_run_date,
+                    )
+                    schedule.is_active = False
+
+            # Collect every missed occurrence, not just the latest one
+            occurrences = []  # (schedule, date)
+            behind = False
+            for schedule in schedules:
+                if not schedule.is_active:
+                    continue
+                n = schedule.occurrences_created
+                run_date = schedule.next_run_date
+                caught_up = 0
+                while run_date <= self.today and (schedule.end_date is None or run_date <= schedule.end_date):
+                    if caught_up == self.max_catch_up:
+                        behind = True
+                        break
+                    occurrences.append((schedule, run_date))
+                    caught_up += 1
+                    n += 1
+                    run_date = schedule.occurrence_date(n)
+
+                schedule.occurrences_created = n
+                schedule.next_run_date = run_date
+                if schedule.end_date is not None and run_date > schedule.end_date:
+                    schedule.is_active = False
+
+            # Skip occurrences that already exist so reruns are idempotent
+            existing = set(
+                Expense.objects.filter(
+                    recurring__in=schedules,
+                    date__in={run_date for _, run_date in occurrences}
+                ).values_list('recurring_id', 'date')
+            )
+            occurrences = [
+                (schedule, run_date) for schedule, run_date in occurrences
+                if (schedule.id, run_date) not in existing
+            ]
+
+            shares = ExpenseSplitService.split_many(
+                (schedule.amount, schedule.split_type, schedule.participants)
+                for schedule, _ in occurrences
+            )
+
+            expenses = []
+            participants = []
+            for (schedule, run_date), expense_shares in zip(occurrences, shares):
+                expense = Expense(
+                    group=schedule.group,
+                    title=schedule.title,
+                    amount=schedule.amount,
+                    date=run_date,
+                    paid_by_id=schedule.paid_by_id,
+                    split_type=schedule.split_type,
+                    notes=schedule.notes,
+                    currency=schedule.currency,
+                    recurring=schedule,
+                )
+                expenses.append(expense)
+                participants.extend(ExpenseSplitService.build_participants(expense, expense_shares))
+
+            Expense.objects.bulk_create(expenses)
+            ExpenseParticipant.objects.bulk_create(participants)
+            changes = [
+                (expense, share_pairs(expense_shares), 1)
+                for expense, expense_shares in zip(expenses, shares)
+            ]
+            record_expense_changes(changes)
+            RecurringExpense.objects.bulk_update(
+                schedules, ['next_run_date', 'occurrences_created', 'is_active']
+            )
+
+            # One balance update per affected group for the whole batch
+            apply_balance_deltas(changes)
+
+            from activities.services import ActivityService
+            for expense in expenses:
+                ActivityService.log_expense_created(expense.group, expense.recurring.created_by, expense)
+
+            return len(expenses), len(schedules), behind
+
+
+class ExpenseImportService:
+    """Creates a batch of validated expenses at once, skipping duplicates"""
+
+    def __init__(self, group, user):
+        self.group = group
+        self.user = user
+
+    @transaction.atomic
+    def run(self, rows):
+        """
+        Create expenses from validated CreateExpenseSerializer data.
+
+        Rows whose fingerprint matches an existing expense, or an earlier row
+        of the same batch, are skipped. Returns (created expenses, indexes of
+        skipped rows).
+        """
+        expenses = []
+        participants = []
+        items = []
+        changes = []
+        for row in rows:
+            row = dict(row)
+            shares = row.pop('participants')
+            row_items = row.pop('items', None) or []
+            item_shares = row.pop('item_shares', [])
+            row.pop('allow_duplicate', None)
+            row['group'] = self.group
+
+            expense = Expense(**row)
+            participants.append(ExpenseSplitService.build_participants(expense, shares))
+            items.append(ExpenseSplitService.build_items(expense, row_items, item_shares))
+            expenses.append(expense)
+            changes.append((expense, share_pairs(shares), 1))
+
+        # One indexed lookup for the whole batch
+        seen = set(
+            Expense.objects.filter(
+                fingerprint__in={expense.fingerprint for expense in expenses}
+            ).values_list('fingerprint', flat=True)
+        )
+        keep = []
+        skipped = []
+        for index, expense in enumerate(expenses):
+            if expense.fingerprint in seen:
+                skipped.append(index)
+                continue
+            seen.add(expense.fingerprint)
+            keep.append(index)
+
+        created = [expenses[i] for i in keep]
+        Expense.objects.bulk_create(created)
+        ExpenseItem.objects.bulk_create([item for i in keep for item in items[i]])
+        ExpenseParticipant.objects.bulk_create([p for i in keep for p in participants[i]])
+        changes = [changes[i] for i in keep]
+        record_expense_changes(changes)
+        apply_balance_deltas(changes)
+
+        from activities.services import ActivityService
+        for expense in created:
+            ActivityService.log_expense_created(self.group, self.user, expense)
+
+        return created, skipped
+
+
+class ReceiptService:
+    """Stores receipt uploads and builds their derivatives off the request"""
+
+    @staticmethod
+    def attach(expense, uploaded_by, upload):
+        """Write the upload straight to storage and queue processing after commit"""
+        receipt = ExpenseReceipt(expense=expense, uploaded_by=uploaded_by)
+        ext = os.path.splitext(upload.name)[1].lower()
+        receipt.image.save(f"{receipt.id}{ext}", upload, save=False)
+        receipt.save()
+
+        transaction.on_commit(lambda: submit(ReceiptService.process, receipt.id))
+        return receipt
+
+    @staticmethod
+    def process(receipt_id):
+        """
+        Strip EXIF, downsize and thumbnail a pending receipt.
+        Runs on the background pool; safe to call again for a receipt that
+        was left pending (see the process_receipts command).
+        """
+        from PIL import Image, ImageOps
+
+        receipt = ExpenseReceipt.objects.filter(
+            id=receipt_id,
+            status=ExpenseReceipt.STATUS_PENDING
+        ).first()
+        if receipt is None:
+            return
+
+        raw_name = receipt.image.name
+        try:
+            with receipt.image.open('rb') as f:
+                with Image.open(f) as source:
+                    # Apply the EXIF orientation, then drop all metadata by
+                    # re-encoding only the pixels
+                    image = ImageOps.exif_transpose(source).convert('RGB')
+
+            image.thumbnail((settings.RECEIPT_IMAGE_MAX_SIZE, settings.RECEIPT_IMAGE_MAX_SIZE))
+            full = ReceiptService._encode(image)
+
+            thumb_image = image.copy()
+            thumb_image.thumbnail((settings.RECEIPT_THUMBNAIL_SIZE, settings.RECEIPT_THUMBNAIL_SIZE))
+            thumb = ReceiptService._encode(thumb_image)
+        except Exception:
+            logger.exception("Could not process receipt %s", receipt_id)
+            ExpenseReceipt.objects.filter(id=receipt_id).update(status=ExpenseReceipt.STATUS_FAILED)
+            return
+
+        # Content-hashed names never change content, so they can be cached forever
+        receipt.image.save(f"{receipt.id}-{ReceiptService._digest(full)}.jpg", ContentFile(full), save=False)
+        receipt.thumbnail.save(f"{receipt.id}-{ReceiptService._digest(thumb)}.jpg", ContentFile(thumb), save=False)
+        receipt.width, receipt.height = image.size
+        receipt.status = ExpenseReceipt.STATUS_READY
+        receipt.processed_at = timezone.now()
+        receipt.save(update_fields=['image', 'thumbnail', 'width', 'height', 'status', 'processed_at'])
+
+        # The raw upload still carries the original EXIF data
+        receipt.image.storage.delete(raw_name)
+
+    @staticmethod
+    def _encode(image):
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=85, optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _digest(content):
+        return hashlib.sha256(content).hexdigest()[:16]
+
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Expense, ExpenseParticipant
+from .services import equal_shares
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def expand_equal_splits_of_deleted_user(sender, instance, **kwargs):
+    """
+    Give a deleted user's compact equal splits participant rows.
+
+    participant_ids is a plain JSON list with no foreign key, so a deleted
+    user would stay in it and keep being counted. Materialising the other
+    participants' shares as rows first makes the delete behave like it
+    does for every other split: the user's share goes, the rest stay put.
+    """
+    user_id = str(instance.id)
+    # Former members can still be in a split, so membership cannot narrow this
+    expenses = Expense.objects.filter(participant_ids__isnull=False)
+    if connections[expenses.db].features.supports_json_field_contains:
+        expenses = expenses.filter(participant_ids__contains=[user_id])
+
+    participants = []
+    expanded = []
+    for expense in expenses.only('id', 'group_id', 'amount', 'participant_ids').iterator():
+        if user_id not in expense.participant_ids:
+            continue
+        participants.extend(
+            ExpenseParticipant(expense_id=expense.id, group_id=expense.group_id, user_id=other, share=share)
+            for other, share in equal_shares(expense.amount, expense.participant_ids)
+            if other != user_id
+        )
+        expense.participant_ids = None
+        expanded.append(expense)
+
+    ExpenseParticipant.objects.bulk_create(participants, batch_size=1000)
+    Expense.objects.bulk_update(expanded, ['participant_ids'], batch_size=1000)
@@ -1,3 +1,520 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from balances.models import Balance
+from balances.services import BalanceCalculationService
+from groups.models import Group
+from members.models import Membership
+from currencies.models import ExchangeRate
+from .models import Expense, ExpenseParticipant, ExpenseReceipt, RecurringExpense
+from .services import (
+    ExpenseSplitService, ReceiptService, RecurringExpenseService, SplitError, equal_shares, equal_split_totals,
+)
+
+
+class ExpenseSplitServiceTests(SimpleTestCase):
+    def shares(self, amount, split_type, participants):
+        return [s['share'] for s in ExpenseSplitService.split(amount, split_type, participants)]
+
+    def test_equal_split_gives_leftover_cents_to_the_first_participants(self):
+        shares = self.shares(Decimal('10.00'), Expense.SPLIT_EQUAL, [{'user_id': i} for i in range(3)])
+
+        self.assertEqual(shares, [Decimal('3.34'), Decimal('3.33'), Decimal('3.33')])
+
+    def test_percentage_split_gives_leftover_cents_to_the_largest_remainders(self):
+        participants = [
+            {'user_id': 0, 'percentage': '33.33'},
+            {'user_id': 1, 'percentage': '33.33'},
+            {'user_id': 2, 'percentage': '33.34'},
+        ]
+
+        shares = self.shares(Decimal('0.10'), Expense.SPLIT_PERCENT, participants)
+
+        # 3.333, 3.333 and 3.334 cents: the single leftover cent goes to the largest remainder
+        self.assertEqual(shares, [Decimal('0.03'), Decimal('0.03'), Decimal('0.04')])
+
+    def test_shares_always_add_up_to_the_amount(self):
+        for cents in range(1, 400, 7):
+            amount = Decimal(cents) / 100
+            for size in range(1, 8):
+                shares = self.shares(amount, Expense.SPLIT_EQUAL, [{'user_id': i} for i in range(size)])
+                self.assertEqual(sum(shares), amount)
+                self.assertLessEqual(max(shares) - min(shares), Decimal('0.01'))
+                self.assertEqual(
+                    [share for _, share in equal_shares(amount, [str(i) for i in range(size)])], shares
+                )
+
+    def test_batch_split_matches_single_splits(self):
+        rows = [
+            (Decimal('7.00'), Expense.SPLIT_EQUAL, [{'user_id': i} for i in range(3)]),
+            (Decimal('5.00'), Expense.SPLIT_UNEQUAL, [{'user_id': 0, 'share': '2.50'}, {'user_id': 1, 'share': '2.50'}]),
+        ]
+
+        batch = ExpenseSplitService.split_many(rows)
+
+        self.assertEqual(batch, [ExpenseSplitService.split(*row) for row in rows])
+
+    def test_invalid_splits_are_rejected(self):
+        with self.assertRaisesMessage(SplitError, 'Total shares must equal expense amount.'):
+            ExpenseSplitService.split(
+                Decimal('5.00'), Expense.SPLIT_UNEQUAL,
+                [{'user_id': 0, 'share': '2.00'}, {'user_id': 1, 'share': '2.00'}],
+            )
+        with self.assertRaisesMessage(SplitError, 'Percentages must sum to 100.'):
+            ExpenseSplitService.split(Decimal('5.00'), Expense.SPLIT_PERCENT, [{'user_id': 0, 'percentage': '99'}])
+        with self.assertRaisesMessage(SplitError, 'Each participant may only appear once.'):
+            ExpenseSplitService.split(Decimal('5.00'), Expense.SPLIT_EQUAL, [{'user_id': 0}, {'user_id': 0}])
+
+    def test_batch_errors_carry_the_row_and_the_original_message(self):
+        rows = [
+            (Decimal('5.00'), Expense.SPLIT_EQUAL, [{'user_id': 0}]),
+            (Decimal('5.00'), 'by: weight', [{'user_id': 0}]),
+        ]
+
+        with self.assertRaises(SplitError) as batch:
+            ExpenseSplitService.split_many(rows)
+        self.assertEqual((batch.exception.row, batch.exception.message), (1, "Unknown split type 'by: weight'."))
+        self.assertEqual(str(batch.exception), "Row 1: Unknown split type 'by: weight'.")
+
+        with self.assertRaises(SplitError) as single:
+            ExpenseSplitService.split(*rows[1])
+        self.assertEqual(str(single.exception), "Unknown split type 'by: weight'.")
+        self.assertIsNone(single.exception.row)
+
+
+class RecurringExpenseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Flat', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/groups/{self.group.id}/expenses/recurring/'
+
+    def schedule(self, **fields):
+        values = {
+            'group': self.group,
+            'title': 'Rent',
+            'amount': Decimal('30.00'),
+            'currency': self.group.currency,
+            'paid_by': self.user,
+            'split_type': Expense.SPLIT_EQUAL,
+            'participants': [{'user_id': str(self.user.id), 'share': None, 'percentage': None}],
+            'frequency': RecurringExpense.FREQ_DAILY,
+            'start_date': date(2026, 1, 1),
+            'next_run_date': date(2026, 1, 1),
+            'created_by': self.user,
+        }
+        values.update(fields)
+        return RecurringExpense.objects.create(**values)
+
+    def payload(self, **fields):
+        values = {
+            'title': 'Rent',
+            'amount': '30.00',
+            'paid_by': str(self.user.id),
+            'split_type': Expense.SPLIT_EQUAL,
+            'participants': [{'user_id': str(self.user.id)}],
+            'frequency': RecurringExpense.FREQ_MONTHLY,
+            'start_date': '2026-01-01',
+        }
+        values.update(fields)
+        return values
+
+    def test_zero_interval_is_rejected(self):
+        response = self.client.post(self.url, self.payload(interval=0), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('interval', response.data)
+        self.assertFalse(RecurringExpense.objects.exists())
+
+    def test_currency_without_rate_is_rejected(self):
+        response = self.client.post(self.url, self.payload(currency='JPY'), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('currency', response.data)
+
+    def test_catch_up_is_split_into_bounded_batches(self):
+        schedule = self.schedule()
+        today = schedule.start_date + timedelta(days=24)
+
+        created = RecurringExpenseService(today=today, max_catch_up=10).run()
+
+        schedule.refresh_from_db()
+        self.assertEqual(created, 25)
+        self.assertEqual(Expense.objects.filter(recurring=schedule).count(), 25)
+        self.assertEqual(schedule.next_run_date, today + timedelta(days=1))
+
+    def test_schedule_without_rate_does_not_block_the_batch(self):
+        stuck = self.schedule(currency='JPY')
+        healthy = self.schedule(title='Internet')
+
+        created = RecurringExpenseService(today=date(2026, 1, 3)).run()
+
+        stuck.refresh_from_db()
+        self.assertEqual(created, 3)
+        self.assertFalse(stuck.is_active)
+        self.assertEqual(Expense.objects.filter(recurring=healthy).count(), 3)
+
+
+class EqualSplitTotalsTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(3)
+        ]
+        self.group = Group.objects.create(name='Trip', created_by=self.users[0])
+        ExchangeRate.objects.create(
+            base_currency='EUR', quote_currency='USD', date=date(2026, 1, 1), rate=Decimal('1.10000000')
+        )
+
+    def expense(self, amount, currency='USD', day=date(2026, 1, 5), users=None):
+        return Expense.objects.create(
+            group=self.group, title='Dinner', amount=Decimal(amount), currency=currency, date=day,
+            paid_by=self.users[0], split_type=Expense.SPLIT_EQUAL,
+            participant_ids=[str(user.id) for user in users or self.users],
+        )
+
+    def test_leftover_cents_and_conversion_match_equal_shares(self):
+        self.expense('10.00')
+        self.expense('1.00', currency='EUR')
+
+        totals = equal_split_totals(Expense.objects.filter(group=self.group), 'USD')
+
+        first, second, third = (user.id for user in self.users)
+        self.assertEqual(totals[(first,)][0], Decimal('3.34') + Decimal('0.34') * Decimal('1.1'))
+        self.assertEqual(totals[(second,)][0], Decimal('3.33') + Decimal('0.33') * Decimal('1.1'))
+        self.assertEqual(totals[(third,)][0], Decimal('3.33') + Decimal('0.33') * Decimal('1.1'))
+        self.assertEqual({count for _, count in totals.values()}, {2})
+
+    def test_grouping_keys(self):
+        self.expense('9.00', day=date(2026, 1, 7))
+        self.expense('3.00', day=date(2026, 2, 3), users=self.users[:1])
+
+        totals = equal_split_totals(Expense.objects.filter(group=self.group), by=('group', 'month'))
+
+        owner = self.users[0].id
+        self.assertEqual(totals[(self.group.id, date(2026, 1, 1), owner)], [Decimal('3.00'), 1])
+        self.assertEqual(totals[(self.group.id, date(2026, 2, 1), owner)], [Decimal('3.00'), 1])
+
+        weekly = equal_split_totals(Expense.objects.filter(group=self.group), 'USD', by=('week',))
+        self.assertIn((date(2026, 1, 5), owner), weekly)
+
+    def test_deleting_a_user_keeps_the_other_shares(self):
+        expense = self.expense('10.00')
+        shares = dict(equal_shares(expense.amount, expense.participant_ids))
+
+        self.users[2].delete()
+
+        expense.refresh_from_db()
+        self.assertIsNone(expense.participant_ids)
+        self.assertEqual(
+            dict(ExpenseParticipant.objects.filter(expense=expense).values_list('user_id', 'share')),
+            {user.id: shares[str(user.id)] for user in self.users[:2]},
+        )
+        self.assertEqual(equal_split_totals(Expense.objects.filter(group=self.group), 'USD'), {})
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, RECEIPT_IMAGE_MAX_SIZE=300, RECEIPT_THUMBNAIL_SIZE=100)
+class ReceiptTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        storage = override_settings(MEDIA_ROOT=media)
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Flat', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        self.expense = Expense.objects.create(
+            group=self.group, title='Groceries', amount=Decimal('20.00'), currency=self.group.currency,
+            date=date(2026, 1, 1), paid_by=self.user, split_type=Expense.SPLIT_EQUAL,
+            participant_ids=[str(self.user.id)],
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/groups/{self.group.id}/expenses/{self.expense.id}/receipts/'
+
+    def photo(self, name='receipt.jpg'):
+        """A 400x200 JPEG whose EXIF says to rotate it a quarter turn"""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'PhoneCam'
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200), 'white').save(buffer, format='JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'image': self.photo()}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        return ExpenseReceipt.objects.get(id=response.data['receipt']['id'])
+
+    def test_upload_is_rotated_stripped_downsized_and_thumbnailed(self):
+        receipt = self.upload()
+
+        self.assertEqual(receipt.status, ExpenseReceipt.STATUS_READY)
+        self.assertEqual((receipt.width, receipt.height), (150, 300))
+        with receipt.image.open('rb') as f, Image.open(f) as image:
+            self.assertEqual(image.size, (150, 300))
+            self.assertEqual(dict(image.getexif()), {})
+        with receipt.thumbnail.open('rb') as f, Image.open(f) as thumbnail:
+            self.assertEqual(thumbnail.size, (50, 100))
+        # The raw upload, EXIF and all, is gone
+        self.assertEqual(receipt.image.storage.listdir('receipts')[1], [os.path.basename(receipt.image.name)])
+
+    def test_processed_files_are_named_by_their_content(self):
+        first, second = self.upload(), self.upload()
+
+        for receipt in (first, second):
+            for stored in (receipt.image, receipt.thumbnail):
+                name = os.path.basename(stored.name)
+                with stored.open('rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:16]
+                self.assertEqual(name, f'{receipt.id}-{digest}.jpg')
+        # Same pixels, same hash
+        self.assertEqual(first.image.name.rsplit('-', 1)[-1], second.image.name.rsplit('-', 1)[-1])
+
+    def test_processing_runs_once_and_marks_bad_images_failed(self):
+        receipt = self.upload()
+        name = receipt.image.name
+
+        ReceiptService.process(receipt.id)
+
+        receipt.refresh_from_db()
+        self.assertEqual(receipt.image.name, name)
+
+        with self.assertLogs('expense.services', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url, {'image': SimpleUploadedFile('broken.png', b'not an image', content_type='image/png')},
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(ExpenseReceipt.objects.get(id=response.data['receipt']['id']).status, ExpenseReceipt.STATUS_FAILED)
+
+    def test_files_are_served_with_immutable_cache_headers(self):
+        receipt = self.upload()
+        listed = self.client.get(self.url).data['receipts'][0]
+
+        response = self.client.get(listed['thumbnail_url'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+        with receipt.thumbnail.open('rb') as f:
+            self.assertEqual(b''.join(response.streaming_content), f.read())
+
+    def test_unknown_malformed_and_pending_receipts_are_not_found(self):
+        pending = ExpenseReceipt.objects.create(expense=self.expense, uploaded_by=self.user, image='receipts/raw.jpg')
+
+        for receipt_id in (pending.id, uuid.uuid4(), 'not-a-uuid', '123'):
+            response = self.client.get(f'{self.url}{receipt_id}/image/')
+            self.assertEqual(response.status_code, 404, receipt_id)
+
+
+class ParticipantGroupKeyTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(2)
+        ]
+        self.group = Group.objects.create(name='Flat', created_by=self.users[0])
+        for user in self.users:
+            Membership.objects.create(user=user, group=self.group)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def test_participant_rows_carry_their_expense_group(self):
+        response = self.client.post(f'/api/v1/groups/{self.group.id}/expenses/', {
+            'group': str(self.group.id), 'title': 'Dinner', 'amount': '10.00', 'date': '2026-01-01',
+            'paid_by': str(self.users[0].id), 'split_type': 'unequal',
+            'participants': [
+                {'user_id': str(self.users[0].id), 'share': '4.00'},
+                {'user_id': str(self.users[1].id), 'share': '6.00'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        expense = Expense.objects.get(title='Dinner')
+        self.assertEqual(
+            set(ExpenseParticipant.objects.filter(expense=expense).values_list('group_id', flat=True)),
+            {self.group.id},
+        )
+
+        # Rows saved one at a time pick the group up from their expense
+        other = Expense.objects.create(
+            group=self.group, title='Taxi', amount=Decimal('5.00'), currency=self.group.currency,
+            date=date(2026, 1, 2), paid_by=self.users[1], split_type=Expense.SPLIT_UNEQUAL,
+        )
+        row = ExpenseParticipant.objects.create(expense=other, user=self.users[0], share=Decimal('5.00'))
+        self.assertEqual(row.group_id, self.group.id)
+
+    def test_owed_totals_do_not_join_expenses_in_single_currency_groups(self):
+        rows = BalanceCalculationService(self.group)._owed_rows()
+
+        self.assertNotIn(f'"{Expense._meta.db_table}"', str(rows.query))
+
+
+class ItemisedExpenseTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(3)
+        ]
+        self.group = Group.objects.create(name='Flat', created_by=self.users[0])
+        for user in self.users:
+            Membership.objects.create(user=user, group=self.group)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.url = f'/api/v1/groups/{self.group.id}/expenses/'
+
+    def item(self, title, amount, split_type, *participants):
+        return {'title': title, 'amount': amount, 'split_type': split_type, 'participants': list(participants)}
+
+    def post(self, items, **fields):
+        payload = {
+            'group': str(self.group.id), 'title': 'Supermarket', 'date': '2026-01-01',
+            'paid_by': str(self.users[0].id), 'items': items, **fields,
+        }
+        return self.client.post(self.url, payload, format='json')
+
+    def test_item_splits_are_summed_into_participant_shares(self):
+        first, second, third = (str(user.id) for user in self.users)
+        response = self.post([
+            self.item('Pizza', '10.00', 'equal', {'user_id': first}, {'user_id': second}, {'user_id': third}),
+            self.item('Wine', '5.01', 'unequal', {'user_id': first, 'share': '2.00'}, {'user_id': second, 'share': '3.01'}),
+            self.item('Tip', '3.00', 'percentage', {'user_id': second, 'percentage': '50'}, {'user_id': third, 'percentage': '50'}),
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        expense = Expense.objects.get(title='Supermarket')
+        self.assertEqual((expense.amount, expense.split_type), (Decimal('18.01'), Expense.SPLIT_ITEMIZED))
+        shares = dict(ExpenseParticipant.objects.filter(expense=expense).values_list('user_id', 'share'))
+        self.assertEqual(shares, {
+            self.users[0].id: Decimal('3.34') + Decimal('2.00'),
+            self.users[1].id: Decimal('3.33') + Decimal('3.01') + Decimal('1.50'),
+            self.users[2].id: Decimal('3.33') + Decimal('1.50'),
+        })
+        self.assertEqual(sum(shares.values()), expense.amount)
+        self.assertEqual(
+            [(item.title, sum(Decimal(s['share']) for s in item.shares)) for item in expense.items.all()],
+            [('Pizza', Decimal('10.00')), ('Wine', Decimal('5.01')), ('Tip', Decimal('3.00'))],
+        )
+
+    def test_bad_items_are_rejected(self):
+        first = str(self.users[0].id)
+        pizza = self.item('Pizza', '10.00', 'equal', {'user_id': first})
+
+        response = self.post([pizza, self.item('Wine', '5.00', 'unequal', {'user_id': first, 'share': '4.00'})])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(str(response.data['items'][0]), 'Item 1: Total shares must equal expense amount.')
+
+        response = self.post([pizza], amount='12.00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.data)
+
+        response = self.post([], amount='10.00', split_type=Expense.SPLIT_ITEMIZED)
+        self.assertEqual(response.status_code, 400)
+
+        self.assertFalse(Expense.objects.exists())
+
+
+class DuplicateExpenseTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(2)
+        ]
+        self.group = Group.objects.create(name='Flat', created_by=self.users[0])
+        for user in self.users:
+            Membership.objects.create(user=user, group=self.group)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.url = f'/api/v1/groups/{self.group.id}/expenses/'
+
+    def payload(self, **fields):
+        values = {
+            'group': str(self.group.id), 'title': 'Groceries', 'amount': '20.00', 'date': '2026-01-01',
+            'paid_by': str(self.users[0].id), 'split_type': 'equal',
+            'participants': [{'user_id': str(user.id)} for user in self.users],
+        }
+        values.update(fields)
+        return values
+
+    def test_identical_expenses_are_rejected_unless_allowed(self):
+        self.assertEqual(self.client.post(self.url, self.payload(), format='json').status_code, 201)
+        original = Expense.objects.get()
+
+        # Title case and spacing, and participant order, do not matter
+        retry = self.payload(title='  groceries ', participants=[{'user_id': str(user.id)} for user in self.users[::-1]])
+        response = self.client.post(self.url, retry, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(original.id), str(response.data['duplicate'][0]))
+
+        self.assertEqual(self.client.post(self.url, self.payload(amount='20.01'), format='json').status_code, 201)
+        self.assertEqual(self.client.post(self.url, self.payload(allow_duplicate=True), format='json').status_code, 201)
+        self.assertEqual(Expense.objects.filter(fingerprint=original.fingerprint).count(), 2)
+
+    def test_unchanged_edits_are_not_duplicates_but_edits_into_one_are(self):
+        self.client.post(self.url, self.payload(), format='json')
+        self.client.post(self.url, self.payload(title='Rent'), format='json')
+        groceries, rent = Expense.objects.get(title='Groceries'), Expense.objects.get(title='Rent')
+
+        response = self.client.put(f'{self.url}{groceries.id}/', self.payload(notes='Weekly shop'), format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.put(f'{self.url}{rent.id}/', self.payload(), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('duplicate', response.data)
+
+    def test_import_skips_existing_and_repeated_rows(self):
+        self.client.post(self.url, self.payload(), format='json')
+        BalanceCalculationService(self.group).calculate_all_balances()
+        rows = [
+            self.payload(),
+            self.payload(title='Rent', amount='500.00'),
+            self.payload(title='Rent', amount='500.00'),
+            self.payload(title='Internet', amount='30.00', split_type='unequal', participants=[
+                {'user_id': str(self.users[0].id), 'share': '10.00'},
+                {'user_id': str(self.users[1].id), 'share': '20.00'},
+            ]),
+        ]
+
+        response = self.client.post(f'{self.url}import/', {'expenses': rows}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['skipped'], [0, 2])
+        self.assertEqual(
+            sorted(Expense.objects.filter(id__in=response.data['created']).values_list('title', flat=True)),
+            ['Internet', 'Rent'],
+        )
+        internet = Expense.objects.get(title='Internet')
+        self.assertEqual(
+            dict(internet.participants.values_list('user_id', 'share')),
+            {self.users[0].id: Decimal('10.00'), self.users[1].id: Decimal('20.00')},
+        )
+
+        # The import moved the stored balances by exactly the created rows
+        stored = sorted(Balance.objects.filter(group=self.group).values_list('user_id', 'total_paid', 'total_owed'))
+        BalanceCalculationService(self.group).calculate_all_balances()
+        self.assertEqual(
+            stored,
+            sorted(Balance.objects.filter(group=self.group).values_list('user_id', 'total_paid', 'total_owed')),
+        )
+        self.assertIn((self.users[0].id, Decimal('550.00'), Decimal('270.00')), stored)
+
+    def test_invalid_import_rows_create_nothing(self):
+        rows = [self.payload(title='Rent'), self.payload(amount='-5.00', split_type='by weight')]
+
+        response = self.client.post(f'{self.url}import/', {'expenses': rows}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Expense.objects.exists())
@@ -2,9 +2,11 @@
 
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
-from .views import ExpenseViewSet
+from .views import ExpenseViewSet, RecurringExpenseViewSet
 
 router = SimpleRouter()
+# Registered before the expense routes so 'recurring' is not read as an expense id
+router.register(r'recurring', RecurringExpenseViewSet, basename='group-recurring-expenses')
 router.register(r'', ExpenseViewSet, basename='group-expenses')
 
 urlpatterns = [
@@ -1,17 +1,32 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 
-from .models import Expense, ExpenseParticipant
+from .models import Expense, ExpenseParticipant, RecurringExpense, ExpenseReceipt
 from .serializers import (
     ExpenseSerializer,
     CreateExpenseSerializer,
+    RecurringExpenseSerializer,
+    ExpenseReceiptSerializer,
+    UploadReceiptSerializer,
+    ImportExpensesSerializer,
 )
+from .services import record_expense_changes, expense_shares, ExpenseImportService, ReceiptService
 from groups.models import Group
+from members.models import Membership
+from idempotency.decorators import idempotent
 
 from drf_spectacular.utils import extend_schema_view, extend_schema
 
+# Same pattern as Django's <uuid:> converter, so malformed ids 404 in routing
+RECEIPT_ID = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+
+
 @extend_schema_view(
     list=extend_schema(tags=['Expenses']),
     create=extend_schema(tags=['Expenses']),
@@ -26,7 +41,9 @@ class ExpenseViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         group_id = self.kwargs['group_id']
-        return Expense.objects.filter(group_id=group_id)
+        return Expense.objects.filter(group_id=group_id).prefetch_related(
+            'participants__user', 'items', 'receipts'
+        )
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -38,22 +55,13 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         group_id = self.kwargs['group_id']
         group = get_object_or_404(Group, id=group_id)
 
-        # Save the expense with the group
+        # Save the expense with the group; the serializer stores the
+        # server-computed participant shares
         expense = serializer.save(group=group)
-        
-        # ✅ Handle participants here (single source of truth)
-        participants_data = self.request.data.get('participants', [])
-        
-        for p in participants_data:
-            ExpenseParticipant.objects.create(
-                expense=expense,
-                user_id=p['user_id'],
-                share=p.get('share', 0),
-                percentage=p.get('percentage')
-            )
-        
+
         return expense
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -99,18 +107,113 @@ class ExpenseViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         expense = self.get_object()
+        expense_id = expense.id
         expense_title = expense.title
         expense_amount = expense.amount
         group = expense.group
+        shares = expense_shares(expense)
         
-        # Delete the expense
-        self.perform_destroy(expense)
+        # Delete the expense and take it out of the read models
+        with transaction.atomic():
+            self.perform_destroy(expense)
+            record_expense_changes([(expense, shares, -1)])
         
         # Log the deletion
         from activities.services import ActivityService
-        ActivityService.log_expense_deleted(group, request.user, expense_title, expense_amount)
+        ActivityService.log_expense_deleted(group, request.user, expense_id, expense_title, expense_amount)
         
         return Response(
             {"message": "Expense deleted successfully."},
             status=status.HTTP_204_NO_CONTENT
-        )
\ No newline at end of file
+        )
+
+    @extend_schema(tags=['Expenses'], request=ImportExpensesSerializer)
+    @action(detail=False, methods=['post'], url_path='import')
+    @idempotent
+    def import_expenses(self, request, group_id=None):
+        """Create many expenses in one transaction, skipping duplicates"""
+        group = get_object_or_404(Group, id=group_id)
+
+        payload = ImportExpensesSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+
+        # Every row is imported into this group
+        rows = [{**row, 'group': str(group.id)} for row in payload.validated_data['expenses']]
+        context = {**self.get_serializer_context(), 'skip_duplicate_check': True}
+        serializer = CreateExpenseSerializer(data=rows, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+
+        created, skipped = ExpenseImportService(group, request.user).run(serializer.validated_data)
+
+        return Response(
+            {
+                "message": f"Imported {len(created)} expenses, skipped {len(skipped)} duplicates.",
+                "created": [str(expense.id) for expense in created],
+                "skipped": skipped,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    @extend_schema(tags=['Expenses'])
+    @action(detail=True, methods=['get', 'post'], parser_classes=[MultiPartParser, FormParser, JSONParser])
+    def receipts(self, request, group_id=None, id=None):
+        """List or upload receipt photos; processing happens in the background"""
+        expense = self.get_object()
+
+        if request.method == 'GET':
+            serializer = ExpenseReceiptSerializer(expense.receipts.all(), many=True)
+            return Response(
+                {"message": "Receipts retrieved.", "receipts": serializer.data},
+                status=status.HTTP_200_OK
+            )
+
+        upload = UploadReceiptSerializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+        receipt = ReceiptService.attach(expense, request.user, upload.validated_data['image'])
+
+        return Response(
+            {"message": "Receipt uploaded.", "receipt": ExpenseReceiptSerializer(receipt).data},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    @extend_schema(tags=['Expenses'])
+    @action(detail=True, methods=['get'], url_path=rf'receipts/(?P<receipt_id>{RECEIPT_ID})/(?P<variant>image|thumbnail)')
+    def receipt_file(self, request, group_id=None, id=None, receipt_id=None, variant=None):
+        """Serve a processed receipt image; names are content-hashed so it can be cached forever"""
+        expense = self.get_object()
+        receipt = get_object_or_404(ExpenseReceipt, id=receipt_id, expense=expense)
+
+        stored = getattr(receipt, variant)
+        if receipt.status != ExpenseReceipt.STATUS_READY or not stored:
+            raise Http404("Receipt is not processed yet.")
+
+        response = FileResponse(stored.open('rb'), content_type='image/jpeg')
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+
+
+@extend_schema(tags=['Recurring Expenses'])
+class RecurringExpenseViewSet(viewsets.ModelViewSet):
+    """
+    Manage recurring expense schedules for a group.
+    Occurrences are generated by the generate_recurring_expenses command.
+    """
+    serializer_class = RecurringExpenseSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'id'
+
+    def get_group(self):
+        """Get group and verify user access"""
+        group = get_object_or_404(Group, id=self.kwargs['group_id'])
+
+        if not Membership.objects.filter(group=group, user=self.request.user).exists():
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("You are not a member of this group.")
+
+        return group
+
+    def get_queryset(self):
+        return RecurringExpense.objects.filter(group=self.get_group())
+
+    def perform_create(self, serializer):
+        serializer.save(group=self.get_group(), created_by=self.request.user)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0003_group_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0004_group_currency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='debt_simplification',
+            field=models.CharField(choices=[('any', 'Anyone can pay anyone'), ('shared_expenses', 'Only between members who shared an expense')], default='any', max_length=20),
+        ),
+    ]
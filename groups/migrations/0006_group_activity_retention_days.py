@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:55
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0005_group_debt_simplification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='activity_retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(7)]),
+        ),
+        migrations.AddConstraint(
+            model_name='group',
+            constraint=models.CheckConstraint(condition=models.Q(('activity_retention_days__gte', 7), ('activity_retention_days__isnull', True), _connector='OR'), name='group_activity_retention_min'),
+        ),
+    ]
@@ -1,14 +1,34 @@
 import uuid
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.conf import settings
 
 User = settings.AUTH_USER_MODEL
 
 class Group(models.Model):
+    # How balances are simplified into debts (see BalanceCalculationService)
+    SIMPLIFY_ANY = 'any'
+    SIMPLIFY_SHARED_EXPENSES = 'shared_expenses'
+    DEBT_SIMPLIFICATION_CHOICES = [
+        (SIMPLIFY_ANY, 'Anyone can pay anyone'),
+        (SIMPLIFY_SHARED_EXPENSES, 'Only between members who shared an expense'),
+    ]
+
     id          = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name        = models.CharField(max_length=255)
     avatar      = models.ImageField(upload_to='group_avatars/', null=True, blank=True)
     description = models.TextField(blank=True)
+    # Base currency: balances and analytics are reported in it
+    currency    = models.CharField(max_length=3, default='USD')
+    debt_simplification = models.CharField(
+        max_length=20,
+        choices=DEBT_SIMPLIFICATION_CHOICES,
+        default=SIMPLIFY_ANY
+    )
+    # Days of activity kept online; null falls back to ACTIVITY_RETENTION_DAYS
+    activity_retention_days = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(7)]
+    )
     created_by  = models.ForeignKey(
         User,
         related_name='owned_groups',
@@ -29,7 +49,12 @@ class Group(models.Model):
             models.UniqueConstraint(
                 fields=['created_by', 'name'],
                 name='unique_group_name_per_user'
-            )
+            ),
+            # A tiny window would archive the whole feed on the next run
+            models.CheckConstraint(
+                condition=models.Q(activity_retention_days__gte=7) | models.Q(activity_retention_days__isnull=True),
+                name='group_activity_retention_min'
+            ),
         ]
 
     def __str__(self):
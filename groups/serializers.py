@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Group
 from categories.models import Category
+from currencies.serializers import validate_currency_code
 
 
 class GroupSerializer(serializers.ModelSerializer):
@@ -14,7 +15,8 @@ class GroupSerializer(serializers.ModelSerializer):
     class Meta:
         model  = Group
         fields = [
-            'id', 'name', 'avatar', 'description','category', 'category_name',
+            'id', 'name', 'avatar', 'description','category', 'category_name', 'currency',
+            'debt_simplification', 'activity_retention_days',
             'created_by', 'created_at', 'updated_at'
         ]
 
@@ -27,6 +29,21 @@ class GroupSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("You already have a group with this name.")
         return value
 
+    def validate_currency(self, value):
+        value = validate_currency_code(value)
+
+        # Stored balances, settlements and rollups are all in the base currency
+        group = self.instance
+        if group is not None and value != group.currency and (
+            group.expenses.exists()
+            or group.settlements.exists()
+            or group.recurring_expenses.exists()
+        ):
+            raise serializers.ValidationError(
+                "The currency cannot be changed once the group has expenses or settlements."
+            )
+        return value
+
     def validate_avatar(self, file):
         if not file:
             return None
@@ -1,3 +1,85 @@
+from datetime import date
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from expense.models import Expense
+from members.models import Membership
+from .models import Group
+from .versioning import get_group_version
+
+
+class GroupCurrencyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/groups/{self.group.id}/'
+
+    def test_currency_can_change_while_group_is_empty(self):
+        response = self.client.patch(self.url, {'currency': 'eur'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.currency, 'EUR')
+
+    def test_currency_is_locked_once_group_has_expenses(self):
+        Expense.objects.create(
+            group=self.group, title='Dinner', amount=Decimal('30.00'), date=date(2026, 1, 1),
+            paid_by=self.user, split_type=Expense.SPLIT_EQUAL,
+        )
+
+        response = self.client.patch(self.url, {'currency': 'EUR'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('currency', response.data)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.currency, 'USD')
+        self.assertEqual(self.client.get(f'/api/v1/groups/{self.group.id}/balances/').status_code, 200)
+
+
+class GroupVersionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_group_update_invalidates_cached_read_models(self):
+        before = get_group_version(self.group.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/v1/groups/{self.group.id}/', {'name': 'Road trip'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(get_group_version(self.group.id), before)
+
+
+class GroupRetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/groups/{self.group.id}/'
+
+    def test_retention_below_the_floor_is_rejected(self):
+        response = self.client.patch(self.url, {'activity_retention_days': 0}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('activity_retention_days', response.data)
+
+    def test_retention_override_is_saved(self):
+        response = self.client.patch(self.url, {'activity_retention_days': 30}, format='json')
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.activity_retention_days, 30)
@@ -0,0 +1,43 @@
+import time
+
+from django.core.cache import cache
+
+from config.events import hub
+
+
+def _version_key(group_id):
+    return f"group:{group_id}:version"
+
+
+def get_group_version(group_id):
+    """
+    Current change version of a group.
+    Cached read models (analytics, balances) key their entries on this value,
+    so bumping it invalidates every cached result for the group at once.
+    """
+    # Seed with a timestamp so an evicted counter never reuses an old version
+    return cache.get_or_set(_version_key(group_id), time.time_ns(), timeout=None)
+
+
+def get_group_versions(group_ids):
+    """Change versions for several groups in one cache round trip"""
+    keys = {_version_key(group_id): group_id for group_id in group_ids}
+    found = cache.get_many(keys.keys())
+    versions = {keys[key]: value for key, value in found.items()}
+    for group_id in group_ids:
+        if group_id not in versions:
+            versions[group_id] = get_group_version(group_id)
+    return versions
+
+
+def bump_group_version(group_id):
+    """Mark a group as changed after any write that affects its read models"""
+    # A fresh timestamp rather than incr(): the shared cache's incr is a
+    # read-then-write, and two workers bumping at once must not both land
+    # on the same next version
+    version = time.time_ns()
+    cache.set(_version_key(group_id), version, timeout=None)
+
+    # Wake live streams of the group (see activities/streams.py)
+    hub.publish(group_id, 'version')
+    return version
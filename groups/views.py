@@ -1,5 +1,6 @@
 # groups/views.py
 
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -9,6 +10,7 @@ from drf_spectacular.utils import extend_schema
 
 from .models import Group
 from .serializers import GroupSerializer
+from .versioning import bump_group_version
 from members.models import Membership
 from members.serializers import MembershipSerializer
 
@@ -79,6 +81,9 @@ class GroupViewSet(viewsets.ModelViewSet):
         ser      = self.get_serializer(instance, data=request.data, partial=partial)
         ser.is_valid(raise_exception=True)
         ser.save()
+
+        # Cached read models are keyed on the group version (groups/versioning.py)
+        transaction.on_commit(lambda: bump_group_version(instance.id))
         return Response(
             {"message": "Group updated successfully.", "group": ser.data},
             status=status.HTTP_200_OK
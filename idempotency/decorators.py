@@ -0,0 +1,22 @@
+import functools
+
+from .services import IdempotencyService, HEADER
+
+
+def idempotent(view_method):
+    """
+    Make a viewset action safe to retry with an Idempotency-Key header.
+
+    Requests without the header run as usual. The first request with a
+    given key runs the action and stores its successful response; repeats
+    get that response back without the action running again.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        return IdempotencyService(request, key).run(
+            lambda: view_method(self, request, *args, **kwargs)
+        )
+    return wrapper
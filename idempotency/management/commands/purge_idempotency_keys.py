@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from idempotency.services import IdempotencyService
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys (run periodically, e.g. hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Keys deleted per statement')
+
+    def handle(self, *args, **options):
+        count = IdempotencyService.purge_expired(batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Purged {count} expired idempotency keys')
+        )
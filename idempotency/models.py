@@ -0,0 +1,35 @@
+import uuid
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+User = settings.AUTH_USER_MODEL
+
+class IdempotencyKey(models.Model):
+    """
+    First response to a POST sent with an Idempotency-Key header.
+
+    Repeats of the same request within the TTL are answered from here
+    without running the view again. A row without a status code belongs
+    to a request that is still being processed; if its locked_at is older
+    than IDEMPOTENCY_LOCK_TIMEOUT the worker holding it is presumed dead
+    and a retry may take the claim over.
+    """
+    id           = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user         = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key          = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)  # method, path and body of the first request
+    status_code  = models.PositiveSmallIntegerField(null=True, blank=True)
+    response     = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    locked_at    = models.DateTimeField(default=timezone.now)  # when the current claim was taken
+    expires_at   = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user')
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code or 'in progress'})"
@@ -0,0 +1,118 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+class IdempotencyService:
+    """Runs a view handler at most once per (user, Idempotency-Key)"""
+
+    def __init__(self, request, key):
+        self.request = request
+        self.key = key
+
+    def request_hash(self):
+        body = json.dumps(self.request.data, sort_keys=True, default=str)
+        raw = f"{self.request.method} {self.request.path}\n{body}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def run(self, handler):
+        """Replay the stored response for a repeat, otherwise call `handler` and store its response"""
+        if len(self.key) > 255:
+            return self._error(f'{HEADER} must be at most 255 characters', status.HTTP_400_BAD_REQUEST)
+
+        request_hash = self.request_hash()
+        record = self._claim(request_hash)
+        if record.request_hash != request_hash:
+            return self._error(
+                f'{HEADER} was already used for a different request',
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if record.status_code is not None:
+            response = Response(record.response, status=record.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        if not getattr(record, 'claimed', False):
+            return self._error(
+                f'A request with this {HEADER} is still being processed',
+                status.HTTP_409_CONFLICT
+            )
+
+        try:
+            response = handler()
+        except Exception:
+            record.delete()
+            raise
+
+        # Only successes are kept; failed attempts can simply be retried
+        if status.is_success(response.status_code):
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+        else:
+            record.delete()
+        return response
+
+    def _claim(self, request_hash):
+        """Insert the key, or return the row another request already holds"""
+        now = timezone.now()
+        ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+        lease = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60))
+        while True:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=self.request.user,
+                        key=self.key,
+                        request_hash=request_hash,
+                        expires_at=now + ttl,
+                        locked_at=now,
+                    )
+                record.claimed = True
+                return record
+            except IntegrityError:
+                record = IdempotencyKey.objects.filter(user=self.request.user, key=self.key).first()
+                if record is None:
+                    continue
+                if record.expires_at <= now:
+                    # Expired but not purged yet: free it and try again
+                    record.delete()
+                    continue
+                if (
+                    record.status_code is None
+                    and record.request_hash == request_hash
+                    and record.locked_at <= now - lease
+                ):
+                    # The request holding it never finished (worker died):
+                    # take the claim over, unless another retry just did
+                    taken = IdempotencyKey.objects.filter(
+                        pk=record.pk, status_code__isnull=True, locked_at=record.locked_at
+                    ).update(locked_at=now)
+                    if not taken:
+                        continue
+                    record.locked_at = now
+                    record.claimed = True
+                return record
+
+    def _error(self, message, status_code):
+        return Response({'status': 'error', 'message': message}, status=status_code)
+
+    @staticmethod
+    def purge_expired(batch_size=1000):
+        """Delete expired keys in primary-key batches, returns the number deleted"""
+        expired = IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
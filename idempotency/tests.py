@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from expense.models import Expense
+from groups.models import Group
+from members.models import Membership
+from .models import IdempotencyKey
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw', username='owner')
+        self.group = Group.objects.create(name='Trip', created_by=self.user)
+        Membership.objects.create(user=self.user, group=self.group, role='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/groups/{self.group.id}/expenses/'
+
+    def post(self, key='retry-1', title='Dinner'):
+        return self.client.post(self.url, {
+            'group': str(self.group.id),
+            'title': title,
+            'amount': '30.00',
+            'date': '2026-01-01',
+            'paid_by': str(self.user.id),
+            'split_type': 'equal',
+            'participants': [{'user_id': str(self.user.id)}],
+        }, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def crash_mid_request(self, locked_at):
+        """Leave the key claimed but unfinished, as a worker dying mid-request would"""
+        Expense.objects.all().delete()
+        IdempotencyKey.objects.update(status_code=None, response=None, locked_at=locked_at)
+
+    def test_repeat_replays_the_stored_response(self):
+        first = self.post()
+        second = self.post()
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.post()
+
+        response = self.post(title='Lunch')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_request_in_progress_is_not_run_twice(self):
+        self.post()
+        self.crash_mid_request(locked_at=timezone.now())
+
+        response = self.post()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Expense.objects.exists())
+
+    def test_stale_claim_is_taken_over_by_a_retry(self):
+        self.post()
+        self.crash_mid_request(locked_at=timezone.now() - timedelta(minutes=5))
+
+        response = self.post()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Expense.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
@@ -1,18 +1,15 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from settlements.models import SettlementRequest
+from settlements.services import SettlementRequestService
 
 class Command(BaseCommand):
     help = 'Mark expired settlement requests as expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Requests expired per statement')
     
     def handle(self, *args, **options):
-        now = timezone.now()
-        expired_requests = SettlementRequest.objects.filter(
-            status='pending',
-            expires_at__lt=now
-        )
-        
-        count = expired_requests.update(status='expired')
+        # Lists already treat overdue requests as expired, so this can run rarely
+        count = SettlementRequestService.expire_overdue(batch_size=options['batch_size'])
         
         self.stdout.write(
             self.style.SUCCESS(f'Marked {count} settlement requests as expired')
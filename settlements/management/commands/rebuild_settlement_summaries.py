@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from groups.models import Group
+from settlements.models import GroupSettlementSummary
+
+class Command(BaseCommand):
+    help = 'Recount group settlement summaries from their settlements (repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', action='append', help='Only rebuild this group id (repeatable)')
+
+    def handle(self, *args, **options):
+        groups = Group.objects.filter(settlements__isnull=False).distinct()
+        if options['group']:
+            groups = Group.objects.filter(id__in=options['group'])
+
+        count = 0
+        for group in groups.iterator():
+            summary, _ = GroupSettlementSummary.objects.get_or_create(group=group)
+            summary.update_summary()
+            count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt settlement summaries for {count} groups')
+        )
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0004_group_currency'),
+        ('settlements', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='settlementrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['expires_at'], name='settlement_request_expiry_idx'),
+        ),
+    ]
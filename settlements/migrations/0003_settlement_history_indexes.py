@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0005_group_debt_simplification'),
+        ('settlements', '0002_settlementrequest_expiry_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['group', 'settled_at', 'id'], name='settlement_group_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['group', 'status', 'settled_at', 'id'], name='settlement_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['group', 'payer', 'settled_at', 'id'], name='settlement_payer_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['group', 'receiver', 'settled_at', 'id'], name='settlement_receiver_time_idx'),
+        ),
+    ]
@@ -2,9 +2,13 @@ from django.db import models
 
 # Create your models here.
 import uuid
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Value, Exists, OuterRef, Subquery, Max, Case, When
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from groups.models import Group
 
 User = get_user_model()
@@ -56,28 +60,65 @@ class Settlement(models.Model):
     
     class Meta:
         ordering = ['-settled_at']
+        # Keyset pages of the history walk (settled_at, id) within a group
+        indexes = [
+            models.Index(fields=['group', 'settled_at', 'id'], name='settlement_group_time_idx'),
+            models.Index(fields=['group', 'status', 'settled_at', 'id'], name='settlement_status_time_idx'),
+            models.Index(fields=['group', 'payer', 'settled_at', 'id'], name='settlement_payer_time_idx'),
+            models.Index(fields=['group', 'receiver', 'settled_at', 'id'], name='settlement_receiver_time_idx'),
+        ]
         
     def __str__(self):
         return f"{self.payer.email} paid {self.receiver.email} ${self.amount} in {self.group.name}"
+
+    # Changing any of these re-runs clean() on save
+    VALIDATED_FIELDS = ('group_id', 'payer_id', 'receiver_id', 'amount')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_state()
+        return instance
+
+    def _remember_state(self):
+        """Snapshot the fields validation and the settlement summary depend on, to diff on the next save"""
+        self._saved_state = {
+            field: self.__dict__.get(field)
+            for field in self.VALIDATED_FIELDS + ('status', 'confirmed_at')
+        }
+
+    def _needs_validation(self):
+        saved = getattr(self, '_saved_state', None)
+        if self._state.adding or saved is None:
+            return True
+        return any(self.__dict__.get(field) != saved[field] for field in self.VALIDATED_FIELDS)
         
     def clean(self):
         """Validate settlement data"""
-        if self.payer == self.receiver:
+        if self.payer_id == self.receiver_id:
             raise ValidationError("Payer and receiver cannot be the same person.")
             
         if self.amount <= 0:
             raise ValidationError("Settlement amount must be positive.")
             
-        # Ensure both users are members of the group
+        # Ensure both users are members of the group, in one query
         from members.models import Membership
-        if not Membership.objects.filter(group=self.group, user=self.payer).exists():
+        members = set(
+            Membership.objects.filter(
+                group_id=self.group_id,
+                user_id__in=[self.payer_id, self.receiver_id]
+            ).values_list('user_id', flat=True)
+        )
+        if self.payer_id not in members:
             raise ValidationError("Payer is not a member of this group.")
             
-        if not Membership.objects.filter(group=self.group, user=self.receiver).exists():
+        if self.receiver_id not in members:
             raise ValidationError("Receiver is not a member of this group.")
             
     def save(self, *args, **kwargs):
-        self.clean()
+        # Status-only saves (confirm/reject) skip the membership checks
+        if self._needs_validation():
+            self.clean()
         super().save(*args, **kwargs)
         
         # Update balances when settlement is confirmed
@@ -129,6 +170,15 @@ class SettlementRequest(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves the expiry sweeper and the pending/overdue checks; rows
+            # that are no longer pending never enter the index
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(status='pending'),
+                name='settlement_request_expiry_idx'
+            ),
+        ]
         
     def __str__(self):
         return f"Settlement request: {self.requested_by.email} -> {self.requested_to.email} for ${self.amount}"
@@ -136,9 +186,13 @@ class SettlementRequest(models.Model):
     @property
     def is_expired(self):
         """Check if the settlement request has expired"""
-        from django.utils import timezone
         return timezone.now() > self.expires_at and self.status == 'pending'
 
+    @property
+    def current_status(self):
+        """Status with overdue pending requests reported as expired before the sweeper marks them"""
+        return 'expired' if self.is_expired else self.status
+
 class GroupSettlementSummary(models.Model):
     """
     Tracks overall settlement status for a group.
@@ -164,8 +218,55 @@ class GroupSettlementSummary(models.Model):
     def __str__(self):
         return f"Settlement Summary for {self.group.name}"
         
+    @classmethod
+    def apply_changes(cls, group_id, confirmed=0, amount=Decimal('0.00'), pending=0,
+                      confirmed_at=None, removed_at=None):
+        """
+        Shift a group's counters with a single UPDATE.
+
+        Settlement writes call this with the difference they make (see
+        signals.py). `removed_at` is the confirmed_at of a confirmed
+        settlement that was deleted or changed. A group without a summary
+        row yet gets a full recount.
+        """
+        from balances.models import Balance
+
+        changes = {
+            'total_settlements': F('total_settlements') + confirmed,
+            'total_amount_settled': F('total_amount_settled') + amount,
+            'pending_settlements': F('pending_settlements') + pending,
+            'is_fully_settled': ~Exists(
+                Balance.objects.filter(group_id=OuterRef('group_id'), is_settled=False)
+            ),
+            'updated_at': timezone.now(),
+        }
+        last_date = F('last_settlement_date')
+        if confirmed_at is not None:
+            latest = Value(confirmed_at, output_field=models.DateTimeField())
+            last_date = Greatest(Coalesce('last_settlement_date', latest), latest)
+        if removed_at is not None:
+            # Only a change to the row holding the latest date needs a lookup
+            newest = (
+                Settlement.objects.filter(group_id=OuterRef('group_id'), status='confirmed')
+                .order_by().values('group_id').annotate(latest=Max('confirmed_at')).values('latest')
+            )
+            last_date = Case(
+                When(last_settlement_date__lte=removed_at, then=Subquery(newest)),
+                default=last_date,
+            )
+        if confirmed_at is not None or removed_at is not None:
+            changes['last_settlement_date'] = last_date
+
+        if not cls.objects.filter(group_id=group_id).update(**changes):
+            summary, _ = cls.objects.get_or_create(group_id=group_id)
+            summary.update_summary()
+
     def update_summary(self):
-        """Update settlement statistics for the group"""
+        """
+        Recount settlement statistics for the group from scratch.
+        Writes keep the counters current through apply_changes; this is the
+        repair path used by the rebuild_settlement_summaries command.
+        """
         confirmed_settlements = Settlement.objects.filter(
             group=self.group, 
             status='confirmed'
@@ -189,7 +290,6 @@ class GroupSettlementSummary(models.Model):
         ).exists()
         
         # Get last settlement date
-        last_settlement = confirmed_settlements.first()
-        self.last_settlement_date = last_settlement.confirmed_at if last_settlement else None
+        self.last_settlement_date = confirmed_settlements.aggregate(latest=models.Max('confirmed_at'))['latest']
         
         self.save()
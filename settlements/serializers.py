@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.utils import timezone
 from datetime import timedelta
+from currencies.serializers import validate_currency_code
 from .models import Settlement, SettlementRequest, GroupSettlementSummary
 
 class SettlementSerializer(serializers.ModelSerializer):
@@ -103,6 +104,8 @@ class SettlementRequestSerializer(serializers.ModelSerializer):
     group_id = serializers.UUIDField(source='group.id', read_only=True)
     group_name = serializers.CharField(source='group.name', read_only=True)
     
+    # Overdue pending requests read as expired before the sweeper marks them
+    status = serializers.CharField(source='current_status', read_only=True)
     is_expired = serializers.ReadOnlyField()
     
     class Meta:
@@ -166,6 +169,32 @@ class CreateSettlementRequestSerializer(serializers.ModelSerializer):
         
         return settlement_request
 
+class BulkSettlementActionSerializer(serializers.Serializer):
+    """Ids for a bulk confirm/reject/accept"""
+    
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=500)
+    response_message = serializers.CharField(required=False, allow_blank=True, default='')
+
+class NettingPositionSerializer(serializers.Serializer):
+    """A user's net position against one counterparty across shared groups"""
+
+    counterparty_id = serializers.UUIDField()
+    counterparty_email = serializers.EmailField()
+    currency = serializers.CharField()
+    net_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    group_count = serializers.IntegerField()
+
+class SettleNetSerializer(serializers.Serializer):
+    """Records the netted transfer with one counterparty"""
+
+    counterparty = serializers.UUIDField()
+    currency = serializers.CharField(min_length=3, max_length=3)
+    method = serializers.ChoiceField(choices=Settlement.SETTLEMENT_METHOD_CHOICES, default='cash')
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_currency(self, value):
+        return validate_currency_code(value)
+
 class GroupSettlementSummarySerializer(serializers.ModelSerializer):
     """Serializes group settlement summary"""
     
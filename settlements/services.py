@@ -1,9 +1,16 @@
 from django.db import transaction, models
+from django.core.exceptions import ValidationError, PermissionDenied
 from django.utils import timezone
 from decimal import Decimal
 
+from groups.versioning import bump_group_version
 from .models import Settlement, SettlementRequest, GroupSettlementSummary
 
+
+def _balances_changed(group_id):
+    """Bump the group's change version once the balance update commits"""
+    transaction.on_commit(lambda: bump_group_version(group_id))
+
 class SettlementService:
     """Service class for managing settlements"""
     
@@ -24,9 +31,6 @@ class SettlementService:
                 status='pending'
             )
             
-            # Update group settlement summary
-            self._update_group_summary()
-            
             return settlement
             
     def confirm_settlement(self, settlement, confirmed_by):
@@ -35,18 +39,19 @@ class SettlementService:
             raise ValueError("Only pending settlements can be confirmed.")
             
         with transaction.atomic():
+            # Move the two balances first, so the summary UPDATE fired by the
+            # save already sees whether the group is settled
+            from balances.services import BalanceCalculationService
+            BalanceCalculationService(self.group).apply_deltas(
+                {settlement.payer_id: settlement.amount},
+                {settlement.receiver_id: settlement.amount},
+            )
+
             settlement.status = 'confirmed'
             settlement.confirmed_by = confirmed_by
             settlement.confirmed_at = timezone.now()
-            settlement.save()
-            
-            # Update balances
-            from balances.services import BalanceCalculationService
-            balance_service = BalanceCalculationService(self.group)
-            balance_service.calculate_all_balances()
-            
-            # Update group summary
-            self._update_group_summary()
+            settlement.save(update_fields=['status', 'confirmed_by', 'confirmed_at', 'updated_at'])
+            _balances_changed(self.group.id)
             
             return settlement
             
@@ -58,40 +63,145 @@ class SettlementService:
         settlement.status = 'rejected'
         settlement.confirmed_by = rejected_by
         settlement.confirmed_at = timezone.now()
-        settlement.save()
+        settlement.save(update_fields=['status', 'confirmed_by', 'confirmed_at', 'updated_at'])
         
         return settlement
         
     def settle_all_debts(self, user):
-        """Create settlements for all of user's debts"""
+        """
+        Create pending settlements for all of user's debts.
+
+        Runs as one batch whatever the number of debts: one membership query,
+        one bulk insert and one summary update.
+        """
         from balances.models import DebtSummary
         
         # Get all debts where user is the debtor
-        debts = DebtSummary.objects.filter(
+        debts = list(DebtSummary.objects.filter(
             group=self.group,
             debtor=user,
             is_settled=False
-        )
-        
-        settlements = []
+        ).select_related('creditor'))
+        if not debts:
+            return []
+
+        self._validate_many([(user.id, debt.creditor_id, debt.amount) for debt in debts])
+
+        settlements = [
+            Settlement(
+                group=self.group,
+                payer=user,
+                receiver=debt.creditor,
+                amount=debt.amount,
+                initiated_by=user,
+                status='pending'
+            )
+            for debt in debts
+        ]
         with transaction.atomic():
-            for debt in debts:
-                settlement = self.create_settlement(
-                    payer=debt.debtor,
-                    receiver=debt.creditor,
-                    amount=debt.amount,
-                    initiated_by=user
-                )
-                settlements.append(settlement)
-                
+            # bulk_create skips save() and the signals, so the summary is moved here
+            Settlement.objects.bulk_create(settlements)
+            GroupSettlementSummary.apply_changes(self.group.id, pending=len(settlements))
+
+        for settlement in settlements:
+            settlement._remember_state()
         return settlements
-        
-    def _update_group_summary(self):
-        """Update or create group settlement summary"""
-        summary, created = GroupSettlementSummary.objects.get_or_create(
-            group=self.group
+
+    def bulk_confirm(self, settlement_ids, confirmed_by):
+        """Confirm many pending settlements received by one user at once"""
+        return self._bulk_transition(settlement_ids, confirmed_by, 'confirmed')
+
+    def bulk_reject(self, settlement_ids, rejected_by):
+        """Reject many pending settlements received by one user at once"""
+        return self._bulk_transition(settlement_ids, rejected_by, 'rejected')
+
+    def _bulk_transition(self, settlement_ids, user, new_status):
+        """
+        Move pending settlements to `new_status` with a single guarded UPDATE,
+        one summary update and at most one balance update for the batch.
+        """
+        settlement_ids = list(dict.fromkeys(settlement_ids))
+        settlements = {
+            settlement.id: settlement
+            for settlement in Settlement.objects.filter(
+                group=self.group, id__in=settlement_ids
+            ).select_related('payer', 'receiver', 'initiated_by', 'group')
+        }
+
+        missing = [str(i) for i in settlement_ids if i not in settlements]
+        if missing:
+            raise ValueError(f"Settlements not found: {', '.join(missing)}")
+        if any(s.receiver_id != user.id for s in settlements.values()):
+            raise PermissionDenied("Only the receiver can confirm or reject a settlement.")
+        not_pending = [str(s.id) for s in settlements.values() if s.status != 'pending']
+        if not_pending:
+            raise ValueError(f"Only pending settlements can be changed: {', '.join(not_pending)}")
+
+        now = timezone.now()
+        with transaction.atomic():
+            updated = Settlement.objects.filter(
+                id__in=settlement_ids,
+                status='pending',
+                receiver=user
+            ).update(status=new_status, confirmed_by=user, confirmed_at=now, updated_at=now)
+            if updated != len(settlement_ids):
+                raise ValueError("Some settlements were changed by another request, please retry.")
+
+            # update() skips the signals, so the summary is moved here
+            if new_status == 'confirmed':
+                # Balances first, so is_fully_settled sees the new debts:
+                # payers paid, and the receiver was paid back the total
+                from balances.services import BalanceCalculationService
+                paid, owed = {}, {}
+                for s in settlements.values():
+                    paid[s.payer_id] = paid.get(s.payer_id, Decimal('0.00')) + s.amount
+                    owed[s.receiver_id] = owed.get(s.receiver_id, Decimal('0.00')) + s.amount
+                BalanceCalculationService(self.group).apply_deltas(paid, owed)
+                GroupSettlementSummary.apply_changes(
+                    self.group.id,
+                    confirmed=updated,
+                    amount=sum(s.amount for s in settlements.values()),
+                    pending=-updated,
+                    confirmed_at=now,
+                )
+                _balances_changed(self.group.id)
+            else:
+                GroupSettlementSummary.apply_changes(self.group.id, pending=-updated)
+
+        result = []
+        for settlement_id in settlement_ids:
+            settlement = settlements[settlement_id]
+            settlement.status = new_status
+            settlement.confirmed_by = user
+            settlement.confirmed_at = now
+            settlement.updated_at = now
+            settlement._remember_state()
+            result.append(settlement)
+        return result
+
+    def _validate_many(self, transfers):
+        """
+        Settlement.clean's rules for many (payer_id, receiver_id, amount)
+        transfers at once, with a single membership query.
+        """
+        from members.models import Membership
+
+        users = {payer_id for payer_id, _, _ in transfers} | {receiver_id for _, receiver_id, _ in transfers}
+        members = set(
+            Membership.objects.filter(
+                group=self.group,
+                user_id__in=users
+            ).values_list('user_id', flat=True)
         )
-        summary.update_summary()
+        for payer_id, receiver_id, amount in transfers:
+            if payer_id == receiver_id:
+                raise ValidationError("Payer and receiver cannot be the same person.")
+            if amount <= 0:
+                raise ValidationError("Settlement amount must be positive.")
+            if payer_id not in members:
+                raise ValidationError("Payer is not a member of this group.")
+            if receiver_id not in members:
+                raise ValidationError("Receiver is not a member of this group.")
         
     def get_user_settlement_status(self, user):
         """Get settlement status for a specific user"""
@@ -128,12 +238,13 @@ class SettlementRequestService:
         """Create a settlement request"""
         from datetime import timedelta
         
-        # Check for existing pending request
+        # Check for existing pending request (overdue ones count as expired)
         existing_request = SettlementRequest.objects.filter(
             group=self.group,
             requested_by=requested_by,
             requested_to=requested_to,
-            status='pending'
+            status='pending',
+            expires_at__gt=timezone.now()
         ).first()
         
         if existing_request:
@@ -175,10 +286,122 @@ class SettlementRequestService:
             request_obj.response_message = response_message
             request_obj.responded_at = timezone.now()
             request_obj.settlement = settlement
-            request_obj.save()
+            request_obj.save(update_fields=['status', 'response_message', 'responded_at', 'settlement', 'updated_at'])
             
             return settlement
+
+    def bulk_accept(self, request_ids, user, response_message=''):
+        """
+        Accept many pending requests sent to one user at once.
+
+        Creates one pending settlement per request with bulk_create and links
+        them with a single guarded UPDATE of the requests.
+        """
+        request_ids = list(dict.fromkeys(request_ids))
+        requests = {
+            request_obj.id: request_obj
+            for request_obj in SettlementRequest.objects.filter(
+                group=self.group, id__in=request_ids
+            ).select_related('requested_by', 'requested_to', 'group')
+        }
+
+        missing = [str(i) for i in request_ids if i not in requests]
+        if missing:
+            raise ValueError(f"Settlement requests not found: {', '.join(missing)}")
+        if any(r.requested_to_id != user.id for r in requests.values()):
+            raise PermissionDenied("You can only accept requests sent to you.")
+        not_pending = [str(r.id) for r in requests.values() if r.status != 'pending']
+        if not_pending:
+            raise ValueError(f"Only pending requests can be accepted: {', '.join(not_pending)}")
+        expired = [str(r.id) for r in requests.values() if r.is_expired]
+        if expired:
+            raise ValueError(f"These settlement requests have expired: {', '.join(expired)}")
+
+        settlement_service = SettlementService(self.group)
+        settlement_service._validate_many([
+            (r.requested_by_id, r.requested_to_id, r.amount) for r in requests.values()
+        ])
+
+        settlements = {
+            request_id: Settlement(
+                group=self.group,
+                payer=requests[request_id].requested_by,
+                receiver=requests[request_id].requested_to,
+                amount=requests[request_id].amount,
+                initiated_by=requests[request_id].requested_by,
+                status='pending'
+            )
+            for request_id in request_ids
+        }
+
+        now = timezone.now()
+        with transaction.atomic():
+            Settlement.objects.bulk_create(settlements.values())
+            updated = SettlementRequest.objects.filter(
+                id__in=request_ids,
+                status='pending',
+                requested_to=user,
+                expires_at__gt=now
+            ).update(
+                status='accepted',
+                response_message=response_message,
+                responded_at=now,
+                updated_at=now,
+                settlement_id=models.Case(
+                    *[
+                        models.When(id=request_id, then=models.Value(settlement.id))
+                        for request_id, settlement in settlements.items()
+                    ],
+                    output_field=models.UUIDField()
+                )
+            )
+            if updated != len(request_ids):
+                raise ValueError("Some settlement requests were changed by another request, please retry.")
+
+            GroupSettlementSummary.apply_changes(self.group.id, pending=len(settlements))
+
+        for settlement in settlements.values():
+            settlement._remember_state()
+        return list(settlements.values())
             
+    @staticmethod
+    def filter_status(queryset, status):
+        """
+        Filter requests by their current status.
+
+        Pending requests past expires_at count as expired even before the
+        sweeper has marked them, so lists never need a write to be correct.
+        """
+        now = timezone.now()
+        if status == 'pending':
+            return queryset.filter(status='pending', expires_at__gt=now)
+        if status == 'expired':
+            return queryset.filter(
+                models.Q(status='expired') | models.Q(status='pending', expires_at__lte=now)
+            )
+        return queryset.filter(status=status)
+
+    @staticmethod
+    def expire_overdue(batch_size=1000):
+        """
+        Mark overdue pending requests as expired, one short batch at a time.
+
+        Each batch is picked through the partial expiry index and updated in
+        its own statement, so no lock is held across the whole table.
+        Returns the number of requests expired.
+        """
+        now = timezone.now()
+        overdue = SettlementRequest.objects.filter(status='pending', expires_at__lte=now)
+        expired = 0
+        while True:
+            ids = list(overdue.order_by('expires_at').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return expired
+            expired += SettlementRequest.objects.filter(
+                id__in=ids,
+                status='pending'
+            ).update(status='expired', updated_at=now)
+
     def reject_request(self, request_obj, response_message=''):
         """Reject a settlement request"""
         if request_obj.status != 'pending':
@@ -187,6 +410,143 @@ class SettlementRequestService:
         request_obj.status = 'rejected'
         request_obj.response_message = response_message
         request_obj.responded_at = timezone.now()
-        request_obj.save()
+        request_obj.save(update_fields=['status', 'response_message', 'responded_at', 'updated_at'])
         
-        return request_obj
\ No newline at end of file
+        return request_obj
+
+class SettlementNettingService:
+    """
+    Nets one user's debts with each counterparty across every group they share.
+
+    Positions are read from the unsettled DebtSummary edges of all groups in
+    one grouped query. Groups only net against others in the same currency.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def positions(self, counterparty_id=None, currency=None):
+        """
+        Net position against each counterparty, per currency.
+        A positive `net_amount` means the counterparty owes the user.
+        """
+        from balances.models import DebtSummary
+
+        user_is_debtor = models.Q(debtor=self.user)
+        edges = DebtSummary.objects.filter(
+            models.Q(debtor=self.user) | models.Q(creditor=self.user),
+            is_settled=False
+        )
+        if counterparty_id is not None:
+            edges = edges.filter(models.Q(debtor_id=counterparty_id) | models.Q(creditor_id=counterparty_id))
+        if currency is not None:
+            edges = edges.filter(group__currency=currency)
+
+        rows = edges.values(
+            counterparty_id=models.Case(
+                models.When(user_is_debtor, then=models.F('creditor_id')),
+                default=models.F('debtor_id'),
+                output_field=models.UUIDField(),
+            ),
+            counterparty_email=models.Case(
+                models.When(user_is_debtor, then=models.F('creditor__email')),
+                default=models.F('debtor__email'),
+            ),
+            currency=models.F('group__currency'),
+        ).annotate(
+            net_amount=models.Sum(models.Case(
+                models.When(user_is_debtor, then=-models.F('amount')),
+                default=models.F('amount'),
+            )),
+            group_count=models.Count('group_id', distinct=True),
+        ).order_by('counterparty_email', 'currency')
+
+        return list(rows)
+
+    def settle(self, counterparty, currency, method='cash', notes=''):
+        """
+        Record the net transfer with `counterparty` in `currency`.
+
+        Every debt edge between the two users becomes a confirmed Settlement,
+        so the payments in each group add up to the one net transfer. Only the
+        net receiver, who confirms having been paid, can record it.
+        Returns the settlements created.
+        """
+        from balances.models import DebtSummary
+        from balances.services import BalanceCalculationService
+        from members.models import Membership
+
+        if counterparty.id == self.user.id:
+            raise ValueError("You cannot net debts with yourself.")
+
+        with transaction.atomic():
+            edges = list(
+                DebtSummary.objects.select_for_update().filter(
+                    models.Q(debtor=self.user, creditor=counterparty) |
+                    models.Q(debtor=counterparty, creditor=self.user),
+                    group__currency=currency,
+                    is_settled=False
+                ).select_related('group')
+            )
+            if not edges:
+                raise ValueError("There are no open debts with this user to net.")
+
+            net = sum(edge.amount if edge.creditor_id == self.user.id else -edge.amount for edge in edges)
+            if net < 0:
+                raise PermissionDenied(
+                    "You owe this user overall; they record the netted transfer once they have been paid."
+                )
+
+            groups = {edge.group_id: edge.group for edge in edges}
+            memberships = set(
+                Membership.objects.filter(
+                    group_id__in=groups,
+                    user_id__in=[self.user.id, counterparty.id]
+                ).values_list('group_id', 'user_id')
+            )
+            for group_id, group in groups.items():
+                if (group_id, self.user.id) not in memberships or (group_id, counterparty.id) not in memberships:
+                    raise ValidationError(f"Both users must still be members of {group.name}.")
+
+            now = timezone.now()
+            settlements = [
+                Settlement(
+                    group=edge.group,
+                    payer_id=edge.debtor_id,
+                    receiver_id=edge.creditor_id,
+                    amount=edge.amount,
+                    method=method,
+                    notes=notes or f"Netted across {len(groups)} groups",
+                    status='confirmed',
+                    initiated_by=self.user,
+                    confirmed_by=self.user,
+                    confirmed_at=now,
+                )
+                for edge in edges
+            ]
+            # bulk_create skips save() and the signals, so the summaries are moved here
+            Settlement.objects.bulk_create(settlements)
+
+            by_group = {}
+            for settlement in settlements:
+                by_group.setdefault(settlement.group_id, []).append(settlement)
+            for group_id, group_settlements in by_group.items():
+                # One balance update per group: payers paid, receivers were paid back
+                paid, owed = {}, {}
+                for s in group_settlements:
+                    paid[s.payer_id] = paid.get(s.payer_id, Decimal('0.00')) + s.amount
+                    owed[s.receiver_id] = owed.get(s.receiver_id, Decimal('0.00')) + s.amount
+                BalanceCalculationService(groups[group_id]).apply_deltas(paid, owed)
+
+                # After the balances, so is_fully_settled sees the new debts
+                GroupSettlementSummary.apply_changes(
+                    group_id,
+                    confirmed=len(group_settlements),
+                    amount=sum(s.amount for s in group_settlements),
+                    confirmed_at=now,
+                )
+                _balances_changed(group_id)
+
+        for settlement in settlements:
+            settlement._remember_state()
+        return settlements
@@ -1,20 +1,53 @@
+from decimal import Decimal
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Settlement, GroupSettlementSummary
 
+
+def _counts(status, amount, sign):
+    """Contribution of one settlement to the summary counters"""
+    confirmed = status == 'confirmed'
+    return {
+        'confirmed': sign if confirmed else 0,
+        'amount': sign * Decimal(str(amount)) if confirmed else Decimal('0.00'),
+        'pending': sign if status == 'pending' else 0,
+    }
+
+
 @receiver(post_save, sender=Settlement)
 def update_settlement_summary_on_save(sender, instance, created, **kwargs):
-    """Update group settlement summary when settlement is saved"""
-    summary, created = GroupSettlementSummary.objects.get_or_create(
-        group=instance.group
+    """Move the group settlement summary by what this save changed"""
+    saved = {} if created else getattr(instance, '_saved_state', {})
+    old_status = saved.get('status')
+    old_amount = saved.get('amount')
+    instance._remember_state()
+
+    if not created and (old_status is None or old_amount is None):
+        # Saved without its previous state loaded: nothing to diff against
+        summary, _ = GroupSettlementSummary.objects.get_or_create(group_id=instance.group_id)
+        summary.update_summary()
+        return
+    old_confirmed_at = saved.get('confirmed_at') if old_status == 'confirmed' else None
+    new_confirmed_at = instance.confirmed_at if instance.status == 'confirmed' else None
+    if (old_status, old_amount, old_confirmed_at) == (instance.status, instance.amount, new_confirmed_at):
+        return
+
+    added = _counts(instance.status, instance.amount, 1)
+    removed = _counts(old_status, old_amount, -1)
+    GroupSettlementSummary.apply_changes(
+        instance.group_id,
+        confirmed=added['confirmed'] + removed['confirmed'],
+        amount=added['amount'] + removed['amount'],
+        pending=added['pending'] + removed['pending'],
+        confirmed_at=new_confirmed_at,
+        removed_at=old_confirmed_at if old_confirmed_at != new_confirmed_at else None,
     )
-    summary.update_summary()
+
 
 @receiver(post_delete, sender=Settlement)
 def update_settlement_summary_on_delete(sender, instance, **kwargs):
-    """Update group settlement summary when settlement is deleted"""
-    try:
-        summary = GroupSettlementSummary.objects.get(group=instance.group)
-        summary.update_summary()
-    except GroupSettlementSummary.DoesNotExist:
-        pass
\ No newline at end of file
+    """Take a deleted settlement out of the group settlement summary"""
+    removed = _counts(instance.status, instance.amount, -1)
+    if any(removed.values()):
+        removed_at = instance.confirmed_at if instance.status == 'confirmed' else None
+        GroupSettlementSummary.apply_changes(instance.group_id, removed_at=removed_at, **removed)
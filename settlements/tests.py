@@ -1,3 +1,589 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from groups.models import Group
+from members.models import Membership
+from balances.models import Balance, DebtSummary
+from balances.services import BalanceCalculationService
+from .models import Settlement, SettlementRequest, GroupSettlementSummary
+from .services import SettlementService, SettlementRequestService, SettlementNettingService
+
+
+class SettlementHistoryPaginationTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(3)
+        ]
+        self.group = Group.objects.create(name='Trip', created_by=self.users[0])
+        for user in self.users:
+            Membership.objects.create(user=user, group=self.group)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+        self.url = f'/api/v1/groups/{self.group.id}/settlements/'
+
+    def create_settlements(self, pairs):
+        Settlement.objects.bulk_create([
+            Settlement(
+                group=self.group, payer=payer, receiver=receiver, amount=Decimal('5.00'),
+                initiated_by=payer, status='confirmed',
+            )
+            for payer, receiver in pairs
+        ])
+        # Every row shares one timestamp, so only the id breaks ties
+        Settlement.objects.update(settled_at=timezone.now())
+
+    def walk(self, **params):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(self.url, {'page_size': 2, **params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['data']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_are_stable_across_equal_timestamps(self):
+        me, other, third = self.users
+        self.create_settlements([(me, other), (other, third)] * 4)
+
+        ids = self.walk()
+
+        expected = Settlement.objects.order_by('-settled_at', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, [str(pk) for pk in expected])
+
+    def test_user_filter_merges_payer_and_receiver_sides(self):
+        me, other, third = self.users
+        self.create_settlements([(me, other), (other, me), (other, third)] * 3)
+
+        ids = self.walk(user='me')
+
+        mine = Settlement.objects.filter(payer=me) | Settlement.objects.filter(receiver=me)
+        expected = mine.order_by('-settled_at', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, [str(pk) for pk in expected])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ConfirmSettlementTests(TestCase):
+    def setUp(self):
+        self.payer, self.receiver = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(2)
+        ]
+        self.group = Group.objects.create(name='Trip', created_by=self.receiver)
+        for user in (self.payer, self.receiver):
+            Membership.objects.create(user=user, group=self.group)
+
+        client = APIClient()
+        client.force_authenticate(self.receiver)
+        response = client.post(f'/api/v1/groups/{self.group.id}/expenses/', {
+            'group': str(self.group.id), 'title': 'Dinner', 'amount': '20.00', 'date': '2026-01-01',
+            'paid_by': str(self.receiver.id), 'split_type': 'equal',
+            'participants': [{'user_id': str(self.payer.id)}, {'user_id': str(self.receiver.id)}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        # Stored balances are refreshed when they are read
+        self.assertEqual(client.get(f'/api/v1/groups/{self.group.id}/balances/').status_code, 200)
+
+    def balances(self):
+        return dict(Balance.objects.filter(group=self.group).values_list('user_id', 'net_balance'))
+
+    def test_confirm_moves_balances_and_updates_summary_once(self):
+        service = SettlementService(self.group)
+        settlement = service.create_settlement(self.payer, self.receiver, Decimal('10.00'))
+
+        with CaptureQueriesContext(connection) as queries:
+            service.confirm_settlement(settlement, self.receiver)
+
+        summary_updates = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE') and GroupSettlementSummary._meta.db_table in q['sql']
+        ]
+        self.assertEqual(len(summary_updates), 1)
+
+        summary = GroupSettlementSummary.objects.get(group=self.group)
+        self.assertEqual((summary.total_settlements, summary.pending_settlements), (1, 0))
+        self.assertTrue(summary.is_fully_settled)
+
+        # The deltas land where a full recompute would
+        moved = self.balances()
+        BalanceCalculationService(self.group).calculate_all_balances()
+        self.assertEqual(moved, self.balances())
+        self.assertEqual(set(moved.values()), {Decimal('0.00')})
+
+
+
+
+class SettleAllDebtsTests(TestCase):
+    def setUp(self):
+        self.debtor, *self.creditors = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(6)
+        ]
+        self.group = Group.objects.create(name='Trip', created_by=self.debtor)
+        for user in (self.debtor, *self.creditors):
+            Membership.objects.create(user=user, group=self.group)
+        self.service = SettlementService(self.group)
+        GroupSettlementSummary.objects.create(group=self.group)
+
+    def owe(self, creditor, amount, is_settled=False):
+        DebtSummary.objects.create(
+            group=self.group, debtor=self.debtor, creditor=creditor, amount=Decimal(amount), is_settled=is_settled
+        )
+
+    def test_open_debts_become_pending_settlements(self):
+        self.owe(self.creditors[0], '12.50')
+        self.owe(self.creditors[1], '3.00')
+        self.owe(self.creditors[2], '8.00', is_settled=True)
+
+        settlements = self.service.settle_all_debts(self.debtor)
+
+        self.assertEqual(
+            sorted((s.receiver_id, s.amount, s.status) for s in settlements),
+            sorted([(self.creditors[0].id, Decimal('12.50'), 'pending'), (self.creditors[1].id, Decimal('3.00'), 'pending')]),
+        )
+        self.assertEqual(Settlement.objects.filter(group=self.group, payer=self.debtor).count(), 2)
+        self.assertEqual(GroupSettlementSummary.objects.get(group=self.group).pending_settlements, 2)
+        self.assertEqual(self.service.settle_all_debts(self.creditors[0]), [])
+
+    def test_query_count_does_not_grow_with_the_debts(self):
+        self.owe(self.creditors[0], '1.00')
+        with CaptureQueriesContext(connection) as one:
+            self.service.settle_all_debts(self.debtor)
+
+        DebtSummary.objects.all().delete()
+        for creditor in self.creditors:
+            self.owe(creditor, '1.00')
+        with CaptureQueriesContext(connection) as five:
+            self.service.settle_all_debts(self.debtor)
+
+        self.assertEqual(len(five), len(one))
+        self.assertEqual(GroupSettlementSummary.objects.get(group=self.group).pending_settlements, 6)
+
+    def test_a_creditor_who_left_the_group_blocks_the_batch(self):
+        self.owe(self.creditors[0], '1.00')
+        self.owe(self.creditors[1], '1.00')
+        Membership.objects.filter(group=self.group, user=self.creditors[1]).delete()
+
+        with self.assertRaisesMessage(ValidationError, 'Receiver is not a member of this group.'):
+            self.service.settle_all_debts(self.debtor)
+        self.assertFalse(Settlement.objects.exists())
+
+
+
+class SettlementValidationTests(TestCase):
+    def setUp(self):
+        self.payer, self.receiver, self.outsider = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(3)
+        ]
+        self.group = Group.objects.create(name='Trip', created_by=self.receiver)
+        for user in (self.payer, self.receiver):
+            Membership.objects.create(user=user, group=self.group)
+        self.settlement = SettlementService(self.group).create_settlement(self.payer, self.receiver, Decimal('5.00'))
+
+    def membership_queries(self, save):
+        with CaptureQueriesContext(connection) as queries:
+            save()
+        return [q['sql'] for q in queries.captured_queries if Membership._meta.db_table in q['sql']]
+
+    def test_status_changes_skip_validation(self):
+        settlement = Settlement.objects.get(id=self.settlement.id)
+        # Validation would now fail, but a status change does not re-run it
+        Membership.objects.filter(user=self.payer).delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            SettlementService(self.group).reject_settlement(settlement, self.receiver)
+
+        settlement_writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')
+                             and f'"{Settlement._meta.db_table}"' in q['sql']]
+        self.assertEqual(len(settlement_writes), 1)
+        self.assertNotIn('"amount"', settlement_writes[0])
+        self.assertFalse([q for q in queries.captured_queries if Membership._meta.db_table in q['sql']])
+
+        settlement.notes = 'Paid in cash'
+        self.assertEqual(self.membership_queries(settlement.save), [])
+
+    def test_changed_parties_or_amounts_are_validated(self):
+        settlement = Settlement.objects.get(id=self.settlement.id)
+
+        settlement.amount = Decimal('-1.00')
+        with self.assertRaisesMessage(ValidationError, 'Settlement amount must be positive.'):
+            settlement.save()
+
+        settlement.amount = Decimal('6.00')
+        self.assertEqual(len(self.membership_queries(settlement.save)), 1)
+
+        settlement.receiver = self.outsider
+        with self.assertRaisesMessage(ValidationError, 'Receiver is not a member of this group.'):
+            settlement.save()
+
+    def test_new_settlements_are_always_validated(self):
+        with self.assertRaisesMessage(ValidationError, 'Payer is not a member of this group.'):
+            SettlementService(self.group).create_settlement(self.outsider, self.receiver, Decimal('5.00'))
+
+
+
+class BulkSettlementTests(TestCase):
+    def setUp(self):
+        self.receiver, self.first, self.second = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(3)
+        ]
+        self.group = Group.objects.create(name='Flat', created_by=self.receiver)
+        for user in (self.receiver, self.first, self.second):
+            Membership.objects.create(user=user, group=self.group)
+
+        # Both flatmates owe the receiver 10.00
+        self.client = APIClient()
+        self.client.force_authenticate(self.receiver)
+        response = self.client.post(f'/api/v1/groups/{self.group.id}/expenses/', {
+            'group': str(self.group.id), 'title': 'Rent', 'amount': '30.00', 'date': '2026-01-01',
+            'paid_by': str(self.receiver.id), 'split_type': 'equal',
+            'participants': [{'user_id': str(u.id)} for u in (self.receiver, self.first, self.second)],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        BalanceCalculationService(self.group).calculate_all_balances()
+
+        self.service = SettlementService(self.group)
+        self.settlements = [
+            self.service.create_settlement(payer, self.receiver, Decimal(amount))
+            for payer, amount in ((self.first, '10.00'), (self.second, '4.00'))
+        ]
+        self.ids = [s.id for s in self.settlements]
+
+    def state(self):
+        summary = GroupSettlementSummary.objects.get(group=self.group)
+        return (
+            sorted(Settlement.objects.filter(group=self.group).values_list('id', 'status')),
+            sorted(Balance.objects.filter(group=self.group).values_list('user_id', 'total_paid', 'total_owed')),
+            (summary.total_settlements, summary.total_amount_settled, summary.pending_settlements),
+        )
+
+    def concurrently(self, write):
+        """Run `write` between the batch's checks and its guarded UPDATE"""
+        from settlements import services
+
+        now = timezone.now
+        return mock.patch.object(services, 'timezone', mock.Mock(now=lambda: (write(), now())[1]))
+
+    def test_bulk_confirm_moves_balances_once_and_shifts_the_summary(self):
+        apply_deltas = BalanceCalculationService.apply_deltas
+        with mock.patch.object(BalanceCalculationService, 'apply_deltas', autospec=True,
+                               side_effect=apply_deltas) as moved, \
+                mock.patch.object(BalanceCalculationService, 'calculate_all_balances') as recomputed:
+            response = self.client.post(
+                f'/api/v1/groups/{self.group.id}/settlements/bulk_confirm/',
+                {'ids': [str(i) for i in self.ids]}, format='json',
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(moved.call_count, 1)
+        recomputed.assert_not_called()
+        self.assertEqual(
+            set(Settlement.objects.filter(id__in=self.ids).values_list('status', flat=True)), {'confirmed'}
+        )
+        summary = GroupSettlementSummary.objects.get(group=self.group)
+        self.assertEqual(
+            (summary.total_settlements, summary.total_amount_settled, summary.pending_settlements),
+            (2, Decimal('14.00'), 0),
+        )
+        self.assertIsNotNone(summary.last_settlement_date)
+
+        # The deltas land where a full recompute would
+        moved = sorted(Balance.objects.filter(group=self.group).values_list('user_id', 'total_paid', 'total_owed'))
+        BalanceCalculationService(self.group).calculate_all_balances()
+        self.assertEqual(
+            moved, sorted(Balance.objects.filter(group=self.group).values_list('user_id', 'total_paid', 'total_owed'))
+        )
+        self.assertIn((self.receiver.id, Decimal('30.00'), Decimal('24.00')), moved)
+
+    def test_bulk_reject_only_moves_the_pending_count(self):
+        before = self.state()
+
+        self.service.bulk_reject(self.ids, self.receiver)
+
+        statuses, balances, summary = self.state()
+        self.assertEqual({status for _, status in statuses}, {'rejected'})
+        self.assertEqual(balances, before[1])
+        self.assertEqual(summary, (0, Decimal('0.00'), 0))
+
+    def test_only_the_receiver_can_change_the_batch(self):
+        before = self.state()
+
+        with self.assertRaises(PermissionDenied):
+            self.service.bulk_confirm(self.ids, self.first)
+        response = self.client.post(
+            f'/api/v1/groups/{self.group.id}/settlements/bulk_reject/', {'ids': [str(self.ids[0])]}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(self.second)
+        response = self.client.post(
+            f'/api/v1/groups/{self.group.id}/settlements/bulk_confirm/', {'ids': [str(self.ids[1])]}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+        self.assertEqual(self.state()[1], before[1])
+
+    def test_a_concurrent_change_rolls_the_whole_batch_back(self):
+        before = self.state()
+        reject_one = lambda: Settlement.objects.filter(id=self.ids[1]).update(status='rejected')
+
+        with self.concurrently(reject_one), self.assertRaisesMessage(ValueError, 'please retry'):
+            self.service.bulk_confirm(self.ids, self.receiver)
+
+        statuses, balances, summary = self.state()
+        self.assertEqual(dict(statuses)[self.ids[0]], 'pending')
+        self.assertEqual((balances, summary), before[1:])
+
+    def request(self, requested_by, amount):
+        return SettlementRequest.objects.create(
+            group=self.group, requested_by=requested_by, requested_to=self.receiver, amount=Decimal(amount),
+            expires_at=timezone.now() + timedelta(days=7),
+        )
+
+    def test_bulk_accept_creates_linked_pending_settlements(self):
+        requests = [self.request(self.first, '1.00'), self.request(self.second, '2.00')]
+
+        response = self.client.post(
+            f'/api/v1/groups/{self.group.id}/settlements/requests/bulk_accept/',
+            {'ids': [str(r.id) for r in requests], 'response_message': 'Thanks'}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        for request_obj in requests:
+            request_obj.refresh_from_db()
+            self.assertEqual((request_obj.status, request_obj.response_message), ('accepted', 'Thanks'))
+            self.assertEqual(
+                (request_obj.settlement.payer_id, request_obj.settlement.amount, request_obj.settlement.status),
+                (request_obj.requested_by_id, request_obj.amount, 'pending'),
+            )
+        self.assertEqual(GroupSettlementSummary.objects.get(group=self.group).pending_settlements, 4)
+
+    def test_bulk_accept_checks_the_recipient_and_rolls_back_on_a_race(self):
+        requests = [self.request(self.first, '1.00'), self.request(self.second, '2.00')]
+        ids = [r.id for r in requests]
+        service = SettlementRequestService(self.group)
+        before = self.state()
+
+        with self.assertRaises(PermissionDenied):
+            service.bulk_accept(ids, self.first)
+
+        reject_one = lambda: SettlementRequest.objects.filter(id=ids[1]).update(status='rejected')
+        with self.concurrently(reject_one), self.assertRaisesMessage(ValueError, 'please retry'):
+            service.bulk_accept(ids, self.receiver)
+
+        self.assertEqual(self.state(), before)
+        self.assertEqual(SettlementRequest.objects.get(id=ids[0]).status, 'pending')
+
+
+
+class SettlementRequestExpiryTests(TestCase):
+    def setUp(self):
+        self.sender, self.recipient = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(2)
+        ]
+        self.group = Group.objects.create(name='Trip', created_by=self.sender)
+        for user in (self.sender, self.recipient):
+            Membership.objects.create(user=user, group=self.group)
+        now = timezone.now()
+        self.live = self.request(now + timedelta(days=1))
+        self.overdue = [self.request(now - timedelta(hours=hours)) for hours in (1, 2, 3)]
+        self.answered = self.request(now - timedelta(days=1), status='accepted')
+
+    def request(self, expires_at, status='pending'):
+        return SettlementRequest.objects.create(
+            group=self.group, requested_by=self.sender, requested_to=self.recipient,
+            amount=Decimal('5.00'), expires_at=expires_at, status=status,
+        )
+
+    def listed(self, status):
+        client = APIClient()
+        client.force_authenticate(self.recipient)
+        response = client.get(f'/api/v1/groups/{self.group.id}/settlements/requests/', {'status': status})
+        self.assertEqual(response.status_code, 200)
+        return {(row['id'], row['status']) for row in response.data['data']}
+
+    def test_overdue_requests_read_as_expired_before_the_sweep(self):
+        self.assertEqual(self.listed('pending'), {(str(self.live.id), 'pending')})
+        self.assertEqual(self.listed('expired'), {(str(r.id), 'expired') for r in self.overdue})
+        self.assertEqual(self.listed('accepted'), {(str(self.answered.id), 'accepted')})
+        self.assertEqual(SettlementRequest.objects.filter(status='pending').count(), 4)
+
+    def test_expire_overdue_marks_requests_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            expired = SettlementRequestService.expire_overdue(batch_size=2)
+
+        self.assertEqual(expired, 3)
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]), 2)
+        self.assertEqual(
+            dict(SettlementRequest.objects.values_list('id', 'status')),
+            {self.live.id: 'pending', self.answered.id: 'accepted', **{r.id: 'expired' for r in self.overdue}},
+        )
+        # The lists read the same before and after the sweep
+        self.assertEqual(self.listed('expired'), {(str(r.id), 'expired') for r in self.overdue})
+        self.assertEqual(SettlementRequestService.expire_overdue(), 0)
+
+    def test_expire_command(self):
+        out = StringIO()
+
+        call_command('expire_settlement_requests', '--batch-size', '1', stdout=out)
+
+        self.assertIn('Marked 3 settlement requests as expired', out.getvalue())
+        self.assertEqual(SettlementRequest.objects.filter(status='expired').count(), 3)
+
+
+class SettlementSummaryTests(TestCase):
+    def setUp(self):
+        self.payer, self.receiver = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(2)
+        ]
+        self.group = Group.objects.create(name='Trip', created_by=self.receiver)
+        for user in (self.payer, self.receiver):
+            Membership.objects.create(user=user, group=self.group)
+        self.now = timezone.now()
+
+    def confirmed(self, days_ago):
+        return Settlement.objects.create(
+            group=self.group, payer=self.payer, receiver=self.receiver, amount=Decimal('5.00'),
+            status='confirmed', initiated_by=self.payer, confirmed_by=self.receiver,
+            confirmed_at=self.now - timedelta(days=days_ago),
+        )
+
+    def assertLastSettlement(self, expected):
+        summary = GroupSettlementSummary.objects.get(group=self.group)
+        self.assertEqual(summary.last_settlement_date, expected)
+        summary.update_summary()
+        self.assertEqual(summary.last_settlement_date, expected)
+
+    def test_last_settlement_date_follows_deletes_and_changes(self):
+        oldest, middle, newest = self.confirmed(3), self.confirmed(2), self.confirmed(1)
+        self.assertLastSettlement(newest.confirmed_at)
+
+        newest.delete()
+        self.assertLastSettlement(middle.confirmed_at)
+
+        # Removing an older row leaves the date alone
+        oldest.delete()
+        self.assertLastSettlement(middle.confirmed_at)
+
+        middle.confirmed_at = self.now - timedelta(days=5)
+        middle.save()
+        self.assertLastSettlement(middle.confirmed_at)
+
+        middle.status = 'rejected'
+        middle.save()
+        self.assertLastSettlement(None)
+
+
+class SettlementNettingTests(TestCase):
+    def setUp(self):
+        self.me, self.roommate = [
+            User.objects.create_user(f'user{i}@example.com', 'pw', username=f'user{i}') for i in range(2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+        # The roommate owes 10.00 for rent, I owe 4.00 for groceries, and
+        # 5.00 EUR from a trip that must not be netted with the rest
+        self.rent = self.shared_group('Rent', paid_by=self.me, amount='20.00')
+        self.groceries = self.shared_group('Groceries', paid_by=self.roommate, amount='8.00')
+        self.trip = self.shared_group('Trip', paid_by=self.me, amount='10.00', currency='EUR')
+
+    def shared_group(self, name, paid_by, amount, currency='USD'):
+        group = Group.objects.create(name=name, created_by=self.me, currency=currency)
+        for user in (self.me, self.roommate):
+            Membership.objects.create(user=user, group=group)
+        client = APIClient()
+        client.force_authenticate(paid_by)
+        response = client.post(f'/api/v1/groups/{group.id}/expenses/', {
+            'group': str(group.id), 'title': name, 'amount': amount, 'date': '2026-01-01',
+            'paid_by': str(paid_by.id), 'split_type': 'equal',
+            'participants': [{'user_id': str(self.me.id)}, {'user_id': str(self.roommate.id)}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        BalanceCalculationService(group).calculate_all_balances()
+        return group
+
+    def test_positions_net_each_currency_across_groups(self):
+        positions = SettlementNettingService(self.me).positions()
+
+        self.assertEqual(
+            [(p['counterparty_id'], p['currency'], p['net_amount'], p['group_count']) for p in positions],
+            [
+                (self.roommate.id, 'EUR', Decimal('5.00'), 1),
+                (self.roommate.id, 'USD', Decimal('6.00'), 2),
+            ],
+        )
+        # The other side sees the same positions with the sign flipped
+        self.assertEqual(
+            [p['net_amount'] for p in SettlementNettingService(self.roommate).positions(currency='USD')],
+            [Decimal('-6.00')],
+        )
+
+    def test_settle_clears_every_edge_in_the_currency(self):
+        settlements = SettlementNettingService(self.me).settle(self.roommate, 'USD')
+
+        self.assertEqual(
+            sorted((s.group_id, s.payer_id, s.amount) for s in settlements),
+            sorted([(self.rent.id, self.roommate.id, Decimal('10.00')), (self.groceries.id, self.me.id, Decimal('4.00'))]),
+        )
+        self.assertTrue(all(s.status == 'confirmed' for s in settlements))
+        for group in (self.rent, self.groceries):
+            self.assertEqual(
+                set(Balance.objects.filter(group=group).values_list('net_balance', flat=True)), {Decimal('0.00')}
+            )
+            self.assertFalse(DebtSummary.objects.filter(group=group).exists())
+            summary = GroupSettlementSummary.objects.get(group=group)
+            self.assertEqual((summary.total_settlements, summary.is_fully_settled), (1, True))
+
+            # The deltas land where a full recompute would
+            BalanceCalculationService(group).calculate_all_balances()
+            self.assertFalse(DebtSummary.objects.filter(group=group).exists())
+
+        # The EUR trip is untouched
+        self.assertEqual(
+            [p['currency'] for p in SettlementNettingService(self.me).positions()], ['EUR']
+        )
+
+    def test_only_the_net_receiver_can_settle(self):
+        with self.assertRaises(PermissionDenied):
+            SettlementNettingService(self.roommate).settle(self.me, 'USD')
+
+        self.assertFalse(Settlement.objects.exists())
+
+    def test_settle_needs_open_debts(self):
+        with self.assertRaisesMessage(ValueError, 'There are no open debts'):
+            SettlementNettingService(self.me).settle(self.roommate, 'GBP')
+        with self.assertRaisesMessage(ValueError, 'cannot net debts with yourself'):
+            SettlementNettingService(self.me).settle(self.me, 'USD')
+
+    def test_netting_endpoint(self):
+        url = '/api/v1/settlements/netting/'
+
+        listed = self.client.get(url)
+        self.assertEqual(listed.status_code, 200)
+        self.assertEqual([row['net_amount'] for row in listed.data['data']], ['5.00', '6.00'])
+
+        payer_client = APIClient()
+        payer_client.force_authenticate(self.roommate)
+        refused = payer_client.post(url, {'counterparty': str(self.me.id), 'currency': 'usd'}, format='json')
+        self.assertEqual(refused.status_code, 403)
+
+        missing = self.client.post(url, {'counterparty': str(self.me.id), 'currency': 'usd'}, format='json')
+        self.assertEqual(missing.status_code, 400)
 
-# Create your tests here.
+        created = self.client.post(url, {'counterparty': str(self.roommate.id), 'currency': 'usd'}, format='json')
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(len(created.data['data']), 2)
+        self.assertEqual(Settlement.objects.filter(status='confirmed').count(), 2)
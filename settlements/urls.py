@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import SettlementViewSet, SettlementRequestViewSet
 
 router = DefaultRouter()
-router.register(r'', SettlementViewSet, basename='settlement')
+# 'requests' must come first, or the settlement detail route swallows it
 router.register(r'requests', SettlementRequestViewSet, basename='settlement-request')
+router.register(r'', SettlementViewSet, basename='settlement')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import SettlementNettingView
+
+# User-level settlement routes, not scoped to one group
+urlpatterns = [
+    path('netting/', SettlementNettingView.as_view(), name='settlement-netting'),
+]
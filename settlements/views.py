@@ -5,20 +5,26 @@ from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 from rest_framework.mixins import ListModelMixin, CreateModelMixin
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.core.exceptions import PermissionDenied as DjangoPermissionDenied, ValidationError as DjangoValidationError
+from django.contrib.auth import get_user_model
+from drf_spectacular.utils import extend_schema
 
+from config.pagination import KeysetPagination
 from groups.models import Group
 from members.models import Membership
+from idempotency.decorators import idempotent
 from .models import Settlement, SettlementRequest, GroupSettlementSummary
 from .serializers import (
     SettlementSerializer, CreateSettlementSerializer,
     SettlementRequestSerializer, CreateSettlementRequestSerializer,
-    GroupSettlementSummarySerializer
+    GroupSettlementSummarySerializer, BulkSettlementActionSerializer,
+    NettingPositionSerializer, SettleNetSerializer
 )
-from .services import SettlementService, SettlementRequestService
+from .services import SettlementService, SettlementRequestService, SettlementNettingService
 
 class SettlementViewSet(ModelViewSet):
     """ViewSet for managing settlements"""
@@ -65,20 +71,26 @@ class SettlementViewSet(ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
             
-        # Filter by user involvement
+        # Filter by user involvement; a UNION of the payer and receiver
+        # sides lets each use its own index where an OR could use none
+        branches = None
         user_filter = request.query_params.get('user')
         if user_filter == 'me':
-            queryset = queryset.filter(
-                Q(payer=request.user) | Q(receiver=request.user)
-            )
-            
-        serializer = self.get_serializer(queryset, many=True)
+            branches = [
+                queryset.filter(payer=request.user),
+                queryset.filter(receiver=request.user),
+            ]
+
+        settlements, next_cursor = KeysetPagination('settled_at').paginate(request, queryset, branches)
+        serializer = self.get_serializer(settlements, many=True)
         return Response({
             'status': 'success',
             'message': 'Settlements retrieved successfully',
-            'data': serializer.data
+            'data': serializer.data,
+            'next_cursor': next_cursor
         })
         
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Create a new settlement"""
         serializer = self.get_serializer(data=request.data)
@@ -148,6 +160,42 @@ class SettlementViewSet(ModelViewSet):
             'data': serializer.data
         })
         
+    @action(detail=False, methods=['post'])
+    def bulk_confirm(self, request, group_id=None):
+        """Confirm many pending settlements received by the user at once"""
+        return self._bulk_transition(request, 'confirm')
+
+    @action(detail=False, methods=['post'])
+    def bulk_reject(self, request, group_id=None):
+        """Reject many pending settlements received by the user at once"""
+        return self._bulk_transition(request, 'reject')
+
+    def _bulk_transition(self, request, verb):
+        payload = BulkSettlementActionSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+
+        service = SettlementService(self.get_group())
+        handler = service.bulk_confirm if verb == 'confirm' else service.bulk_reject
+        try:
+            settlements = handler(payload.validated_data['ids'], request.user)
+        except DjangoPermissionDenied as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = SettlementSerializer(settlements, many=True)
+        return Response({
+            'status': 'success',
+            'message': f'{len(settlements)} settlements {verb}ed successfully',
+            'data': serializer.data
+        })
+
     @action(detail=False, methods=['post'])
     def settle_all(self, request, group_id=None):
         """Create settlements for all user's debts"""
@@ -218,7 +266,7 @@ class SettlementRequestViewSet(GenericViewSet, ListModelMixin, CreateModelMixin)
         # Filter by status
         status_filter = request.query_params.get('status')
         if status_filter:
-            queryset = queryset.filter(status=status_filter)
+            queryset = SettlementRequestService.filter_status(queryset, status_filter)
             
         serializer = self.get_serializer(queryset, many=True)
         return Response({
@@ -227,6 +275,7 @@ class SettlementRequestViewSet(GenericViewSet, ListModelMixin, CreateModelMixin)
             'data': serializer.data
         })
         
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Create a settlement request"""
         serializer = self.get_serializer(data=request.data)
@@ -275,6 +324,42 @@ class SettlementRequestViewSet(GenericViewSet, ListModelMixin, CreateModelMixin)
                 'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
             
+    @action(detail=False, methods=['post'])
+    def bulk_accept(self, request, group_id=None):
+        """Accept many settlement requests sent to the user at once"""
+        payload = BulkSettlementActionSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+
+        service = SettlementRequestService(self.get_group())
+        try:
+            settlements = service.bulk_accept(
+                payload.validated_data['ids'],
+                request.user,
+                payload.validated_data['response_message']
+            )
+        except DjangoPermissionDenied as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_403_FORBIDDEN)
+        except DjangoValidationError as e:
+            return Response({
+                'status': 'error',
+                'message': ' '.join(e.messages)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        settlement_serializer = SettlementSerializer(settlements, many=True)
+        return Response({
+            'status': 'success',
+            'message': f'{len(settlements)} settlement requests accepted and settlements created',
+            'data': settlement_serializer.data
+        })
+
     @action(detail=True, methods=['post'])
     def reject(self, request, group_id=None, pk=None):
         """Reject a settlement request"""
@@ -286,7 +371,7 @@ class SettlementRequestViewSet(GenericViewSet, ListModelMixin, CreateModelMixin)
                 'message': 'You can only reject requests sent to you'
             }, status=status.HTTP_403_FORBIDDEN)
             
-        if settlement_request.status != 'pending':
+        if settlement_request.current_status != 'pending':
             return Response({
                 'status': 'error',
                 'message': 'Only pending requests can be rejected'
@@ -302,4 +387,60 @@ class SettlementRequestViewSet(GenericViewSet, ListModelMixin, CreateModelMixin)
             'status': 'success',
             'message': 'Settlement request rejected',
             'data': serializer.data
-        })
\ No newline at end of file
+        })
+
+
+@extend_schema(tags=['Settlements'])
+class SettlementNettingView(APIView):
+    """
+    Net debts with each counterparty across every shared group.
+    GET lists the net positions; POST records one netted transfer.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(responses=NettingPositionSerializer(many=True))
+    def get(self, request):
+        positions = SettlementNettingService(request.user).positions()
+        return Response({
+            'status': 'success',
+            'message': 'Net positions retrieved successfully',
+            'data': NettingPositionSerializer(positions, many=True).data
+        })
+
+    @extend_schema(request=SettleNetSerializer, responses=SettlementSerializer(many=True))
+    def post(self, request):
+        payload = SettleNetSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        params = payload.validated_data
+
+        counterparty = get_object_or_404(get_user_model(), id=params['counterparty'])
+        try:
+            settlements = SettlementNettingService(request.user).settle(
+                counterparty, params['currency'], params['method'], params['notes']
+            )
+        except DjangoPermissionDenied as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_403_FORBIDDEN)
+        except DjangoValidationError as e:
+            return Response({
+                'status': 'error',
+                'message': ' '.join(e.messages)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        settlements = Settlement.objects.filter(id__in=[s.id for s in settlements]).select_related(
+            'payer', 'receiver', 'initiated_by', 'confirmed_by', 'group'
+        )
+        serializer = SettlementSerializer(settlements, many=True)
+        return Response({
+            'status': 'success',
+            'message': f'Netted {len(settlements)} debts across {len({s.group_id for s in settlements})} groups',
+            'data': serializer.data
+        }, status=status.HTTP_201_CREATED)